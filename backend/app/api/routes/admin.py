@@ -0,0 +1,58 @@
+from typing import Annotated
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import StringConstraints
+from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
+from app.auth import get_current_admin
+from app.models.models import User
+from app.ml_models import registry
+from app.services import tmdb_cache, tmdb_async, moviedata, weekly_recommender
+from app.api.routes.recommend import get_db, REGION_PATTERN
+
+router = APIRouter()
+
+@router.get("/admin/model")
+def get_model_status(admin: User = Depends(get_current_admin)):
+    """
+    Served model, published version, versions on disk and the state of the last retraining
+    """
+    return registry.registry_status()
+
+@router.post("/admin/model/retrain")
+def retrain_model(admin: User = Depends(get_current_admin)):
+    """
+    Start training a new model version in the background
+    It is validated and swapped in when done; poll GET /admin/model for progress
+    """
+    return registry.start_retraining()
+
+@router.post("/admin/model/reload")
+async def reload_model(admin: User = Depends(get_current_admin)):
+    """
+    Swap in the version CURRENT points at, e.g. after publishing one from another machine
+    """
+    try:
+        return await run_in_threadpool(registry.reload_model)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error reloading model: {str(e)}")
+
+@router.get("/admin/tmdb-cache")
+def get_tmdb_cache_stats(admin: User = Depends(get_current_admin)):
+    """
+    Hit/miss counters and size of the local TMDB response cache, how many lookups were coalesced
+    and the state of the TMDB circuit breaker
+    """
+    return {
+        **tmdb_cache.cache_stats(),
+        'coalescing': moviedata.coalescing_stats(),
+        'circuit_breaker': tmdb_async.breaker.stats(),
+    }
+
+@router.post("/admin/tmdb-cache/prefetch-providers")
+async def prefetch_providers(regions: list[Annotated[str, StringConstraints(pattern=REGION_PATTERN)]] = Query(["US"]),
+                             db: Session = Depends(get_db), admin: User = Depends(get_current_admin)):
+    """
+    Warm the watch-provider cache for every stored weekly recommendation, e.g. from a daily cron job
+    Regions are validated like the weekly recommendation's region
+    """
+    return await weekly_recommender.prefetch_streaming_data(db, regions)
@@ -0,0 +1,24 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from app.ml_models import ml_models
+
+router = APIRouter()
+
+@router.get("/health")
+def health():
+    """
+    Liveness check: the process is up and serving requests
+    """
+    return {"status": "ok"}
+
+@router.get("/ready")
+def ready():
+    """
+    Readiness check: reports whether the recommendation model is loaded
+    Returns 503 until warm-up has loaded a model so load balancers can hold traffic back
+    """
+    status = ml_models.model_status()
+    return JSONResponse(
+        status_code=200 if status['loaded'] else 503,
+        content={"status": "ready" if status['loaded'] else "loading", "model": status}
+    )
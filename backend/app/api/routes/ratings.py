@@ -1,12 +1,16 @@
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, BackgroundTasks
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from app.database import SessionLocal
 from app.models.models import Rating, Movie, User
 from app.schemas.schemas import RatingCreate, RatingOut
-from app.services.moviedata import get_movie_id_by_name, get_movie_data
+from app.services.moviedata import get_movie_data_async
+from app.services.title_index import get_title_index, resolve_movie_ids_async
 from app.auth import get_current_user
+from app.ml_models.ml_models import add_movies_to_model
 from typing import List
 import pandas as pd
+import asyncio
 import io
 
 router = APIRouter()
@@ -53,7 +57,7 @@ def get_ratings(db: Session = Depends(get_db)):
 
 
 @router.post("/ratings/upload")
-async def upload_ratings(file: UploadFile = File(...), db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+async def upload_ratings(background_tasks: BackgroundTasks, file: UploadFile = File(...), db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
     # Read file into pandas DataFrame
     contents = await file.read()
     df = pd.read_csv(io.StringIO(contents.decode("utf-8")))
@@ -61,12 +65,23 @@ async def upload_ratings(file: UploadFile = File(...), db: Session = Depends(get
     successful_uploads = 0
     failed_uploads = 0
     failed_movies = []
+    new_movies = []
 
-    for _, row in df.iterrows():
+    # Resolve titles against the local index (Letterboxd exports carry the release year), search TMDB
+    # for the rest, then fetch every movie not in the database yet, all concurrently;
+    # the async TMDB client bounds how many requests are in flight
+    title_index = await run_in_threadpool(get_title_index, db)
+    years = df["Year"] if "Year" in df.columns else None
+    movie_ids = await resolve_movie_ids_async(df["Name"].tolist(), years, index=title_index)
+    found_ids = {movie_id for movie_id in movie_ids if movie_id is not None}
+    known_ids = {movie_id for (movie_id,) in db.query(Movie.id).filter(Movie.id.in_(found_ids))}
+    missing_ids = sorted(found_ids - known_ids)
+    fetched = dict(zip(missing_ids, await asyncio.gather(*(get_movie_data_async(movie_id) for movie_id in missing_ids))))
+
+    for (_, row), movie_id in zip(df.iterrows(), movie_ids):
         try:
             movie_name = row["Name"]
             #print(f"Processing movie: {movie_name}")
-            movie_id = get_movie_id_by_name(movie_name)
             #print(f"Found movie ID: {movie_id}")
             
             if movie_id is None:
@@ -81,7 +96,7 @@ async def upload_ratings(file: UploadFile = File(...), db: Session = Depends(get
             
             if not existing_movie:
                 # Get movie data from TMDB and create movie record
-                movie_data = get_movie_data(movie_id)
+                movie_data = fetched.get(movie_id)
                 if movie_data:
                     genre_ids = movie_data.get('genre_ids', [])
                     if genre_ids is None:
@@ -105,6 +120,8 @@ async def upload_ratings(file: UploadFile = File(...), db: Session = Depends(get
                         year=year
                     )
                     db.add(movie)
+                    title_index.add(movie.id, movie.title, year)
+                    new_movies.append(movie_data)
                     print(f"Created movie record: {movie.title} (ID: {movie.id})")
                 else:
                     # Create a basic movie record if TMDB data fetch fails
@@ -153,6 +170,10 @@ async def upload_ratings(file: UploadFile = File(...), db: Session = Depends(get
             failed_movies.append(movie_name)
             continue
 
+    # Make the new movies searchable once the response is sent
+    if new_movies:
+        background_tasks.add_task(add_movies_to_model, new_movies)
+
     return {
         "message": f"Upload completed for user {current_user.username}",
         "successful_uploads": successful_uploads,
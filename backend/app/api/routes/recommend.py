@@ -1,15 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from sqlalchemy.sql import func
 from app.database import SessionLocal
 from app.models.models import Movie, Rating, User, Recommendation
 from app.services import recommender, weekly_recommender, moviedata
 from app.auth import get_current_user
+from app.ml_models.ml_models import add_movie_ids_to_model
 import pandas as pd
 from datetime import datetime, timedelta
 
 router = APIRouter()
 
+# ISO 3166-1 country code, as TMDB expects it for watch providers
+REGION_PATTERN = "^[A-Z]{2}$"
+
 def get_db():
     db = SessionLocal()
     try:
@@ -18,21 +23,26 @@ def get_db():
         db.close()
 
 @router.get("/weekly-recommendation/{user_id}")
-def get_weekly_recommendation(user_id: int, db: Session = Depends(get_db), force_new: bool = False):
+async def get_weekly_recommendation(user_id: int, background_tasks: BackgroundTasks, db: Session = Depends(get_db), force_new: bool = False,
+                                    region: str = Query("US", pattern=REGION_PATTERN)):
     """
     Get the user's weekly movie recommendation
     Args:
         user_id: The user's ID
         force_new: Force generation of a new recommendation (ignores weekly cycle)
+        region: ISO 3166-1 country code the streaming availability is for
     """
     try:
         print(f"API: Called with user_id={user_id}, force_new={force_new}")
         
-        user = db.query(User).filter(User.id == user_id).first()
+        # Database work stays on the threadpool; TMDB calls below are awaited on the event loop
+        user = await run_in_threadpool(lambda: db.query(User).filter(User.id == user_id).first())
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
-        recommendation = weekly_recommender.get_weekly_recommendation(user_id, db, force_new=force_new)
+        recommendation = await run_in_threadpool(
+            weekly_recommender.get_weekly_recommendation, user_id, db, force_new=force_new
+        )
         
         if recommendation is None:
             return {
@@ -41,15 +51,32 @@ def get_weekly_recommendation(user_id: int, db: Session = Depends(get_db), force
                 "recommendation": None
             }
         
+        if recommendation.get('is_new'):
+            # Newly picked movies usually come from TMDB, add them to the model in the background
+            background_tasks.add_task(add_movie_ids_to_model, [recommendation['movie_id']])
+        
         return {
             "user_id": user_id,
             "recommendation": recommendation,
-            "streaming_data": moviedata.get_movie_streaming_data(recommendation['movie_id'])
+            "region": region,
+            "streaming_data": await moviedata.get_movie_streaming_data_async(recommendation['movie_id'], region)
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting weekly recommendation: {str(e)}")
 
+@router.get("/watch-providers")
+async def get_watch_providers(region: str = Query("US", pattern=REGION_PATTERN)):
+    """
+    Every streaming service available in a region, in TMDB's display order
+    """
+    providers = await moviedata.get_watch_provider_list_async(region)
+    if providers is None:
+        raise HTTPException(status_code=502, detail="Could not fetch watch providers from TMDB")
+    return {"region": region, "providers": providers}
+
 @router.get("/weekly-recommendation-status/{user_id}")
 def get_weekly_recommendation_status(user_id: int, db: Session = Depends(get_db)):
     """
@@ -1,10 +1,21 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from app.api.routes import ratings, recommend, auth
+from app.api.routes import ratings, recommend, auth, health, admin
 from app.database import Base, engine
 from app.models import models
+from app.ml_models import ml_models
+from app.services.tmdb_async import close_async_tmdb
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm up the recommendation model at startup instead of on import or first request
+    await run_in_threadpool(ml_models.ensure_model_loaded)
+    yield
+    await close_async_tmdb()
+
+app = FastAPI(lifespan=lifespan)
 
 # DB setup
 models.Base.metadata.create_all(bind=engine)
@@ -20,4 +31,6 @@ app.add_middleware(
 
 app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
 app.include_router(ratings.router, prefix="/api")
-app.include_router(recommend.router, prefix="/api")
\ No newline at end of file
+app.include_router(recommend.router, prefix="/api")
+app.include_router(health.router, prefix="/api", tags=["health"])
+app.include_router(admin.router, prefix="/api", tags=["admin"])
\ No newline at end of file
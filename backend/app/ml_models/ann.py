@@ -0,0 +1,186 @@
+import numpy as np
+from scipy import sparse
+
+from app.ml_models.neighbors import SparseBruteForceIndex, row_squared_norms
+
+# Queries are scored in chunks whose dense copy holds at most this many values (32 MB)
+QUERY_BLOCK_VALUES = 1 << 22
+# Scoring a candidate costs several times a brute-force row: past this share of the catalog per
+# query (e.g. posting lists of very common features), a chunk is searched by brute force instead
+MAX_CANDIDATE_SHARE = 0.1
+
+def _ranges(starts, lengths):
+    """
+    Concatenation of range(start, start + length) for every pair, without a Python loop
+    """
+    return np.repeat(starts - (np.cumsum(lengths) - lengths), lengths) + np.arange(lengths.sum())
+
+class PrunedIndex:
+    """
+    Euclidean nearest neighbors that only scores a handful of candidate rows per query.
+
+    Scaled one-hot features are heavily skewed: genres and languages are common and carry small
+    weights, cast members and directors are rare and carry large ones. So a row's squared distance
+    ||q||^2 + ||x||^2 - 2 q.x depends on the query mostly through the rare features it shares:
+    - rows sharing a rare feature with the query are found through per-feature posting lists
+    - for every other row q.x only comes from common features, so it is at most the query's
+      bound B = sum(|q_f| * max|x_f|) over its common features, and the row is at least
+      ||q||^2 + ||x||^2 - 2B away. Rows are kept sorted by norm, and every row whose lower bound
+      could still beat the k-th best candidate found so far is scored too
+    By default the result equals a brute-force search (up to the order of ties). max_candidates
+    caps the rows scored per query in each pass: posting-list rows are ranked by their distance over
+    the rare features alone, the norm sweep stops after that many rows. Queries get faster, dense
+    ones (taste profiles) most, and recall drops below 1. Queries are scored in
+    batches: a chunk of queries is densified once and each candidate pair costs one gather per
+    non-zero of the candidate row, however dense the query (e.g. a taste profile) is.
+    """
+
+    def __init__(self, X, n_neighbors=20, squared_norms=None, max_postings=1000, max_candidates=None):
+        """
+        Args:
+            X: Scaled CSR feature matrix
+            n_neighbors: Default neighbors per query
+            squared_norms: Precomputed row norms, if available
+            max_postings: Features in at most this many rows get a posting list; more common ones
+                only enter the bound. Lower values make the lists shorter and the bound looser
+            max_candidates: Rows scored per query and pass at most, trading recall for latency (see
+                benchmarks/bench_ann.py); None scores every candidate, so the result is exact
+        """
+        self.X = sparse.csr_matrix(X, copy=False)
+        self.n_neighbors = n_neighbors
+        self.max_candidates = max_candidates
+        self.squared_norms = row_squared_norms(self.X) if squared_norms is None else squared_norms
+        self._exact = SparseBruteForceIndex(self.X, n_neighbors, squared_norms=self.squared_norms)
+
+        columns = self.X.tocsc()
+        frequency = np.diff(columns.indptr)
+        self._rare = frequency <= max_postings
+        # Posting lists of the rare columns only, addressed through a column -> list number map
+        rare_columns = np.flatnonzero(self._rare)
+        self._list_of_column = np.full(self.X.shape[1], -1, dtype=np.int64)
+        self._list_of_column[rare_columns] = np.arange(len(rare_columns))
+        postings = columns[:, rare_columns]
+        self._posting_starts = postings.indptr
+        self._posting_rows = postings.indices
+        self._posting_values = postings.data
+        self._column_max = np.zeros(self.X.shape[1])
+        np.maximum.at(self._column_max, self.X.indices, np.abs(self.X.data))
+        self._by_norm = np.argsort(self.squared_norms, kind='stable')
+        self._sorted_norms = np.asarray(self.squared_norms)[self._by_norm]
+
+    def _score(self, dense_queries, query_norms, pairs):
+        """
+        Exact squared distances of (query, row) pairs encoded as query * n_rows + row
+        """
+        pair_queries, pair_rows = pairs // self.X.shape[0], pairs % self.X.shape[0]
+        starts = self.X.indptr[pair_rows]
+        lengths = self.X.indptr[pair_rows + 1] - starts
+        entries = _ranges(starts, lengths)
+        pair_of_entry = np.repeat(np.arange(len(pairs)), lengths)
+        products = self.X.data[entries] * dense_queries[pair_queries[pair_of_entry], self.X.indices[entries]]
+        dots = np.bincount(pair_of_entry, weights=products, minlength=len(pairs))
+        return np.maximum(query_norms[pair_queries] + self.squared_norms[pair_rows] - 2 * dots, 0)
+
+    def _posting_candidates(self, queries, query_of_entry):
+        """
+        (query, row) pairs for every row sharing a rare feature with a query, with q_f * x_f of that feature
+        """
+        lists = self._list_of_column[queries.indices]
+        shared = lists >= 0
+        starts = self._posting_starts[lists[shared]]
+        lengths = self._posting_starts[lists[shared] + 1] - starts
+        entries = _ranges(starts, lengths)
+        products = np.repeat(queries.data[shared], lengths) * self._posting_values[entries]
+        return np.repeat(query_of_entry[shared], lengths), self._posting_rows[entries], products
+
+    def _most_promising(self, pairs, products, n_rows):
+        """
+        The max_candidates pairs per query with the smallest distance over the shared rare features
+        """
+        pairs, inverse = np.unique(pairs, return_inverse=True)
+        partial = self.squared_norms[pairs % n_rows] - 2 * np.bincount(inverse, weights=products, minlength=len(pairs))
+        order = np.lexsort((partial, pairs // n_rows))
+        pair_queries = (pairs // n_rows)[order]
+        rank = np.arange(len(order)) - np.searchsorted(pair_queries, pair_queries)
+        return pairs[order[rank < self.max_candidates]]
+
+    def kneighbors(self, queries, n_neighbors=None):
+        """
+        Same contract as SparseBruteForceIndex.kneighbors
+        """
+        n_rows = self.X.shape[0]
+        n_neighbors = min(n_neighbors or self.n_neighbors, n_rows)
+        queries = sparse.csr_matrix(queries)
+        if n_neighbors >= n_rows or queries.shape[0] == 0:
+            return self._exact.kneighbors(queries, n_neighbors)
+        chunk = max(1, QUERY_BLOCK_VALUES // max(1, self.X.shape[1]))
+        results = [self._kneighbors_chunk(queries[start:start + chunk], n_neighbors)
+                   for start in range(0, queries.shape[0], chunk)]
+        return np.vstack([distances for distances, _ in results]), np.vstack([indices for _, indices in results])
+
+    def _kneighbors_chunk(self, queries, n_neighbors):
+        n_rows = self.X.shape[0]
+        n_queries = queries.shape[0]
+        dense_queries = queries.toarray()
+        query_norms = row_squared_norms(queries)
+        query_of_entry = np.repeat(np.arange(n_queries), np.diff(queries.indptr))
+
+        # First pass: posting-list candidates plus the smallest rows, so every query has n_neighbors
+        pair_queries, pair_rows, products = self._posting_candidates(queries, query_of_entry)
+        if len(pair_rows) > MAX_CANDIDATE_SHARE * n_queries * n_rows:
+            return self._exact.kneighbors(queries, n_neighbors)
+        posting_pairs = pair_queries.astype(np.int64) * n_rows + pair_rows
+        if self.max_candidates is not None:
+            posting_pairs = self._most_promising(posting_pairs, products, n_rows)
+        pairs = np.unique(np.concatenate([
+            posting_pairs,
+            np.repeat(np.arange(n_queries, dtype=np.int64), n_neighbors) * n_rows + np.tile(self._by_norm[:n_neighbors], n_queries),
+        ]))
+        squared = self._score(dense_queries, query_norms, pairs)
+        order = np.lexsort((squared, pairs // n_rows))
+        kth_best = squared[order][np.searchsorted((pairs // n_rows)[order], np.arange(n_queries)) + n_neighbors - 1]
+
+        # Second pass: rows outside the posting lists whose lower bound does not rule them out
+        common = ~self._rare[queries.indices]
+        bound = np.bincount(
+            query_of_entry[common], weights=np.abs(queries.data[common]) * self._column_max[queries.indices[common]],
+            minlength=n_queries
+        )
+        counts = np.searchsorted(self._sorted_norms, kth_best - query_norms + 2 * bound, side='right')
+        if self.max_candidates is not None:
+            # Stop the sweep early; rows past it could still have been neighbors
+            counts = np.minimum(counts, self.max_candidates)
+        if counts.sum() > MAX_CANDIDATE_SHARE * n_queries * n_rows:
+            return self._exact.kneighbors(queries, n_neighbors)
+        smallest_rows = self._by_norm[_ranges(np.zeros(n_queries, dtype=np.int64), counts)]
+        extra = np.setdiff1d(np.repeat(np.arange(n_queries, dtype=np.int64), counts) * n_rows + smallest_rows, pairs)
+        pairs = np.concatenate([pairs, extra])
+        squared = np.concatenate([squared, self._score(dense_queries, query_norms, extra)])
+
+        # Closest first per query, ties by row like the brute-force index
+        pair_queries, pair_rows = pairs // n_rows, pairs % n_rows
+        order = np.lexsort((pair_rows, squared, pair_queries))
+        take = np.searchsorted(pair_queries[order], np.arange(n_queries))[:, None] + np.arange(n_neighbors)[None, :]
+        return np.sqrt(squared[order][take]), pair_rows[order][take]
+
+INDEX_BACKENDS = {
+    'exact': SparseBruteForceIndex,
+    'pruned': PrunedIndex,
+}
+
+def build_index(X, backend='exact', n_neighbors=20, squared_norms=None, **params):
+    """
+    Build a nearest-neighbor index over a scaled feature matrix
+    Args:
+        X: Sparse CSR feature matrix
+        backend: 'exact' (brute force) or 'pruned' (scores only candidate rows; exact unless
+            max_candidates is set)
+        n_neighbors: Default neighbors per query
+        squared_norms: Precomputed row norms, if available
+        params: Backend-specific options, e.g. max_postings and max_candidates for 'pruned'
+    Returns:
+        object: Index with a kneighbors(queries, n_neighbors) method
+    """
+    if backend not in INDEX_BACKENDS:
+        raise ValueError(f"Unknown index backend '{backend}', expected one of {sorted(INDEX_BACKENDS)}")
+    return INDEX_BACKENDS[backend](X, n_neighbors=n_neighbors, squared_norms=squared_norms, **params)
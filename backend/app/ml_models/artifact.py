@@ -0,0 +1,225 @@
+import os
+import json
+import time
+import shutil
+from datetime import datetime, timezone
+import numpy as np
+from scipy import sparse
+from sklearn.preprocessing import StandardScaler
+
+from app.ml_models.columnar import ColumnarTable, write_table
+from app.ml_models.features import MovieFeatureEncoder
+from app.ml_models.neighbors import row_squared_norms
+from app.ml_models.ann import build_index
+
+# Bump when the on-disk layout changes in a way older readers cannot handle
+FORMAT_VERSION = 2
+
+MANIFEST_FILE = 'manifest.json'
+VOCABULARY_FILE = 'vocabulary.json'
+CURRENT_FILE = 'CURRENT'
+# Written into a version when CURRENT moves away from it; its mtime is when the version was retired
+RETIRED_FILE = 'RETIRED'
+DEFAULT_MODEL_DIR = 'app/ml_models/artifacts'
+
+def _new_version():
+    return datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%fZ')
+
+def _write_current(model_dir, version):
+    """
+    Point CURRENT at a version; os.replace makes the switch atomic for readers
+    The version it pointed at before is marked as retired (see prune_versions)
+    """
+    previous = current_version(model_dir)
+    retired_marker = os.path.join(model_dir, version, RETIRED_FILE)
+    if os.path.exists(retired_marker):
+        # Republished (e.g. a rollback): served again, so no longer prunable
+        os.remove(retired_marker)
+    tmp_path = os.path.join(model_dir, f'{CURRENT_FILE}.tmp')
+    with open(tmp_path, 'w') as f:
+        f.write(version)
+    os.replace(tmp_path, os.path.join(model_dir, CURRENT_FILE))
+    if previous is not None and previous != version and os.path.isdir(os.path.join(model_dir, previous)):
+        with open(os.path.join(model_dir, previous, RETIRED_FILE), 'w') as f:
+            f.write(version)
+
+def current_version(model_dir=DEFAULT_MODEL_DIR):
+    """
+    Return the version CURRENT points at, or None if no artifact has been published
+    """
+    path = os.path.join(model_dir, CURRENT_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        version = f.read().strip()
+    return version or None
+
+def publish_version(model_dir, version):
+    """
+    Make an already written version the CURRENT one
+    """
+    if not os.path.exists(os.path.join(model_dir, version, MANIFEST_FILE)):
+        raise ValueError(f"No model version {version} in {model_dir}")
+    _write_current(model_dir, version)
+
+def list_versions(model_dir=DEFAULT_MODEL_DIR):
+    """
+    List the complete versions on disk, oldest first
+    """
+    if not os.path.isdir(model_dir):
+        return []
+    return sorted(
+        name for name in os.listdir(model_dir)
+        if not name.startswith('.') and os.path.isdir(os.path.join(model_dir, name))
+    )
+
+def save_artifact(model_data, model_dir=DEFAULT_MODEL_DIR, publish=True):
+    """
+    Write a trained model as a versioned directory of .npy arrays plus a JSON manifest
+    Args:
+        model_data: Dict with feature_matrix, scaler, encoder, movie_data and optional neighbor table
+        model_dir: Root directory holding one sub-directory per version
+        publish: Point CURRENT at the new version once it is completely written
+    Returns:
+        str: The new version name
+    """
+    version = _new_version()
+    tmp_dir = os.path.join(model_dir, f'.{version}.tmp')
+    os.makedirs(tmp_dir)
+
+    X = sparse.csr_matrix(model_data['feature_matrix'])
+    X.sort_indices()
+    arrays = {
+        'features_data': X.data.astype(np.float64),
+        'features_indices': X.indices.astype(np.int32),
+        'features_indptr': X.indptr.astype(np.int64),
+        'features_sq_norms': row_squared_norms(X),
+        'scale': np.asarray(model_data['scaler'].scale_, dtype=np.float64),
+    }
+    if model_data.get('neighbor_indices') is not None:
+        arrays['neighbor_indices'] = np.asarray(model_data['neighbor_indices'], dtype=np.int32)
+        arrays['neighbor_distances'] = np.asarray(model_data['neighbor_distances'], dtype=np.float32)
+    for name, array in arrays.items():
+        np.save(os.path.join(tmp_dir, f'{name}.npy'), array)
+
+    write_table(model_data['movie_data'], os.path.join(tmp_dir, 'movies'))
+
+    encoder = model_data['encoder']
+    manifest = {
+        'format_version': FORMAT_VERSION,
+        'version': version,
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'n_movies': X.shape[0],
+        'n_features': X.shape[1],
+        'n_neighbors': model_data.get('n_neighbors', 20),
+        'n_samples_seen': X.shape[0],
+        'max_cast': encoder.max_cast,
+        'arrays': sorted(arrays),
+        # Incremental updates record the fully trained version they grew from
+        'base_version': model_data.get('base_version', version),
+        'n_appended': model_data.get('n_appended', 0),
+    }
+    # Token -> column index, loaded as-is so new movies are encoded without rebuilding it
+    with open(os.path.join(tmp_dir, VOCABULARY_FILE), 'w') as f:
+        json.dump(encoder.vocabulary_, f)
+    with open(os.path.join(tmp_dir, MANIFEST_FILE), 'w') as f:
+        json.dump(manifest, f)
+
+    os.rename(tmp_dir, os.path.join(model_dir, version))
+    if publish:
+        _write_current(model_dir, version)
+    return version
+
+def load_artifact(model_dir=DEFAULT_MODEL_DIR, version=None, mmap=True, index_backend='exact', index_params=None):
+    """
+    Open a saved model artifact
+    Args:
+        model_dir: Root directory passed to save_artifact
+        version: Version to open (default: the one CURRENT points at)
+        mmap: Memory-map the arrays read-only instead of reading them into private memory
+        index_backend: Nearest-neighbor backend for live queries ('exact' or 'pruned')
+        index_params: Backend-specific options passed to build_index
+    Returns:
+        dict: Model data in the same shape train_and_save_model returns, or None if there is no artifact
+    """
+    version = version or current_version(model_dir)
+    if version is None:
+        return None
+    version_dir = os.path.join(model_dir, version)
+    with open(os.path.join(version_dir, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    if manifest['format_version'] != FORMAT_VERSION:
+        raise ValueError(f"Unsupported model format {manifest['format_version']} in {version_dir}")
+
+    mmap_mode = 'r' if mmap else None
+    def load(name):
+        return np.load(os.path.join(version_dir, f'{name}.npy'), mmap_mode=mmap_mode)
+
+    feature_matrix = sparse.csr_matrix(
+        (load('features_data'), load('features_indices'), load('features_indptr')),
+        shape=(manifest['n_movies'], manifest['n_features']), copy=False
+    )
+    knn = build_index(
+        feature_matrix, index_backend, manifest['n_neighbors'], squared_norms=load('features_sq_norms'),
+        **(index_params or {})
+    )
+
+    # Only the fitted scale is needed to transform new movies (the scaler never centers)
+    scaler = StandardScaler(with_mean=False)
+    scaler.scale_ = np.array(load('scale'))
+    scaler.mean_ = None
+    scaler.var_ = None
+    scaler.n_features_in_ = manifest['n_features']
+    scaler.n_samples_seen_ = manifest['n_samples_seen']
+
+    encoder = MovieFeatureEncoder(max_cast=manifest['max_cast'])
+    with open(os.path.join(version_dir, VOCABULARY_FILE)) as f:
+        encoder.vocabulary_ = json.load(f)
+    encoder.feature_names_ = [None] * len(encoder.vocabulary_)
+    for name, column in encoder.vocabulary_.items():
+        encoder.feature_names_[column] = name
+
+    has_neighbors = 'neighbor_indices' in manifest['arrays']
+    return {
+        'version': version,
+        'manifest': manifest,
+        'knn_model': knn,
+        'scaler': scaler,
+        'feature_columns': encoder.feature_names_,
+        'feature_matrix': feature_matrix,
+        'encoder': encoder,
+        'neighbor_indices': load('neighbor_indices') if has_neighbors else None,
+        'neighbor_distances': load('neighbor_distances') if has_neighbors else None,
+        'movie_data': ColumnarTable(os.path.join(version_dir, 'movies'), mmap=mmap),
+    }
+
+def retired_seconds(model_dir, version):
+    """
+    Seconds since CURRENT moved away from a version, or None if it was never retired
+    (it is served, or it was never published, e.g. a retrained version still being validated)
+    """
+    try:
+        return time.time() - os.path.getmtime(os.path.join(model_dir, version, RETIRED_FILE))
+    except FileNotFoundError:
+        return None
+
+def discard_version(model_dir, version):
+    """
+    Delete a version that was never published, e.g. one that failed validation
+    """
+    if version == current_version(model_dir):
+        raise ValueError(f"Model version {version} is the published one")
+    shutil.rmtree(os.path.join(model_dir, version), ignore_errors=True)
+
+def prune_versions(model_dir=DEFAULT_MODEL_DIR, keep=3, grace_seconds=0):
+    """
+    Delete old versions, except the newest `keep` ones
+    Only versions retired at least grace_seconds ago are deleted: processes that have not yet
+    noticed the new CURRENT still serve the old version and open its arrays lazily. Versions that
+    were never published are left alone, they may be written by a retraining still in flight.
+    """
+    versions = list_versions(model_dir)
+    for name in versions[:-keep] if keep else versions:
+        retired = retired_seconds(model_dir, name)
+        if retired is not None and retired >= grace_seconds:
+            shutil.rmtree(os.path.join(model_dir, name), ignore_errors=True)
@@ -0,0 +1,35 @@
+import sys
+import os
+import argparse
+# Add the backend directory to the path so we can import from app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from app.services.moviedata import data_dir, export_movies_to_csv
+from app.services.catalog_builder import DEFAULT_WORKERS, build_catalog_from_titles, fetch_top_movies, run_catalog_job
+
+def main():
+    """Build a catalog CSV from a list of titles, or from TMDB's top rated / popular lists"""
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--titles', default=os.path.join(data_dir, 'films.txt'), help='One movie title per line')
+    parser.add_argument('--output', default=os.path.join(data_dir, 'films.csv'))
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help='Titles fetched concurrently')
+    parser.add_argument('--fresh', action='store_true', help='Ignore the checkpoint of an interrupted build')
+    parser.add_argument('--top-lists', action='store_true',
+                        help='Export top_rated_movies.csv and top_popular_movies.csv instead')
+    args = parser.parse_args()
+
+    if args.top_lists:
+        for list_name, filename in [('top_rated', 'top_rated_movies.csv'), ('popular', 'top_popular_movies.csv')]:
+            df = run_catalog_job(fetch_top_movies(list_name))
+            print(f"Successfully fetched {len(df)} {list_name} movies")
+            export_movies_to_csv(df, filename)
+        return
+
+    with open(args.titles, encoding='utf-8') as f:
+        titles = [line.strip() for line in f if line.strip()]
+    summary = run_catalog_job(build_catalog_from_titles(titles, args.output, n_workers=args.workers, resume=not args.fresh))
+    if summary['failed']:
+        print(f"❌ {summary['failed']} titles failed; rerun to resume")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import os
+import shutil
+import pandas as pd
+
+from app.ml_models.columnar import ColumnarTable, write_table
+from app.ml_models.features import parse_list
+
+# Columns the TMDB exports store as Python-repr strings, e.g. "['Tim Robbins', 'Morgan Freeman']"
+LIST_COLUMNS = ['genre_ids', 'cast']
+CATALOG_SUFFIX = '.catalog'
+
+def catalog_dir(csv_file):
+    """
+    Directory holding the columnar version of a CSV catalog, e.g. app/data/films.catalog
+    """
+    return os.path.splitext(csv_file)[0] + CATALOG_SUFFIX
+
+def read_catalog_csv(csv_file):
+    """
+    Read a CSV catalog and parse its list columns (safely, without eval)
+    Args:
+        csv_file: CSV exported by moviedata.export_movies_to_csv or convert_films_txt_to_csv
+    Returns:
+        DataFrame: The catalog with genre_ids and cast as lists
+    """
+    df = pd.read_csv(csv_file)
+    for column in LIST_COLUMNS:
+        if column in df.columns:
+            df[column] = df[column].apply(parse_list)
+    if 'genre_ids' in df.columns:
+        # Genre ids are integers; the CSVs sometimes hold them as strings or floats
+        df['genre_ids'] = df['genre_ids'].apply(lambda genres: [int(genre) for genre in genres])
+    return df
+
+def convert_catalog(csv_file, output_dir=None):
+    """
+    Convert a CSV catalog once into typed column arrays with offsets for the list columns
+    The directory is written next to the CSV under a temporary name and renamed into place
+    Args:
+        csv_file: Source CSV
+        output_dir: Target directory (default: catalog_dir(csv_file))
+    Returns:
+        str: The catalog directory
+    """
+    output_dir = output_dir or catalog_dir(csv_file)
+    tmp_dir = f'{output_dir}.tmp'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    write_table(read_catalog_csv(csv_file), tmp_dir)
+    shutil.rmtree(output_dir, ignore_errors=True)
+    os.rename(tmp_dir, output_dir)
+    return output_dir
+
+def is_stale(csv_file):
+    """
+    True if the CSV has no columnar version yet or was modified after it was converted
+    """
+    directory = catalog_dir(csv_file)
+    if not os.path.isdir(directory):
+        return True
+    return os.path.exists(csv_file) and os.path.getmtime(csv_file) > os.path.getmtime(directory)
+
+def open_catalog(csv_file, convert=True):
+    """
+    Open the columnar version of a catalog, converting the CSV first if it is missing or stale
+    Args:
+        csv_file: CSV path the catalog was (or will be) converted from
+        convert: Convert on demand; when False a missing catalog raises FileNotFoundError
+    Returns:
+        ColumnarTable: Memory-mapped catalog; list columns decode from offsets with no parsing
+    """
+    if is_stale(csv_file):
+        if not convert:
+            raise FileNotFoundError(f"No up-to-date columnar catalog for {csv_file}")
+        print(f"Converting {csv_file} to a columnar catalog...")
+        convert_catalog(csv_file)
+    return ColumnarTable(catalog_dir(csv_file))
+
+def load_catalog(csv_file):
+    """
+    Load a catalog as a DataFrame from its columnar version (see open_catalog)
+    """
+    return open_catalog(csv_file).to_dataframe()
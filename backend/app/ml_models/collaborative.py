@@ -0,0 +1,233 @@
+import os
+import json
+import shutil
+from datetime import datetime, timezone
+import numpy as np
+from scipy import sparse
+
+from app.models.models import Rating
+
+# Kept outside the content model's artifact directory, whose sub-directories are model versions
+DEFAULT_CF_DIR = 'app/ml_models/cf_artifacts'
+CF_FORMAT_VERSION = 1
+# Outer products of the fixed factors are formed for a block of rows at a time, at most this many values
+GRAM_BLOCK_VALUES = 1 << 22
+
+def ratings_matrix(triples):
+    """
+    Build the sparse user x item rating matrix
+    Args:
+        triples: Iterable of (user_id, movie_id, rating)
+    Returns:
+        tuple: (csr_matrix of ratings, user IDs per row, movie IDs per column)
+    """
+    triples = [(user_id, movie_id, rating) for user_id, movie_id, rating in triples
+               if user_id is not None and movie_id is not None and rating is not None]
+    if not triples:
+        return sparse.csr_matrix((0, 0)), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    users, movies, ratings = (np.array(column) for column in zip(*triples))
+    user_ids, user_rows = np.unique(users.astype(np.int64), return_inverse=True)
+    movie_ids, movie_columns = np.unique(movies.astype(np.int64), return_inverse=True)
+    R = sparse.csr_matrix(
+        (ratings.astype(np.float64), (user_rows, movie_columns)), shape=(len(user_ids), len(movie_ids))
+    )
+    # Duplicate (user, movie) rows would be summed; keep a plain rating per pair instead
+    R.sum_duplicates()
+    counts = sparse.csr_matrix((np.ones(len(users)), (user_rows, movie_columns)), shape=R.shape)
+    counts.sum_duplicates()
+    R.data /= counts.data
+    return R, user_ids, movie_ids
+
+def load_ratings_matrix(db):
+    """
+    Read the whole ratings table into a sparse user x item matrix (see ratings_matrix)
+    """
+    return ratings_matrix(db.query(Rating.user_id, Rating.movie_id, Rating.rating).all())
+
+def _gram_matrices(R, fixed):
+    """
+    V_u.T @ V_u for every row u of R, where V_u are the fixed factors of the row's observed entries
+    Rows are processed in blocks: the outer products of a block's entries are summed per row with
+    one sparse product, so memory stays at GRAM_BLOCK_VALUES however large the other side is
+    """
+    n_rows, n_factors = R.shape[0], fixed.shape[1]
+    gram = np.empty((n_rows, n_factors, n_factors))
+    entries_per_block = max(1, GRAM_BLOCK_VALUES // (n_factors * n_factors))
+    start = 0
+    while start < n_rows:
+        # As many rows as fit the budget, but at least one
+        stop = int(np.searchsorted(R.indptr, R.indptr[start] + entries_per_block, side='right')) - 1
+        stop = min(max(stop, start + 1), n_rows)
+        first, last = R.indptr[start], R.indptr[stop]
+        V = fixed[R.indices[first:last]]
+        outer = (V[:, :, None] * V[:, None, :]).reshape(last - first, n_factors * n_factors)
+        rows_of_entries = sparse.csr_matrix(
+            (np.ones(last - first), np.arange(last - first), R.indptr[start:stop + 1] - first),
+            shape=(stop - start, last - first)
+        )
+        gram[start:stop] = np.asarray(rows_of_entries @ outer).reshape(stop - start, n_factors, n_factors)
+        start = stop
+    return gram
+
+def _solve_side(R, fixed, regularization):
+    """
+    One ALS half-step: the least-squares factors of every row of R given the other side's factors
+    All rows are solved at once as a batch of small linear systems
+    """
+    n_factors = fixed.shape[1]
+    gram = _gram_matrices(R, fixed)
+    # Regularize by the number of ratings (weighted-lambda ALS) so heavy raters are not over-shrunk
+    counts = np.diff(R.indptr)
+    gram += (regularization * np.maximum(counts, 1))[:, None, None] * np.eye(n_factors)
+    rhs = np.asarray(R @ fixed)
+    return np.linalg.solve(gram, rhs[:, :, None])[:, :, 0]
+
+def train_als(R, n_factors=32, regularization=0.1, n_iterations=15, seed=0):
+    """
+    Factorize a sparse rating matrix with alternating least squares on the observed entries
+    Args:
+        R: csr_matrix of ratings, users x items
+        n_factors: Latent dimensions
+        regularization: L2 penalty, scaled by each user's / item's number of ratings
+        n_iterations: Full user + item sweeps
+        seed: Seed for the initial item factors
+    Returns:
+        dict: user_factors, item_factors and global_mean; ratings are modelled as
+            global_mean + user_factors @ item_factors.T
+    """
+    R = sparse.csr_matrix(R, dtype=np.float64)
+    global_mean = float(R.data.mean()) if R.nnz else 0.0
+    centered = R.copy()
+    centered.data -= global_mean
+    centered_T = centered.T.tocsr()
+
+    rng = np.random.default_rng(seed)
+    item_factors = rng.normal(scale=0.1, size=(R.shape[1], n_factors))
+    user_factors = np.zeros((R.shape[0], n_factors))
+    for _ in range(n_iterations):
+        user_factors = _solve_side(centered, item_factors, regularization)
+        item_factors = _solve_side(centered_T, user_factors, regularization)
+    return {'user_factors': user_factors, 'item_factors': item_factors, 'global_mean': global_mean}
+
+def rmse(model, R):
+    """
+    Root mean squared error of the model on the observed ratings of R (rows aligned with the model's users)
+    """
+    coo = R.tocoo()
+    predictions = model['global_mean'] + np.einsum(
+        'ij,ij->i', model['user_factors'][coo.row], model['item_factors'][coo.col]
+    )
+    return float(np.sqrt(np.mean((predictions - coo.data) ** 2)))
+
+def save_factors(model, user_ids, movie_ids, cf_dir=DEFAULT_CF_DIR, regularization=0.1):
+    """
+    Persist trained factors as .npy arrays plus a manifest
+    The new directory is fully written before it is renamed over the previous one
+    """
+    parent = os.path.dirname(os.path.abspath(cf_dir))
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = f'{cf_dir}.tmp'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    np.save(os.path.join(tmp_dir, 'user_factors.npy'), model['user_factors'])
+    np.save(os.path.join(tmp_dir, 'item_factors.npy'), model['item_factors'])
+    np.save(os.path.join(tmp_dir, 'user_ids.npy'), np.asarray(user_ids, dtype=np.int64))
+    np.save(os.path.join(tmp_dir, 'movie_ids.npy'), np.asarray(movie_ids, dtype=np.int64))
+    with open(os.path.join(tmp_dir, 'manifest.json'), 'w') as f:
+        json.dump({
+            'format_version': CF_FORMAT_VERSION,
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'global_mean': model['global_mean'],
+            'regularization': regularization,
+            'n_users': len(user_ids),
+            'n_movies': len(movie_ids),
+            'n_factors': model['item_factors'].shape[1],
+        }, f)
+    old_dir = f'{cf_dir}.old'
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if os.path.exists(cf_dir):
+        os.rename(cf_dir, old_dir)
+    os.rename(tmp_dir, cf_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+def factors_version(cf_dir=DEFAULT_CF_DIR):
+    """
+    Creation time of the saved factors, which changes with every save_factors; None if none were saved
+    """
+    try:
+        with open(os.path.join(cf_dir, 'manifest.json')) as f:
+            return json.load(f)['created_at']
+    except (FileNotFoundError, ValueError):
+        return None
+
+def load_factors(cf_dir=DEFAULT_CF_DIR):
+    """
+    Load persisted factors (memory-mapped)
+    Returns:
+        dict: Factors, ID arrays, movie ID -> column index and the manifest, or None if none were saved
+    """
+    manifest_path = os.path.join(cf_dir, 'manifest.json')
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    if manifest['format_version'] != CF_FORMAT_VERSION:
+        raise ValueError(f"Unsupported collaborative model format {manifest['format_version']} in {cf_dir}")
+
+    def load(name):
+        return np.load(os.path.join(cf_dir, f'{name}.npy'), mmap_mode='r')
+
+    movie_ids = load('movie_ids')
+    return {
+        'manifest': manifest,
+        'global_mean': manifest['global_mean'],
+        'user_factors': load('user_factors'),
+        'item_factors': load('item_factors'),
+        'user_ids': load('user_ids'),
+        'movie_ids': movie_ids,
+        'movie_to_column': {int(movie_id): column for column, movie_id in enumerate(movie_ids)},
+    }
+
+def fold_in_user(model, ratings, regularization=None):
+    """
+    Compute a user's factor vector from their current ratings against the fixed item factors
+    Works for users who joined or rated more movies after the last training run
+    Args:
+        model: Factors as returned by load_factors
+        ratings: Movie ID -> rating
+    Returns:
+        ndarray: The user's factor vector, or None if none of the movies are in the model
+    """
+    regularization = model['manifest']['regularization'] if regularization is None else regularization
+    pairs = [(model['movie_to_column'][int(movie_id)], rating) for movie_id, rating in ratings.items()
+             if int(movie_id) in model['movie_to_column']]
+    if not pairs:
+        return None
+    columns = np.array([column for column, _ in pairs])
+    values = np.array([rating for _, rating in pairs], dtype=np.float64) - model['global_mean']
+    V = np.asarray(model['item_factors'][columns])
+    gram = V.T @ V + regularization * len(pairs) * np.eye(V.shape[1])
+    return np.linalg.solve(gram, V.T @ values)
+
+def score_items(model, user_vector):
+    """
+    Predicted rating of every movie in the model for one user: a single matrix-vector product
+    """
+    return model['global_mean'] + np.asarray(model['item_factors']) @ user_vector
+
+def train_from_database(db, cf_dir=DEFAULT_CF_DIR, n_factors=32, regularization=0.1, n_iterations=15):
+    """
+    Offline batch job: train on the whole ratings table and persist the factors
+    Returns:
+        dict: Training summary, or None if there are no ratings
+    """
+    R, user_ids, movie_ids = load_ratings_matrix(db)
+    if R.nnz == 0:
+        print("No ratings to train on")
+        return None
+    n_factors = min(n_factors, *R.shape)
+    model = train_als(R, n_factors=n_factors, regularization=regularization, n_iterations=n_iterations)
+    save_factors(model, user_ids, movie_ids, cf_dir, regularization=regularization)
+    summary = {'n_users': R.shape[0], 'n_movies': R.shape[1], 'n_ratings': R.nnz, 'train_rmse': rmse(model, R)}
+    print(f"Trained collaborative model: {summary}")
+    return summary
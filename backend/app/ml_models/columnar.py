@@ -0,0 +1,204 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+
+SCHEMA_FILE = 'columns.json'
+
+def _is_missing(value):
+    return value is None or (isinstance(value, float) and np.isnan(value))
+
+def _infer_kind(series):
+    """
+    Pick the on-disk representation for a DataFrame column
+    Returns:
+        str: 'int', 'float', 'str', 'list_int' or 'list_str'
+    """
+    if pd.api.types.is_bool_dtype(series) or pd.api.types.is_integer_dtype(series):
+        return 'int'
+    if pd.api.types.is_float_dtype(series):
+        return 'float'
+    values = [value for value in series if not _is_missing(value)]
+    if values and all(isinstance(value, (list, tuple)) for value in values):
+        items = [item for value in values for item in value]
+        if all(isinstance(item, (int, np.integer)) and not isinstance(item, bool) for item in items):
+            return 'list_int'
+        return 'list_str'
+    return 'str'
+
+def _encode_strings(values):
+    """
+    Encode a sequence of optional strings as a UTF-8 byte buffer, row offsets and a validity mask
+    """
+    encoded = [b'' if _is_missing(value) else str(value).encode('utf-8') for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    data = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+    valid = np.array([not _is_missing(value) for value in values], dtype=bool)
+    return data, offsets, valid
+
+def write_table(df, directory):
+    """
+    Write a DataFrame as typed column arrays (.npy) that can be memory-mapped back
+    String columns become a byte buffer plus offsets, list columns add a second level of offsets
+    Args:
+        df: DataFrame to write
+        directory: Output directory, created if needed
+    Returns:
+        dict: Column name -> kind, as recorded in the directory's schema file
+    """
+    os.makedirs(directory, exist_ok=True)
+    schema = {}
+
+    def save(name, part, array):
+        np.save(os.path.join(directory, f'{name}.{part}.npy'), array)
+
+    for name in df.columns:
+        series = df[name]
+        kind = _infer_kind(series)
+        schema[name] = kind
+        if kind == 'int':
+            save(name, 'values', series.to_numpy(dtype=np.int64))
+        elif kind == 'float':
+            save(name, 'values', series.to_numpy(dtype=np.float64))
+        elif kind == 'str':
+            data, offsets, valid = _encode_strings(series.tolist())
+            save(name, 'data', data)
+            save(name, 'offsets', offsets)
+            save(name, 'valid', valid)
+        else:
+            lists = [[] if _is_missing(value) else list(value) for value in series]
+            list_offsets = np.zeros(len(lists) + 1, dtype=np.int64)
+            np.cumsum([len(value) for value in lists], out=list_offsets[1:])
+            save(name, 'list_offsets', list_offsets)
+            items = [item for value in lists for item in value]
+            if kind == 'list_int':
+                save(name, 'values', np.array(items, dtype=np.int64))
+            else:
+                data, offsets, _ = _encode_strings(items)
+                save(name, 'data', data)
+                save(name, 'offsets', offsets)
+
+    with open(os.path.join(directory, SCHEMA_FILE), 'w') as f:
+        json.dump({'n_rows': len(df), 'columns': schema}, f)
+    return schema
+
+class ColumnarTable:
+    """
+    Read-only table over a directory written by write_table.
+    Arrays are memory-mapped, so processes opening the same table share its pages,
+    and string/list values are only decoded for the rows that are actually requested.
+    """
+
+    def __init__(self, directory, mmap=True):
+        self.directory = directory
+        with open(os.path.join(directory, SCHEMA_FILE)) as f:
+            schema = json.load(f)
+        self.n_rows = schema['n_rows']
+        self.kinds = schema['columns']
+        self._mmap_mode = 'r' if mmap else None
+        self._arrays = {}
+
+    @property
+    def columns(self):
+        return list(self.kinds)
+
+    def __len__(self):
+        return self.n_rows
+
+    def __contains__(self, name):
+        return name in self.kinds
+
+    def _array(self, name, part):
+        key = (name, part)
+        if key not in self._arrays:
+            path = os.path.join(self.directory, f'{name}.{part}.npy')
+            self._arrays[key] = np.load(path, mmap_mode=self._mmap_mode)
+        return self._arrays[key]
+
+    def _string(self, name, i):
+        offsets = self._array(name, 'offsets')
+        return bytes(self._array(name, 'data')[offsets[i]:offsets[i + 1]]).decode('utf-8')
+
+    def _strings(self, name, positions):
+        """
+        Decode many strings of a column at once, slicing the byte buffer directly
+        """
+        positions = np.asarray(positions, dtype=np.int64)
+        offsets = self._array(name, 'offsets')
+        buffer = memoryview(self._array(name, 'data'))
+        return [
+            str(buffer[start:stop], 'utf-8')
+            for start, stop in zip(offsets[positions].tolist(), offsets[positions + 1].tolist())
+        ]
+
+    def _column_values(self, name, rows):
+        """
+        Decode a string or list column for the given rows
+        """
+        kind = self.kinds[name]
+        rows = np.asarray(rows, dtype=np.int64)
+        if kind == 'str':
+            valid = self._array(name, 'valid')[rows].tolist()
+            return [value if is_valid else None for value, is_valid in zip(self._strings(name, rows), valid)]
+        list_offsets = self._array(name, 'list_offsets')
+        starts, stops = list_offsets[rows].tolist(), list_offsets[rows + 1].tolist()
+        if kind == 'list_int':
+            values = self._array(name, 'values')
+            return [values[start:stop].tolist() for start, stop in zip(starts, stops)]
+        items = self._strings(name, np.concatenate([np.arange(start, stop) for start, stop in zip(starts, stops)] or [[]]))
+        lists, position = [], 0
+        for start, stop in zip(starts, stops):
+            lists.append(items[position:position + stop - start])
+            position += stop - start
+        return lists
+
+    def value(self, name, row):
+        """
+        Decode a single cell
+        """
+        kind = self.kinds[name]
+        if kind == 'int':
+            return int(self._array(name, 'values')[row])
+        if kind == 'float':
+            return float(self._array(name, 'values')[row])
+        if kind == 'str':
+            return self._string(name, row) if self._array(name, 'valid')[row] else None
+        list_offsets = self._array(name, 'list_offsets')
+        start, stop = list_offsets[row], list_offsets[row + 1]
+        if kind == 'list_int':
+            return [int(item) for item in self._array(name, 'values')[start:stop]]
+        return [self._string(name, i) for i in range(start, stop)]
+
+    def __getitem__(self, name):
+        """
+        Return a whole column: the mapped array for numeric columns, decoded values otherwise
+        """
+        if self.kinds[name] in ('int', 'float'):
+            return self._array(name, 'values')
+        return self._column_values(name, np.arange(self.n_rows))
+
+    def take(self, rows, columns=None):
+        """
+        Materialize selected rows as a DataFrame indexed by row position
+        Args:
+            rows: Row positions to read
+            columns: Columns to include (default: all)
+        Returns:
+            DataFrame: One row per requested position
+        """
+        rows = [int(row) for row in rows]
+        columns = self.columns if columns is None else columns
+        data = {}
+        for name in columns:
+            if self.kinds[name] in ('int', 'float'):
+                data[name] = self._array(name, 'values')[rows]
+            else:
+                data[name] = self._column_values(name, rows)
+        return pd.DataFrame(data, index=rows, columns=columns)
+
+    def to_dataframe(self, columns=None):
+        """
+        Materialize the whole table
+        """
+        return self.take(range(self.n_rows), columns)
@@ -0,0 +1,22 @@
+import sys
+import os
+import argparse
+# Add the backend directory to the path so we can import from app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from app.ml_models.catalog import convert_catalog
+
+DEFAULT_CSV_FILES = ['app/data/films.csv', 'app/data/top_rated_movies.csv', 'app/data/top_popular_movies.csv']
+
+def main():
+    """Convert the CSV catalogs into columnar catalogs that load without parsing"""
+    parser = argparse.ArgumentParser()
+    parser.add_argument('csv_files', nargs='*', default=DEFAULT_CSV_FILES)
+    args = parser.parse_args()
+    
+    for csv_file in args.csv_files:
+        directory = convert_catalog(csv_file)
+        print(f"{csv_file} -> {directory}")
+
+if __name__ == "__main__":
+    main()
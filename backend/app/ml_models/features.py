@@ -0,0 +1,145 @@
+import ast
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+def parse_list(value):
+    """
+    Normalize a list-valued cell (list, string representation of a list, or missing) to a list
+    Args:
+        value: Raw cell value, e.g. "['Tim Robbins', 'Morgan Freeman']" from a CSV
+    Returns:
+        list: The parsed list, or an empty list if the value is missing or malformed
+    """
+    if isinstance(value, list):
+        return value
+    if isinstance(value, (tuple, np.ndarray)):
+        return list(value)
+    if isinstance(value, str) and value.strip():
+        try:
+            parsed = ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            return []
+        if isinstance(parsed, (list, tuple)):
+            return list(parsed)
+    return []
+
+def feature_name(prefix, value):
+    """
+    Build the feature column name for a single token, e.g. cast_Tim_Robbins
+    """
+    return f'{prefix}_{str(value).replace(" ", "_").replace(".", "_")}'
+
+class MovieFeatureEncoder:
+    """
+    Multi-label one-hot encoder for the content features of a movie:
+    genres, original language, top cast members and director.
+
+    Each row is tokenized exactly once and all indicator columns are emitted
+    in a single pass as a sparse CSR matrix.
+    """
+
+    def __init__(self, max_cast=3):
+        self.max_cast = max_cast
+        self.vocabulary_ = {}
+        self.feature_names_ = []
+
+    def _row_tokens(self, genre_ids, original_language, cast, director):
+        """
+        List the feature names that are set for a single movie
+        """
+        tokens = [feature_name('genre', genre) for genre in parse_list(genre_ids)]
+        if pd.notna(original_language):
+            tokens.append(feature_name('lang', original_language))
+        tokens.extend(feature_name('cast', member) for member in parse_list(cast)[:self.max_cast])
+        if pd.notna(director):
+            tokens.append(feature_name('director', director))
+        return tokens
+
+    def _tokenize(self, movies):
+        """
+        Tokenize every row of a DataFrame of movies
+        """
+        def column(name):
+            return movies[name] if name in movies.columns else [None] * len(movies)
+
+        return [
+            self._row_tokens(genre_ids, lang, cast, director)
+            for genre_ids, lang, cast, director in zip(
+                column('genre_ids'), column('original_language'), column('cast'), column('director')
+            )
+        ]
+
+    def _encode(self, rows):
+        """
+        Emit the CSR matrix for tokenized rows, ignoring tokens outside the vocabulary
+        """
+        indptr = [0]
+        indices = []
+        for tokens in rows:
+            row = {self.vocabulary_[token] for token in tokens if token in self.vocabulary_}
+            indices.extend(sorted(row))
+            indptr.append(len(indices))
+        data = np.ones(len(indices), dtype=np.float64)
+        return sparse.csr_matrix((data, indices, indptr), shape=(len(rows), len(self.feature_names_)))
+
+    def _fit_tokens(self, rows):
+        self.vocabulary_ = {}
+        for tokens in rows:
+            for token in tokens:
+                if token not in self.vocabulary_:
+                    self.vocabulary_[token] = len(self.vocabulary_)
+        self.feature_names_ = list(self.vocabulary_)
+        return self
+
+    def fit(self, movies):
+        """
+        Learn the feature vocabulary from a DataFrame of movies
+        """
+        return self._fit_tokens(self._tokenize(movies))
+
+    def partial_fit(self, movies):
+        """
+        Add the tokens of new movies to the vocabulary, keeping every existing column index
+        """
+        for tokens in self._tokenize(movies):
+            for token in tokens:
+                if token not in self.vocabulary_:
+                    self.vocabulary_[token] = len(self.vocabulary_)
+                    self.feature_names_.append(token)
+        return self
+
+    def transform(self, movies):
+        """
+        Encode a DataFrame of movies against the learned vocabulary
+        Returns:
+            csr_matrix: One row per movie, one column per feature
+        """
+        return self._encode(self._tokenize(movies))
+
+    def fit_transform(self, movies):
+        """
+        Learn the vocabulary and encode the same movies, tokenizing each row once
+        """
+        rows = self._tokenize(movies)
+        self._fit_tokens(rows)
+        return self._encode(rows)
+
+    def transform_movie(self, movie):
+        """
+        Encode a single movie dict (e.g. from get_movie_data) by vocabulary lookups alone
+        Cost depends only on the movie's own tokens, never on catalog or vocabulary size
+        Returns:
+            ndarray: Sorted column indices of the movie's features
+        """
+        tokens = self._row_tokens(
+            movie.get('genre_ids'), movie.get('original_language'), movie.get('cast'), movie.get('director')
+        )
+        columns = {self.vocabulary_[token] for token in tokens if token in self.vocabulary_}
+        return np.array(sorted(columns), dtype=np.int32)
+
+    def tokens(self, prefix):
+        """
+        List the raw feature names in the vocabulary for one feature group (genre, lang, cast, director)
+        """
+        return [name for name in self.feature_names_ if name.startswith(f'{prefix}_')]
@@ -0,0 +1,133 @@
+import copy
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.preprocessing import StandardScaler
+
+from app.ml_models.features import parse_list
+from app.ml_models.neighbors import SparseBruteForceIndex, row_squared_norms
+
+def catalog_rows(movies):
+    """
+    Turn movie dicts (as returned by get_movie_data) into catalog rows shaped like the training CSV
+    Args:
+        movies: Iterable of movie dicts
+    Returns:
+        DataFrame: One row per movie, list columns parsed and dates as ISO strings
+    """
+    rows = []
+    for movie in movies:
+        row = dict(movie)
+        row['genre_ids'] = parse_list(row.get('genre_ids'))
+        row['cast'] = parse_list(row.get('cast'))
+        # get_movie_data leaves out the vote fields; training drops rows where they are missing
+        for field in ('vote_average', 'vote_count'):
+            if row.get(field) is None:
+                row[field] = 0
+        release_date = row.get('release_date')
+        if release_date is not None and not isinstance(release_date, str):
+            row['release_date'] = release_date.isoformat()
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+def _extend_scale(scale, X_binary, n_rows):
+    """
+    Scale for the columns added by new tokens, computed the way StandardScaler does over all rows
+    Existing columns keep their fitted scale so the stored rows and neighbor table stay valid
+    """
+    n_new_columns = X_binary.shape[1] - len(scale)
+    if n_new_columns == 0:
+        return np.asarray(scale, dtype=np.float64)
+    # Only appended rows can have the new tokens, so their counts come from the new rows alone
+    counts = np.bincount(X_binary.indices[X_binary.indices >= len(scale)] - len(scale), minlength=n_new_columns)
+    frequency = counts / n_rows
+    new_scale = np.sqrt(frequency * (1 - frequency))
+    new_scale[new_scale == 0] = 1.0
+    return np.concatenate([np.asarray(scale, dtype=np.float64), new_scale])
+
+def _merge_neighbors(old_indices, old_distances, X_old, old_norms, X_new, new_norms, first_new_row, batch_size=65536):
+    """
+    Let every existing row adopt appended rows that are closer than its current neighbors
+    """
+    n_neighbors = old_indices.shape[1]
+    indices = np.empty_like(old_indices)
+    distances = np.empty_like(old_distances)
+    new_rows = np.arange(first_new_row, first_new_row + X_new.shape[0], dtype=old_indices.dtype)
+    for start in range(0, X_old.shape[0], batch_size):
+        stop = min(start + batch_size, X_old.shape[0])
+        dots = (X_old[start:stop] @ X_new.T).toarray()
+        squared = np.maximum(old_norms[start:stop, None] + new_norms[None, :] - 2 * dots, 0)
+        all_distances = np.hstack([old_distances[start:stop], np.sqrt(squared).astype(old_distances.dtype)])
+        all_indices = np.hstack([old_indices[start:stop], np.broadcast_to(new_rows, squared.shape)])
+        # Stable sort keeps existing neighbors ahead of equally distant new ones
+        best = np.argsort(all_distances, axis=1, kind='stable')[:, :n_neighbors]
+        indices[start:stop] = np.take_along_axis(all_indices, best, axis=1)
+        distances[start:stop] = np.take_along_axis(all_distances, best, axis=1)
+    return indices, distances
+
+def append_movies(model_data, movies):
+    """
+    Append new movies to a trained model without refitting it
+    The vocabulary grows by the new tokens, the new rows are scaled with the fitted scale,
+    and the neighbor table is updated for both the new rows and the existing ones.
+    Args:
+        model_data: Model as returned by load_artifact
+        movies: DataFrame of new catalog rows (see catalog_rows)
+    Returns:
+        dict: Model data ready for save_artifact, or None if every movie is already in the catalog
+    """
+    catalog = model_data['movie_data']
+    known_ids = {int(movie_id) for movie_id in catalog['id']}
+    movies = movies.dropna(subset=['id']).drop_duplicates(subset='id')
+    movies = movies[~movies['id'].astype(int).isin(known_ids)].reset_index(drop=True)
+    if len(movies) == 0:
+        return None
+    movies['id'] = movies['id'].astype(int)
+
+    X_old = model_data['feature_matrix']
+    n_old = X_old.shape[0]
+    n_rows = n_old + len(movies)
+
+    encoder = copy.deepcopy(model_data['encoder'])
+    encoder.partial_fit(movies)
+    n_features = len(encoder.feature_names_)
+    X_binary = encoder.transform(movies)
+
+    scale = _extend_scale(model_data['scaler'].scale_, X_binary, n_rows)
+    X_new = sparse.csr_matrix(X_binary.multiply(1.0 / scale[None, :]))
+    # Old rows have no entries in the new columns, so widening them only changes the shape
+    X_old = sparse.csr_matrix((X_old.data, X_old.indices, X_old.indptr), shape=(n_old, n_features))
+    X = sparse.vstack([X_old, X_new]).tocsr()
+
+    scaler = StandardScaler(with_mean=False)
+    scaler.scale_ = scale
+    scaler.mean_ = None
+    scaler.var_ = None
+    scaler.n_features_in_ = n_features
+    scaler.n_samples_seen_ = n_rows
+
+    n_neighbors = model_data['manifest']['n_neighbors']
+    neighbor_indices, neighbor_distances = model_data['neighbor_indices'], model_data['neighbor_distances']
+    if neighbor_indices is not None:
+        norms = row_squared_norms(X)
+        knn = SparseBruteForceIndex(X, n_neighbors, squared_norms=norms)
+        new_distances, new_indices = knn.kneighbors(X_new, n_neighbors=neighbor_indices.shape[1])
+        old_indices, old_distances = _merge_neighbors(
+            np.asarray(neighbor_indices), np.asarray(neighbor_distances), X_old, norms[:n_old], X_new, norms[n_old:], n_old
+        )
+        neighbor_indices = np.vstack([old_indices, new_indices.astype(np.int32)])
+        neighbor_distances = np.vstack([old_distances, new_distances.astype(np.float32)])
+
+    movie_data = pd.concat([catalog.to_dataframe(), movies.reindex(columns=catalog.columns)], ignore_index=True)
+    return {
+        'scaler': scaler,
+        'feature_columns': encoder.feature_names_,
+        'feature_matrix': X,
+        'encoder': encoder,
+        'n_neighbors': n_neighbors,
+        'neighbor_indices': neighbor_indices,
+        'neighbor_distances': neighbor_distances,
+        'movie_data': movie_data,
+        'base_version': model_data['manifest'].get('base_version', model_data['version']),
+        'n_appended': model_data['manifest'].get('n_appended', 0) + len(movies),
+    }
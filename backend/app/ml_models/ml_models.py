@@ -1,31 +1,160 @@
 import pandas as pd
 import numpy as np
-from sklearn.neighbors import NearestNeighbors
+from scipy import sparse
 from sklearn.preprocessing import StandardScaler
 import sys
 import os
-import pickle
+import time
+import fcntl
+import threading
+from datetime import datetime, timezone
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
-from app.services.moviedata import get_movie_id_by_name,get_movie_data
+from app.services.moviedata import get_movie_data
+from app.services.title_index import resolve_movie_id
+from app.ml_models.features import MovieFeatureEncoder, parse_list
+from app.ml_models.neighbors import SparseBruteForceIndex
+from app.ml_models.artifact import DEFAULT_MODEL_DIR, save_artifact, load_artifact, current_version, prune_versions
+from app.ml_models.incremental import catalog_rows, append_movies
+from app.ml_models.catalog import load_catalog
 
-# Global variables to store the trained model and data
-_knn_model = None
-_scaler = None
-_feature_columns = None
-_movie_data = None
+# Nearest-neighbor backend for live queries: 'exact' (brute force), or 'pruned' for large catalogs,
+# which only scores candidate rows (see ann.PrunedIndex). It returns the exact neighbors unless
+# KNN_PRUNED_MAX_CANDIDATES caps the rows scored per query, trading recall for latency
+INDEX_BACKEND = os.getenv("KNN_INDEX_BACKEND", "exact")
+PRUNED_PARAMS = {
+    'max_postings': int(os.getenv("KNN_PRUNED_MAX_POSTINGS", 1000)),
+    'max_candidates': int(os.getenv("KNN_PRUNED_MAX_CANDIDATES")) if os.getenv("KNN_PRUNED_MAX_CANDIDATES") else None,
+}
 
-def train_and_save_model(csv_file='app/data/top_rated_movies.csv', model_file='app/ml_models/recommender_model.pkl'):
+# How often a serving process checks whether another process published a newer model
+MODEL_REFRESH_SECONDS = float(os.getenv("MODEL_REFRESH_SECONDS", 30))
+# Budget of one batch x n_movies distance block when precomputing the neighbor table
+NEIGHBOR_BLOCK_BYTES = int(float(os.getenv("NEIGHBOR_BLOCK_MB", 128)) * 1024 * 1024)
+# Versions kept on disk after an incremental update; older ones are deleted
+KEEP_VERSIONS = 3
+# ...but only once they have been retired for this long: other processes notice a new CURRENT
+# within MODEL_REFRESH_SECONDS and finish the requests still running on the old model after that
+RETIRED_GRACE_SECONDS = max(MODEL_REFRESH_SECONDS, float(os.getenv("MODEL_RETIRED_GRACE_SECONDS", 4 * MODEL_REFRESH_SECONDS)))
+
+# The model being served. Every piece of it (index, scaler, catalog, neighbor table) lives in
+# one dict that is replaced with a single assignment, so a request that took a reference keeps
+# a consistent model until it finishes, even while a new version is swapped in
+_model = None
+_model_checked_at = 0.0
+_update_lock = threading.Lock()
+
+def build_id_index(movie_data):
     """
-    Train the recommendation model and save it to disk
+    Map each TMDB movie ID to its row position in the movie data and feature matrix
+    """
+    return {int(movie_id): row for row, movie_id in enumerate(movie_data['id'])}
+
+def compute_neighbor_table(knn, X, n_neighbors=20, batch_size=1024, block_bytes=NEIGHBOR_BLOCK_BYTES):
+    """
+    Precompute the nearest neighbors of every catalog movie
+    Each kneighbors call builds a dense batch x n_movies distance block (float64) and holds about
+    four arrays of that size at its peak, so the batch is shrunk until one block fits block_bytes:
+    peak memory is roughly 4 * block_bytes however large the catalog is (838 rows at 20k movies,
+    16 rows at 1M movies with the 128 MB default)
+    Args:
+        knn: Fitted nearest-neighbor index
+        X: Scaled feature matrix the model was fitted on
+        n_neighbors: Neighbors to keep per movie (including the movie itself)
+        batch_size: Most rows per kneighbors call
+        block_bytes: Size budget of one distance block
+    Returns:
+        tuple: (indices, distances) as int32 / float32 arrays of shape (n_movies, n_neighbors)
+    """
+    n_neighbors = min(n_neighbors, X.shape[0])
+    indices = np.empty((X.shape[0], n_neighbors), dtype=np.int32)
+    distances = np.empty((X.shape[0], n_neighbors), dtype=np.float32)
+    batch_size = max(1, min(batch_size, block_bytes // (8 * max(1, X.shape[0]))))
+    for start in range(0, X.shape[0], batch_size):
+        stop = min(start + batch_size, X.shape[0])
+        batch_distances, batch_indices = knn.kneighbors(X[start:stop], n_neighbors=n_neighbors)
+        indices[start:stop] = batch_indices
+        distances[start:stop] = batch_distances
+    return indices, distances
+
+def feature_row(X, row):
+    """
+    Return one row of a CSR feature matrix as a 1 x n_features CSR matrix that views the parent's arrays
+    """
+    start, stop = X.indptr[row], X.indptr[row + 1]
+    return sparse.csr_matrix(
+        (X.data[start:stop], X.indices[start:stop], np.array([0, stop - start], dtype=X.indptr.dtype)),
+        shape=(1, X.shape[1]), copy=False
+    )
+
+def encode_movie(movie, encoder=None, scaler=None):
+    """
+    Turn a movie dict that is not in the catalog into a scaled 1 x n_features sparse row
+    Args:
+        movie: Movie data as returned by get_movie_data
+        encoder: Feature encoder (default: the loaded model's)
+        scaler: Fitted scaler (default: the loaded model's)
+    Returns:
+        csr_matrix: The movie's scaled features, aligned with the model's feature matrix
+    """
+    encoder = encoder or _model['encoder']
+    scaler = scaler or _model['scaler']
+    columns = encoder.transform_movie(movie)
+    # Same as scaler.transform on a one-hot row: each set feature becomes 1 / scale
+    data = 1.0 / np.asarray(scaler.scale_)[columns]
+    return sparse.csr_matrix(
+        (data, columns, np.array([0, len(columns)])), shape=(1, len(encoder.feature_names_))
+    )
+
+def _index_options():
+    """
+    Index backend settings passed to load_artifact
+    """
+    return {
+        'index_backend': INDEX_BACKEND,
+        'index_params': PRUNED_PARAMS if INDEX_BACKEND == 'pruned' else None,
+    }
+
+def _set_model(model_data, load_seconds=None):
+    """
+    Make a loaded model the one used by get_movie_recommendations
+    Everything is prepared first and then published with one assignment
+    """
+    global _model, _model_checked_at
+    
+    snapshot = dict(model_data)
+    snapshot['id_to_row'] = build_id_index(model_data['movie_data'])
+    snapshot['loaded_at'] = datetime.now(timezone.utc)
+    snapshot['load_seconds'] = load_seconds
+    _model = snapshot
+    _model_checked_at = time.monotonic()
+
+def current_model():
+    """
+    Return the model being served (None until one is loaded)
+    Read it once per request and use that reference throughout
+    """
+    return _model
+
+def train_and_save_model(csv_file='app/data/top_rated_movies.csv', model_dir=DEFAULT_MODEL_DIR,
+                         precompute_neighbors=True, n_neighbors=20, catalog=None, publish=True):
+    """
+    Train the recommendation model and save it to disk as a new artifact version
+    Args:
+        csv_file: Movie catalog to train on
+        catalog: Catalog DataFrame to train on instead of reading csv_file
+        publish: Publish the new version and serve it from this process; when False the
+            version is only written, for the registry to validate and publish
+        model_dir: Artifact directory; the new version is published as its CURRENT model
+        precompute_neighbors: Also compute and save the top-K neighbor table for every catalog movie
+        n_neighbors: Neighbors per movie in the model and the precomputed table
     """
-    global _knn_model, _scaler, _feature_columns, _movie_data
-    
     print("Training recommendation model...")
     
     # Load the data
-    df = pd.read_csv(csv_file)
+    # The columnar catalog stores lists as typed arrays, so nothing is parsed here
+    df = load_catalog(csv_file) if catalog is None else catalog.copy()
     
     print(f"Initial dataset shape: {df.shape}")
     print(f"Initial columns: {df.columns.tolist()}")
@@ -59,6 +188,8 @@ def train_and_save_model(csv_file='app/data/top_rated_movies.csv', model_file='a
     
     # Only drop rows with NaN in critical columns, but be more lenient
     df.dropna(subset=['id', 'title', 'vote_average', 'vote_count'], inplace=True)
+    # Keep index labels equal to row positions so they line up with the feature matrix
+    df.reset_index(drop=True, inplace=True)
     print(f"After dropna: {len(df)} rows")
     
     # Check if we have any data left
@@ -66,316 +197,396 @@ def train_and_save_model(csv_file='app/data/top_rated_movies.csv', model_file='a
         print("Error: No valid data remaining after cleaning. Please check your dataset.")
         return None
     
-    # Convert genre_ids from string to list and create genre features
-    # Handle empty genre_ids gracefully
-    df['genre_ids'] = df['genre_ids'].apply(lambda x: eval(x) if pd.notna(x) and x.strip() else [])
-    
-    # Create genre features (one-hot encoding for common genres)
-    all_genres = set()
-    for genres in df['genre_ids']:
-        all_genres.update(genres)
-    
-    # Create binary columns for each genre
-    for genre in all_genres:
-        df[f'genre_{genre}'] = df['genre_ids'].apply(lambda x: 1 if genre in x else 0)
-    
-    # Handle original language (one-hot encoding for common languages)
-    all_languages = set()
-    for lang in df['original_language']:
-        if pd.notna(lang):
-            all_languages.add(lang)
-    
-    # Create binary columns for each language
-    for lang in all_languages:
-        df[f'lang_{lang}'] = df['original_language'].apply(lambda x: 1 if x == lang else 0)
-    
-    # Handle cast members (one-hot encoding for top cast)
-    all_cast = set()
-    for cast_list in df['cast']:
-        if isinstance(cast_list, list):
-            all_cast.update(cast_list[:3])  # Top 3 cast members
-        elif isinstance(cast_list, str):
-            # Handle string representation of cast list
-            try:
-                cast_eval = eval(cast_list)
-                if isinstance(cast_eval, list):
-                    all_cast.update(cast_eval[:3])
-            except:
-                pass
-    
-    # Create binary columns for each cast member
-    for cast_member in all_cast:
-        df[f'cast_{cast_member.replace(" ", "_").replace(".", "_")}'] = df['cast'].apply(
-            lambda x: 1 if (isinstance(x, list) and cast_member in x) or 
-                       (isinstance(x, str) and cast_member in eval(x) if x else False) else 0
-        )
-    
-    # Handle directors (one-hot encoding for directors)
-    all_directors = set()
-    for director in df['director']:
-        if pd.notna(director):
-            all_directors.add(director)
-    
-    # Create binary columns for each director
-    for director in all_directors:
-        df[f'director_{director.replace(" ", "_").replace(".", "_")}'] = df['director'].apply(
-            lambda x: 1 if x == director else 0
-        )
-    
-    # Select features for KNN (pure content-based)
-    feature_columns = [f'genre_{genre}' for genre in all_genres] + \
-                     [f'lang_{lang}' for lang in all_languages] + \
-                     [f'cast_{cast_member.replace(" ", "_").replace(".", "_")}' for cast_member in all_cast] + \
-                     [f'director_{director.replace(" ", "_").replace(".", "_")}' for director in all_directors]
+    # Normalize the list columns (a no-op for the columnar catalog); the encoder and the saved movie data both reuse them
+    df['genre_ids'] = df['genre_ids'].apply(parse_list)
+    df['cast'] = df['cast'].apply(parse_list)
     
-    # Prepare features
-    X = df[feature_columns].values
+    # One-hot encode genres, language, top 3 cast members and director in a single pass
+    encoder = MovieFeatureEncoder(max_cast=3)
+    X = encoder.fit_transform(df)
+    feature_columns = encoder.feature_names_
     
     # Check if we have data to scale
-    if len(X) == 0:
+    if X.shape[1] == 0:
         print("Error: No data available for training. Please check your dataset.")
         return None
     
-    # Scale the features
-    scaler = StandardScaler()
-    X_scaled = scaler.fit_transform(X)
+    print(f"Feature matrix: {X.shape[0]} x {X.shape[1]}, {X.nnz} non-zeros")
     
-    # Fit KNN model
-    knn = NearestNeighbors(n_neighbors=20, algorithm='auto')
-    knn.fit(X_scaled)
+    # Scale the features without centering so the matrix stays sparse
+    # (centering is a translation, so Euclidean neighbors are unchanged)
+    scaler = StandardScaler(with_mean=False)
+    X_scaled = scaler.fit_transform(X).tocsr()
+    
+    # Fit KNN model; exact search over the sparse matrix without copying it
+    knn = SparseBruteForceIndex(X_scaled, n_neighbors=n_neighbors)
+    
+    # In-catalog queries only change on retrain, so answer them from a precomputed table
+    neighbor_indices, neighbor_distances = None, None
+    if precompute_neighbors:
+        neighbor_indices, neighbor_distances = compute_neighbor_table(knn, X_scaled, n_neighbors)
+        print(f"Precomputed neighbor table: {neighbor_indices.shape}")
     
     # Save the model and data
     model_data = {
         'knn_model': knn,
         'scaler': scaler,
         'feature_columns': feature_columns,
-        'movie_data': df,
-        'all_genres': list(all_genres),
-        'all_languages': list(all_languages),
-        'all_cast': list(all_cast),
-        'all_directors': list(all_directors)
+        'feature_matrix': X_scaled,
+        'encoder': encoder,
+        'n_neighbors': n_neighbors,
+        'neighbor_indices': neighbor_indices,
+        'neighbor_distances': neighbor_distances,
+        'movie_data': df
     }
-    
-    # Create directory if it doesn't exist
-    os.makedirs(os.path.dirname(model_file), exist_ok=True)
-    
-    with open(model_file, 'wb') as f:
-        pickle.dump(model_data, f)
-    
-    # Update global variables
-    _knn_model = knn
-    _scaler = scaler
-    _feature_columns = feature_columns
-    _movie_data = df
-    
-    print(f"Model saved to {model_file}")
+    version = save_artifact(model_data, model_dir, publish=publish)
+    
+    # Serve from the saved artifact so this process shares pages with the other workers
+    model_data = load_artifact(model_dir, version, **_index_options())
+    model_data.update({
+        'all_genres': encoder.tokens('genre'),
+        'all_languages': encoder.tokens('lang'),
+        'all_cast': encoder.tokens('cast'),
+        'all_directors': encoder.tokens('director')
+    })
+    if publish:
+        _set_model(model_data)
+    
+    print(f"Model saved to {os.path.join(model_dir, version)}")
     return model_data
 
-def load_model(model_file='app/ml_models/recommender_model.pkl'):
+def load_model(model_dir=DEFAULT_MODEL_DIR):
     """
-    Load the trained model from disk
+    Load the current model artifact from disk (memory-mapped)
+    Returns:
+        dict: The loaded model data, or None if no model has been trained yet
     """
-    global _knn_model, _scaler, _feature_columns, _movie_data
+    start = time.perf_counter()
+    model_data = load_artifact(model_dir, **_index_options())
+    if model_data is None:
+        print(f"No saved model found in {model_dir}. Train one with app/ml_models/train_model.py")
+        return None
     
-    if os.path.exists(model_file):
-        print("Loading trained model...")
-        with open(model_file, 'rb') as f:
-            model_data = pickle.load(f)
-        
-        _knn_model = model_data['knn_model']
-        _scaler = model_data['scaler']
-        _feature_columns = model_data['feature_columns']
-        _movie_data = model_data['movie_data']
-        
-        print("Model loaded successfully!")
-        return model_data
-    else:
-        print("No saved model found. Training new model...")
-        return train_and_save_model()
+    print(f"Loading trained model {model_data['version']}...")
+    load_seconds = time.perf_counter() - start
+    _set_model(model_data, load_seconds)
+    print(f"Model loaded successfully in {load_seconds:.3f}s!")
+    return model_data
 
-def get_movie_recommendations(movie_name, top_n=10):
+def ensure_model_loaded(model_dir=DEFAULT_MODEL_DIR):
     """
-    Get movie recommendations using the trained model
+    Load the model on first use, and switch to a newer published version when there is one
+    Returns:
+        bool: True if a model is ready to serve queries
+    """
+    global _model_checked_at
+    
+    if _model is None:
+        load_model(model_dir)
+    elif time.monotonic() - _model_checked_at > MODEL_REFRESH_SECONDS:
+        _model_checked_at = time.monotonic()
+        version = current_version(model_dir)
+        if version is not None and version != _model['version']:
+            print(f"Model {version} was published, reloading...")
+            load_model(model_dir)
+    return _model is not None
+
+class _ModelDirLock:
+    """
+    Serialize model updates across threads and processes sharing one artifact directory
     """
-    global _knn_model, _scaler, _feature_columns, _movie_data
     
-    # Load model if not already loaded
-    if _knn_model is None:
-        load_model()
+    def __init__(self, model_dir):
+        self.path = os.path.join(model_dir, '.update.lock')
     
-    # Get the movie ID for the input movie
-    movie_id = get_movie_id_by_name(movie_name)
+    def __enter__(self):
+        _update_lock.acquire()
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.file = open(self.path, 'w')
+        fcntl.flock(self.file, fcntl.LOCK_EX)
+        return self
     
-    if movie_id is None:
-        print(f"Movie '{movie_name}' not found in TMDB")
+    def __exit__(self, *exc):
+        fcntl.flock(self.file, fcntl.LOCK_UN)
+        self.file.close()
+        _update_lock.release()
+
+def add_movies_to_model(movies, model_dir=DEFAULT_MODEL_DIR):
+    """
+    Append new movies to the current model and publish the result as a new version
+    Existing columns, scales and neighbors are kept, so this costs one neighbor search per
+    new movie instead of a full retrain; run compact_model now and then to refit everything.
+    Args:
+        movies: Movie dicts as returned by get_movie_data
+        model_dir: Artifact directory
+    Returns:
+        str: The published version, or None if nothing was added
+    """
+    movies = [movie for movie in movies if movie]
+    if not movies:
         return None
     
-    # Check if movie is in our dataset
-    movie_in_dataset = _movie_data[_movie_data['id'] == movie_id]
-    
-    if len(movie_in_dataset) == 0:
-        # Movie not in dataset, fetch it from TMDB
-        print(f"Movie '{movie_name}' not in dataset, fetching from TMDB...")
-        movie_data = get_movie_data(movie_id)
-        
-        if movie_data is None:
-            print(f"Could not fetch data for '{movie_name}'")
+    with _ModelDirLock(model_dir):
+        # Always start from the latest published version, another process may have added to it
+        model_data = load_artifact(model_dir)
+        if model_data is None:
+            print(f"No saved model found in {model_dir}, cannot add movies")
             return None
         
-        # Create a temporary dataframe with the new movie
-        temp_df = pd.DataFrame([movie_data])
-        temp_df['genre_ids'] = temp_df['genre_ids'].apply(lambda x: x if isinstance(x, list) else [])
-        
-        # Add genre features for the new movie
-        all_genres = set()
-        for genres in _movie_data['genre_ids']:
-            all_genres.update(genres)
-        
-        for genre in all_genres:
-            temp_df[f'genre_{genre}'] = temp_df['genre_ids'].apply(lambda x: 1 if genre in x else 0)
-        
-        # Add language features for the new movie
-        all_languages = set()
-        for lang in _movie_data['original_language']:
-            if pd.notna(lang):
-                all_languages.add(lang)
-        
-        for lang in all_languages:
-            temp_df[f'lang_{lang}'] = temp_df['original_language'].apply(lambda x: 1 if x == lang else 0)
-        
-        # Add cast features for the new movie
-        all_cast = set()
-        for cast_list in _movie_data['cast']:
-            if isinstance(cast_list, list):
-                all_cast.update(cast_list[:3])
-        
-        for cast_member in all_cast:
-            temp_df[f'cast_{cast_member.replace(" ", "_").replace(".", "_")}'] = temp_df['cast'].apply(
-                lambda x: 1 if isinstance(x, list) and cast_member in x else 0
-            )
-        
-        # Add director features for the new movie
-        all_directors = set()
-        for director in _movie_data['director']:
-            if pd.notna(director):
-                all_directors.add(director)
-        
-        for director in all_directors:
-            temp_df[f'director_{director.replace(" ", "_").replace(".", "_")}' ] = temp_df['director'].apply(
-                lambda x: 1 if x == director else 0
-            )
-        
-        # Ensure all required feature columns exist
-        missing_cols = [col for col in _feature_columns if col not in temp_df.columns]
-        if missing_cols:
-            # Create a DataFrame with the same index and all missing columns set to 0
-            missing_df = pd.DataFrame(0, index=temp_df.index, columns=missing_cols)
-            temp_df = pd.concat([temp_df, missing_df], axis=1)
-        # Only keep the columns the model expects
-        temp_df = temp_df[_feature_columns]
-        
-        # Get features for the new movie
-        try:
-            movie_features = temp_df[_feature_columns].values
-            # Check if we have valid features
-            if len(movie_features) == 0 or movie_features.shape[1] == 0:
-                print(f"Error: No valid features found for '{movie_name}'")
-                return None
-            
-            # Scale the features
-            movie_features_scaled = _scaler.transform(movie_features)
-        except KeyError as e:
-            print(f"Error: Missing feature columns for '{movie_name}': {e}")
-            return None
-        except Exception as e:
-            print(f"Error processing features for '{movie_name}': {e}")
-            return None
-        
-        # Get recommendations
-        distances, indices = _knn_model.kneighbors(movie_features_scaled)
-        
-        # Handle indices - it's a 2D array, we want the first row
-        indices = indices[0]
-        
-    else:
-        # Movie is in dataset
-        movie_idx = movie_in_dataset.index[0]
-        
-        # Get the features for the input movie
-        try:
-            movie_features = _movie_data.iloc[movie_idx][_feature_columns].values.reshape(1, -1)
-            
-            # Check if we have valid features
-            if len(movie_features) == 0 or movie_features.shape[1] == 0:
-                print(f"Error: No valid features found for '{movie_name}'")
-                return None
-            
-            # Scale the features
-            movie_features_scaled = _scaler.transform(movie_features)
-        except KeyError as e:
-            print(f"Error: Missing feature columns for '{movie_name}': {e}")
+        start = time.perf_counter()
+        updated = append_movies(model_data, catalog_rows(movies))
+        if updated is None:
             return None
-        except Exception as e:
-            print(f"Error processing features for '{movie_name}': {e}")
+        version = save_artifact(updated, model_dir)
+        prune_versions(model_dir, keep=KEEP_VERSIONS, grace_seconds=RETIRED_GRACE_SECONDS)
+    
+    print(f"Added {len(updated['movie_data']) - len(model_data['movie_data'])} movies to the model in "
+          f"{time.perf_counter() - start:.2f}s, published {version}")
+    load_model(model_dir)
+    return version
+
+def add_movie_ids_to_model(movie_ids, model_dir=DEFAULT_MODEL_DIR):
+    """
+    Fetch movies missing from the model from TMDB and append them (see add_movies_to_model)
+    """
+    ensure_model_loaded(model_dir)
+    known = _model['id_to_row'] if _model is not None else {}
+    missing = [int(movie_id) for movie_id in dict.fromkeys(movie_ids) if movie_id is not None and int(movie_id) not in known]
+    if not missing:
+        return None
+    return add_movies_to_model([get_movie_data(movie_id) for movie_id in missing], model_dir)
+
+def compact_model(model_dir=DEFAULT_MODEL_DIR):
+    """
+    Fully retrain on the current catalog, including every incrementally added movie
+    Refits the vocabulary order and the scaling, which incremental updates leave as they were
+    """
+    with _ModelDirLock(model_dir):
+        model_data = load_artifact(model_dir)
+        if model_data is None:
+            print(f"No saved model found in {model_dir}, nothing to compact")
             return None
+        print(f"Compacting model {model_data['version']} ({model_data['manifest'].get('n_appended', 0)} appended movies)")
+        result = train_and_save_model(
+            model_dir=model_dir, n_neighbors=model_data['manifest']['n_neighbors'],
+            precompute_neighbors=model_data['neighbor_indices'] is not None,
+            catalog=model_data['movie_data'].to_dataframe()
+        )
+        prune_versions(model_dir, keep=KEEP_VERSIONS, grace_seconds=RETIRED_GRACE_SECONDS)
+    return result
+
+def model_status():
+    """
+    Describe the currently loaded model for readiness checks
+    """
+    model = _model
+    if model is None:
+        return {'loaded': False, 'version': None, 'n_movies': 0, 'loaded_at': None, 'load_seconds': None}
+    return {
+        'loaded': True,
+        'version': model['version'],
+        'n_movies': len(model['movie_data']),
+        'loaded_at': model['loaded_at'].isoformat(),
+        'load_seconds': model['load_seconds'],
+    }
+
+def _recommended_movies(movie_data, indices):
+    """
+    Build the result DataFrame (indexed by catalog row) for a set of recommended rows
+    """
+    # Define all the fields we want to return
+    base_fields = ['id', 'title', 'vote_average', 'vote_count', 'genre_ids', 'poster_path']
+    additional_fields = ['backdrop_path', 'release_date', 'overview', 'tagline', 'director']
+    
+    # Check which additional fields exist in the dataset
+    available_fields = base_fields.copy()
+    for field in additional_fields:
+        if field in movie_data.columns:
+            available_fields.append(field)
+    
+    recommended_movies = movie_data.take(indices, available_fields)
+    
+    # For any missing fields, try to fetch from TMDB API
+    missing_fields = set(additional_fields) - set(movie_data.columns)
+    if missing_fields:
+        print(f"Fetching missing fields from TMDB: {missing_fields}")
+        # Initialize missing columns
+        for field in missing_fields:
+            recommended_movies[field] = None
         
-        # Get the recommendations
-        distances, indices = _knn_model.kneighbors(movie_features_scaled)
-        
-        # Handle indices - it's a 2D array, we want the first row
-        indices = indices[0]
-        
-        # Remove the movie itself from recommendations (it's the first neighbor)
-        indices = indices[1:]  # Skip the first one (the movie itself)
+        # Add missing fields by fetching from TMDB
+        for idx, row in recommended_movies.iterrows():
+            movie_id = row['id']
+            tmdb_data = get_movie_data(movie_id)
+            if tmdb_data:
+                for field in missing_fields:
+                    recommended_movies.loc[idx, field] = tmdb_data.get(field, None)
+    
+    return recommended_movies
+
+def get_movie_recommendations_batch(movie_ids, top_n=10):
+    """
+    Get recommendations for several source movies at once
+    Catalog movies are answered from the precomputed neighbor table; everything else
+    is stacked into a single sparse query matrix and searched with one kneighbors call
+    Args:
+        movie_ids: TMDB IDs of the source movies
+        top_n: Number of recommendations per source movie
+    Returns:
+        dict: Source movie ID -> DataFrame of recommended movies, or None if none could be made
+    """
+    movie_ids = list(dict.fromkeys(int(movie_id) for movie_id in movie_ids))
+    results = {movie_id: None for movie_id in movie_ids}
     
-    # Check if we have any recommendations
-    if len(indices) == 0:
+    # Load model if not already loaded
+    if not ensure_model_loaded():
+        print("Recommendation model is not available")
+        return results
+    # Use one model for the whole request, even if a new version is swapped in meanwhile
+    model = current_model()
+    id_to_row, neighbor_table = model['id_to_row'], model['neighbor_indices']
+    
+    neighbor_rows = {}
+    query_ids, query_rows, query_features = [], [], []
+    for movie_id in movie_ids:
+        movie_idx = id_to_row.get(movie_id)
+        
+        if movie_idx is not None and neighbor_table is not None and top_n < neighbor_table.shape[1]:
+            # Precomputed at training time; drop the movie itself wherever ties placed it
+            indices = neighbor_table[movie_idx]
+            neighbor_rows[movie_id] = indices[indices != movie_idx][:top_n]
+        elif movie_idx is not None:
+            # The stored feature matrix is already scaled and row-aligned with the movie data
+            query_ids.append(movie_id)
+            query_rows.append(movie_idx)
+            query_features.append(feature_row(model['feature_matrix'], movie_idx))
+        else:
+            # Movie not in dataset, fetch it from TMDB
+            print(f"Movie {movie_id} not in dataset, fetching from TMDB...")
+            movie_data = get_movie_data(movie_id)
+            if movie_data is None:
+                print(f"Could not fetch data for movie {movie_id}")
+                continue
+            try:
+                query_features.append(encode_movie(movie_data, model['encoder'], model['scaler']))
+            except Exception as e:
+                print(f"Error processing features for movie {movie_id}: {e}")
+                continue
+            query_ids.append(movie_id)
+            query_rows.append(None)
+    
+    if query_features:
+        # One neighbor query for every source that is not in the precomputed table
+        distances, indices = model['knn_model'].kneighbors(sparse.vstack(query_features).tocsr(), n_neighbors=top_n + 1)
+        for movie_id, movie_idx, neighbors in zip(query_ids, query_rows, indices):
+            if movie_idx is not None:
+                # Remove the movie itself from its own recommendations
+                neighbors = neighbors[neighbors != movie_idx]
+            neighbor_rows[movie_id] = neighbors[:top_n]
+    
+    neighbor_rows = {movie_id: rows for movie_id, rows in neighbor_rows.items() if len(rows) > 0}
+    if not neighbor_rows:
         print("No recommendations found")
-        return None
+        return results
     
-    # Get the recommended movies with all available fields
+    # Decode metadata once for every recommended row, then slice it per source movie
     try:
-        # Define all the fields we want to return
-        base_fields = ['id', 'title', 'vote_average', 'vote_count', 'genre_ids', 'poster_path']
-        additional_fields = ['backdrop_path', 'release_date', 'overview', 'tagline', 'director']
-        
-        # Check which additional fields exist in the dataset
-        available_fields = base_fields.copy()
-        for field in additional_fields:
-            if field in _movie_data.columns:
-                available_fields.append(field)
-        
-        recommended_movies = _movie_data.iloc[indices][available_fields]
-        
-        # For any missing fields, try to fetch from TMDB API
-        missing_fields = set(additional_fields) - set(_movie_data.columns)
-        if missing_fields:
-            print(f"Fetching missing fields from TMDB: {missing_fields}")
-            # Initialize missing columns
-            for field in missing_fields:
-                recommended_movies[field] = None
-            
-            # Add missing fields by fetching from TMDB
-            for idx, row in recommended_movies.iterrows():
-                movie_id = row['id']
-                tmdb_data = get_movie_data(movie_id)
-                if tmdb_data:
-                    for field in missing_fields:
-                        recommended_movies.loc[idx, field] = tmdb_data.get(field, None)
-        
-        return recommended_movies
+        recommended_movies = _recommended_movies(model['movie_data'], np.unique(np.concatenate(list(neighbor_rows.values()))))
     except Exception as e:
         print(f"Error getting recommended movies: {e}")
+        return results
+    
+    for movie_id, rows in neighbor_rows.items():
+        results[movie_id] = recommended_movies.loc[rows]
+    return results
+
+def get_catalog_movies(movie_ids):
+    """
+    Look up catalog metadata for movies by TMDB ID, in the given order
+    Returns:
+        DataFrame: One row per movie that is in the catalog (others are skipped), or None if no model is loaded
+    """
+    if not ensure_model_loaded():
+        return None
+    model = current_model()
+    rows = [model['id_to_row'][int(movie_id)] for movie_id in movie_ids if int(movie_id) in model['id_to_row']]
+    return _recommended_movies(model['movie_data'], rows).reset_index(drop=True)
+
+def get_profile_recommendations(movie_weights, top_n=10, exclude_ids=()):
+    """
+    Recommend movies close to a taste profile: the weighted average of several catalog movies
+    Builds one profile vector and runs a single neighbor query, however many movies it is built from
+    Args:
+        movie_weights: TMDB movie ID -> weight (e.g. the user's rating); movies outside the catalog are skipped
+        top_n: Number of recommendations
+        exclude_ids: TMDB IDs never to recommend (e.g. everything the user has rated)
+    Returns:
+        DataFrame: Recommended movies with their distance to the profile and the ID of the
+            weighted movie closest to each one, or None if no weighted movie is in the catalog
+    """
+    if not ensure_model_loaded():
+        print("Recommendation model is not available")
         return None
+    model = current_model()
+    id_to_row, X = model['id_to_row'], model['feature_matrix']
+    
+    sources = [(id_to_row[int(movie_id)], weight) for movie_id, weight in movie_weights.items()
+               if int(movie_id) in id_to_row and weight > 0]
+    if not sources:
+        print("None of the profile movies are in the model's catalog")
+        return None
+    rows = np.array([row for row, _ in sources])
+    weights = np.array([weight for _, weight in sources], dtype=np.float64)
+    
+    # Weighted mean of the source rows, as one sparse row-vector product
+    weight_vector = sparse.csr_matrix((weights / weights.sum(), (np.zeros(len(rows), dtype=np.int64), rows)), shape=(1, X.shape[0]))
+    profile = (weight_vector @ X).tocsr()
+    
+    # Ask for enough extra neighbors to cover every excluded movie that could come first
+    excluded_rows = {id_to_row[int(movie_id)] for movie_id in exclude_ids if int(movie_id) in id_to_row}
+    n_neighbors = min(top_n + len(excluded_rows), X.shape[0])
+    distances, indices = model['knn_model'].kneighbors(profile, n_neighbors=n_neighbors)
+    keep = np.array([row not in excluded_rows for row in indices[0]], dtype=bool)
+    best_rows, best_distances = indices[0][keep][:top_n], distances[0][keep][:top_n]
+    if len(best_rows) == 0:
+        return None
+    
+    recommended_movies = _recommended_movies(model['movie_data'], best_rows)
+    recommended_movies['distance'] = best_distances
+    # Attribute each recommendation to the source movie most similar to it
+    similarity = (X[rows] @ X[best_rows].T).toarray()
+    source_ids = np.asarray(model['movie_data']['id'])[rows]
+    recommended_movies['closest_source_id'] = source_ids[similarity.argmax(axis=0)]
+    return recommended_movies
 
-# Initialize model on import
-try:
-    load_model()
-except Exception as e:
-    print(f"Could not load model: {e}")
-    print("Model will be trained on first use.")
+def get_movie_recommendations_by_id(movie_id, top_n=10):
+    """
+    Get movie recommendations for a TMDB movie ID using the trained model
+    Catalog movies need no TMDB call at all; use this whenever the ID is already known
+    Args:
+        movie_id: TMDB ID of the source movie
+        top_n: Number of recommendations
+    Returns:
+        DataFrame: Recommended movies, or None if none could be made
+    """
+    return get_movie_recommendations_batch([movie_id], top_n=top_n)[int(movie_id)]
+
+def get_movie_recommendations(movie_name, top_n=10, year=None):
+    """
+    Get movie recommendations for a title using the trained model
+    The title is resolved with the local title index (TMDB search on a miss), which may pick a
+    different film of the same name unless year is given; prefer get_movie_recommendations_by_id
+    when the ID is known
+    """
+    # Get the movie ID for the input movie
+    movie_id = resolve_movie_id(movie_name, year=year)
+    
+    if movie_id is None:
+        print(f"Movie '{movie_name}' not found in TMDB")
+        return None
+    
+    return get_movie_recommendations_by_id(movie_id, top_n=top_n)
 
 #res = get_movie_recommendations("The Dark Knight")
 #res = get_movie_recommendations("Society of the Snow")
 #print(res.head())
-    
\ No newline at end of file
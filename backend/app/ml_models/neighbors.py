@@ -0,0 +1,47 @@
+import numpy as np
+from scipy import sparse
+
+def row_squared_norms(X):
+    """
+    Squared Euclidean norm of every row of a CSR matrix
+    """
+    return np.asarray(X.multiply(X).sum(axis=1)).ravel()
+
+class SparseBruteForceIndex:
+    """
+    Exact Euclidean nearest neighbors over a sparse CSR matrix.
+
+    Unlike sklearn's NearestNeighbors this never copies the indexed matrix, so it can
+    serve queries directly from memory-mapped feature arrays shared between workers.
+    """
+
+    def __init__(self, X, n_neighbors=20, squared_norms=None):
+        self.X = sparse.csr_matrix(X, copy=False)
+        self.n_neighbors = n_neighbors
+        self.squared_norms = row_squared_norms(self.X) if squared_norms is None else squared_norms
+
+    def kneighbors(self, queries, n_neighbors=None):
+        """
+        Find the nearest indexed rows for each query row
+        Args:
+            queries: Sparse (or dense) matrix of scaled query features, one row per query
+            n_neighbors: Neighbors per query (default: the index's n_neighbors)
+        Returns:
+            tuple: (distances, indices), each of shape (n_queries, n_neighbors), closest first
+        """
+        n_neighbors = min(n_neighbors or self.n_neighbors, self.X.shape[0])
+        queries = sparse.csr_matrix(queries)
+        # ||q - x||^2 = ||q||^2 + ||x||^2 - 2 q.x, computed as X @ Q^T so X is used as stored
+        dots = np.asarray((self.X @ queries.T).todense()).T
+        squared = row_squared_norms(queries)[:, None] + self.squared_norms[None, :] - 2 * dots
+        np.maximum(squared, 0, out=squared)
+
+        if n_neighbors < squared.shape[1]:
+            candidates = np.argpartition(squared, n_neighbors - 1, axis=1)[:, :n_neighbors]
+        else:
+            candidates = np.tile(np.arange(squared.shape[1]), (squared.shape[0], 1))
+        candidate_distances = np.take_along_axis(squared, candidates, axis=1)
+        order = np.argsort(candidate_distances, axis=1, kind='stable')
+        indices = np.take_along_axis(candidates, order, axis=1)
+        distances = np.sqrt(np.take_along_axis(candidate_distances, order, axis=1))
+        return distances, indices
@@ -0,0 +1,183 @@
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+import numpy as np
+
+from app.ml_models import ml_models
+from app.ml_models.artifact import (
+    DEFAULT_MODEL_DIR, load_artifact, save_artifact, publish_version, list_versions, current_version, discard_version
+)
+from app.ml_models.ml_models import feature_row
+from app.ml_models.incremental import append_movies
+
+# A new version may not shrink the catalog below this fraction of the one being served
+MIN_CATALOG_RATIO = 0.5
+# Catalog rows spot-checked against the new index before it is published
+VALIDATION_SAMPLE = 20
+
+_executor = None
+_job_lock = threading.Lock()
+_job = {'state': 'idle', 'version': None, 'started_at': None, 'finished_at': None, 'error': None}
+
+def _train_in_subprocess(csv_file, model_dir):
+    """
+    Entry point of the training process: write a new, unpublished version
+    Like compact_model it retrains on the published catalog, so movies added incrementally are
+    kept; csv_file is only used when nothing has been published yet
+    Returns:
+        tuple: (new version, version whose catalog it was trained on)
+    """
+    serving = load_artifact(model_dir)
+    if serving is None:
+        model_data = ml_models.train_and_save_model(csv_file=csv_file, model_dir=model_dir, publish=False)
+    else:
+        model_data = ml_models.train_and_save_model(
+            model_dir=model_dir, n_neighbors=serving['manifest']['n_neighbors'],
+            precompute_neighbors=serving['neighbor_indices'] is not None,
+            catalog=serving['movie_data'].to_dataframe(), publish=False
+        )
+    if model_data is None:
+        return None, None
+    return model_data['version'], serving['version'] if serving is not None else None
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        # spawn: the child must not inherit the serving process's threads or open database handles
+        _executor = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn'))
+    return _executor
+
+def validate_model(model_data, serving=None):
+    """
+    Sanity-check a freshly trained model before it replaces the one being served
+    Args:
+        model_data: Model as returned by load_artifact
+        serving: The model currently served, if any
+    Returns:
+        list: Problems found; empty if the model can be published
+    """
+    problems = []
+    X = model_data['feature_matrix']
+    movie_data = model_data['movie_data']
+    n_movies = X.shape[0]
+    if n_movies == 0:
+        return ["model has no movies"]
+    if len(movie_data) != n_movies:
+        problems.append(f"movie table has {len(movie_data)} rows but the feature matrix has {n_movies}")
+    ids = np.asarray(movie_data['id'])
+    if len(np.unique(ids)) != len(ids):
+        problems.append("movie ids are not unique")
+    neighbors = model_data['neighbor_indices']
+    if neighbors is not None and (neighbors.shape[0] != n_movies or neighbors.max() >= n_movies):
+        problems.append(f"neighbor table {neighbors.shape} does not match {n_movies} movies")
+    if serving is not None and n_movies < MIN_CATALOG_RATIO * len(serving['movie_data']):
+        problems.append(f"catalog shrank from {len(serving['movie_data'])} to {n_movies} movies")
+
+    # Every movie should come back as (one of) its own nearest neighbors
+    rows = np.random.default_rng(0).choice(n_movies, size=min(VALIDATION_SAMPLE, n_movies), replace=False)
+    for row in rows:
+        distances, _ = model_data['knn_model'].kneighbors(feature_row(X, row), n_neighbors=1)
+        if distances[0, 0] > 1e-6:
+            problems.append(f"movie at row {row} is not its own nearest neighbor")
+            break
+    return problems
+
+def _set_job(**fields):
+    with _job_lock:
+        _job.update(fields)
+
+def _catch_up(model_dir, version, trained_on):
+    """
+    Append the movies published since training started to the retrained version
+    Must hold the model directory lock
+    Returns:
+        str: The version to publish; the retrained one is discarded if it had to be extended
+    """
+    latest = load_artifact(model_dir)
+    if latest is None or latest['version'] == trained_on:
+        return version
+    retrained = load_artifact(model_dir, version)
+    updated = append_movies(retrained, latest['movie_data'].to_dataframe())
+    if updated is None:
+        return version
+    caught_up = save_artifact(updated, model_dir, publish=False)
+    print(f"Added {len(updated['movie_data']) - len(retrained['movie_data'])} movies published "
+          f"while {version} was training, as {caught_up}")
+    discard_version(model_dir, version)
+    return caught_up
+
+def _finish_retraining(future, model_dir):
+    """
+    Validate the version the training process wrote and swap it in
+    """
+    try:
+        version, trained_on = future.result()
+        if version is None:
+            raise RuntimeError("training produced no model")
+        _set_job(state='validating', version=version)
+        problems = validate_model(load_artifact(model_dir, version), ml_models.current_model())
+        if problems:
+            # Never published, so prune_versions would keep it forever
+            discard_version(model_dir, version)
+            raise RuntimeError(f"validation failed: {'; '.join(problems)}")
+        # Same lock as incremental updates and compaction, so none of them can publish in between
+        with ml_models._ModelDirLock(model_dir):
+            version = _catch_up(model_dir, version, trained_on)
+            publish_version(model_dir, version)
+            ml_models.load_model(model_dir)
+        print(f"Published and swapped in model {version}")
+        _set_job(state='published', version=version, finished_at=datetime.now(timezone.utc))
+    except Exception as e:
+        print(f"Model retraining failed: {e}")
+        _set_job(state='failed', error=str(e), finished_at=datetime.now(timezone.utc))
+
+def start_retraining(csv_file='app/data/films.csv', model_dir=DEFAULT_MODEL_DIR):
+    """
+    Retrain the published catalog in a background process; the new version is published only
+    if it validates. Requests keep being served by the current model the whole time
+    Args:
+        csv_file: Catalog to train on when no model has been published yet
+        model_dir: Artifact directory
+    Returns:
+        dict: Job status (see retraining_status); unchanged if a job is already running
+    """
+    with _job_lock:
+        if _job['state'] in ('training', 'validating'):
+            return dict(_job)
+        _job.update(state='training', version=None, error=None,
+                    started_at=datetime.now(timezone.utc), finished_at=None)
+    future = _get_executor().submit(_train_in_subprocess, csv_file, model_dir)
+    future.add_done_callback(lambda done: _finish_retraining(done, model_dir))
+    return retraining_status()
+
+def retraining_status():
+    """
+    State of the latest retraining job: idle, training, validating, published or failed
+    """
+    with _job_lock:
+        job = dict(_job)
+    for field in ('started_at', 'finished_at'):
+        if job[field] is not None:
+            job[field] = job[field].isoformat()
+    return job
+
+def reload_model(model_dir=DEFAULT_MODEL_DIR):
+    """
+    Swap in whatever version CURRENT points at
+    Returns:
+        dict: The served model's status after the reload
+    """
+    ml_models.load_model(model_dir)
+    return ml_models.model_status()
+
+def registry_status(model_dir=DEFAULT_MODEL_DIR):
+    """
+    Served model, published version, versions on disk and the retraining job
+    """
+    return {
+        'serving': ml_models.model_status(),
+        'current_version': current_version(model_dir),
+        'versions': list_versions(model_dir),
+        'retraining': retraining_status(),
+    }
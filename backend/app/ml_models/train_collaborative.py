@@ -0,0 +1,32 @@
+import sys
+import os
+import argparse
+# Add the backend directory to the path so we can import from app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from app.database import SessionLocal
+from app.ml_models.collaborative import train_from_database
+
+def main():
+    """Train the collaborative-filtering factors on the ratings table and save them"""
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--factors', type=int, default=32)
+    parser.add_argument('--regularization', type=float, default=0.1)
+    parser.add_argument('--iterations', type=int, default=15)
+    args = parser.parse_args()
+    
+    db = SessionLocal()
+    try:
+        summary = train_from_database(
+            db, n_factors=args.factors, regularization=args.regularization, n_iterations=args.iterations
+        )
+    finally:
+        db.close()
+    
+    if summary is None:
+        print("❌ Collaborative model training failed!")
+        return
+    print("Collaborative model training completed successfully!")
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,7 @@ import os
 # Add the backend directory to the path so we can import from app
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
-from app.ml_models.ml_models import train_and_save_model, get_movie_recommendations
+from app.ml_models.ml_models import train_and_save_model, get_movie_recommendations_by_id
 
 def main():
     """Train and save the recommendation model"""
@@ -25,8 +25,10 @@ def main():
         print(f"Cast members included: {len(model_data.get('all_cast', []))}")
         print(f"Directors included: {len(model_data.get('all_directors', []))}")
         
-        print("\nTesting model with poster_path...")
-        test_recommendations = get_movie_recommendations("The Shawshank Redemption", top_n=3)
+        # Query with a movie from the training catalog so the test needs no TMDB call
+        test_movie_id = model_data['movie_data']['id'][0]
+        print(f"\nTesting model with poster_path (movie {test_movie_id})...")
+        test_recommendations = get_movie_recommendations_by_id(test_movie_id, top_n=3)
         
         if test_recommendations is not None and not test_recommendations.empty:
             print("Model test successful")
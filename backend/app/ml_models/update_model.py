@@ -0,0 +1,39 @@
+import sys
+import os
+import argparse
+# Add the backend directory to the path so we can import from app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from app.database import SessionLocal
+from app.models.models import Movie
+from app.ml_models.ml_models import add_movie_ids_to_model, compact_model
+
+def main():
+    """Add movies from the database that the model does not know yet, or compact the model with a full retrain"""
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--compact', action='store_true', help='Retrain from scratch on the current catalog')
+    args = parser.parse_args()
+    
+    if args.compact:
+        model_data = compact_model()
+        if model_data is None:
+            print("❌ Model compaction failed!")
+            return
+        print(f"Model compacted: {len(model_data['movie_data'])} movies")
+        return
+    
+    db = SessionLocal()
+    try:
+        movie_ids = [movie_id for (movie_id,) in db.query(Movie.id).all()]
+    finally:
+        db.close()
+    
+    print(f"Checking {len(movie_ids)} movies from the database...")
+    version = add_movie_ids_to_model(movie_ids)
+    if version is None:
+        print("Model is already up to date")
+    else:
+        print(f"Published model {version}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+import os
+import csv
+import json
+import asyncio
+import pandas as pd
+
+from app.services.moviedata import get_movie_id_by_name_async, get_movie_data_async
+from app.services.tmdb_async import tmdb_call, close_async_tmdb
+
+# Columns of the catalog CSVs the model trains on
+CATALOG_COLUMNS = [
+    'id', 'title', 'genre_ids', 'overview', 'release_date',
+    'vote_average', 'vote_count', 'poster_path', 'original_language',
+    'cast', 'director'
+]
+# Titles processed at once; the TMDB client's rate limiter and connection limits still apply on top
+DEFAULT_WORKERS = 16
+TOP_LIST_PAGES = 5
+
+def catalog_row(movie_data):
+    """
+    Shape a get_movie_data result like a row of the catalog CSV (list columns as Python-repr strings)
+    """
+    row = {column: movie_data.get(column) for column in CATALOG_COLUMNS}
+    row['genre_ids'] = str(list(movie_data.get('genre_ids') or []))
+    row['cast'] = str(list(movie_data.get('cast') or []))
+    return row
+
+def checkpoint_path(output_file):
+    return f'{output_file}.progress.jsonl'
+
+def load_checkpoint(path):
+    """
+    Results recorded by an earlier, possibly interrupted, build
+    Returns:
+        dict: Title -> {'title', 'status': 'found' or 'not_found', 'row'}
+    """
+    done = {}
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # The last line may be cut short if the build was killed mid-write
+                continue
+            done[record['title']] = record
+    return done
+
+def write_catalog_csv(rows, output_file):
+    """
+    Write catalog rows to a temporary file and rename it over the output
+    """
+    tmp_file = f'{output_file}.tmp'
+    with open(tmp_file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=CATALOG_COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+    os.replace(tmp_file, output_file)
+
+async def _resolve_title(title):
+    """
+    Search a title and fetch its details; TMDB errors propagate so the title is retried on resume
+    """
+    movie_id = await get_movie_id_by_name_async(title, raise_errors=True)
+    if movie_id is None:
+        return {'title': title, 'status': 'not_found', 'row': None}
+    movie_data = await get_movie_data_async(movie_id, raise_errors=True)
+    return {'title': title, 'status': 'found', 'row': catalog_row(movie_data)}
+
+async def build_catalog_from_titles(titles, output_file, n_workers=DEFAULT_WORKERS, resume=True):
+    """
+    Build a catalog CSV from movie titles with a pool of concurrent workers
+    Every resolved title is appended to a checkpoint file next to the output as soon as it is done,
+    so an interrupted build picks up where it stopped; titles that failed are retried.
+    Args:
+        titles: Movie titles, e.g. the lines of films.txt
+        output_file: Catalog CSV to write, in the order of titles
+        n_workers: Titles in flight at once
+        resume: Reuse the checkpoint of an earlier build of the same output
+    Returns:
+        dict: Counts of found, not found and failed titles
+    """
+    progress_file = checkpoint_path(output_file)
+    done = load_checkpoint(progress_file) if resume else {}
+    unique_titles = list(dict.fromkeys(titles))
+    pending = [title for title in unique_titles if title not in done]
+    print(f"{len(unique_titles)} titles, {len(unique_titles) - len(pending)} already done, {len(pending)} to fetch")
+
+    queue = asyncio.Queue()
+    for title in pending:
+        queue.put_nowait(title)
+    failed = []
+
+    async def worker(checkpoint):
+        while True:
+            try:
+                title = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            try:
+                record = await _resolve_title(title)
+            except Exception as e:
+                print(f"  ✗ Error processing {title}: {e}")
+                failed.append(title)
+                continue
+            done[title] = record
+            checkpoint.write(json.dumps(record) + '\n')
+            checkpoint.flush()
+            if record['status'] == 'found':
+                print(f"  ✓ Found: {record['row']['title']} ({record['row']['release_date']}) [{len(done)}/{len(unique_titles)}]")
+            else:
+                print(f"  ✗ Not found: {title}")
+
+    with open(progress_file, 'a' if resume else 'w', encoding='utf-8') as checkpoint:
+        await asyncio.gather(*(worker(checkpoint) for _ in range(max(1, n_workers))))
+
+    rows = [done[title]['row'] for title in titles if title in done and done[title]['status'] == 'found']
+    write_catalog_csv(rows, output_file)
+    summary = {
+        'found': len(rows),
+        'not_found': sum(record['status'] == 'not_found' for record in done.values()),
+        'failed': len(failed),
+    }
+    if not failed:
+        os.remove(progress_file)
+    print(f"Wrote {output_file}: {summary}" + (" (rerun to retry the failed titles)" if failed else ""))
+    return summary
+
+def _basic_row(movie):
+    """
+    Catalog row from a list entry alone, for movies whose details could not be fetched
+    """
+    return {
+        'id': movie.id,
+        'title': movie.original_title,
+        'genre_ids': movie.genre_ids,
+        'overview': movie.overview,
+        'release_date': movie.release_date,
+        'vote_average': movie.vote_average,
+        'vote_count': movie.vote_count,
+        'poster_path': movie.poster_path,
+        'original_language': movie.original_language,
+        'cast': [],
+        'director': None
+    }
+
+async def fetch_top_movies(list_name, pages=TOP_LIST_PAGES):
+    """
+    Fetch a TMDB movie list ('top_rated' or 'popular') with details for every movie, all pages and
+    movies concurrently under the TMDB client's limits
+    Returns:
+        DataFrame: One row per movie, in list order
+    """
+    list_pages = await asyncio.gather(*(
+        tmdb_call(lambda tmdb, page=page: getattr(tmdb.movies(), list_name)(page=page))
+        for page in range(1, pages + 1)
+    ))
+    listed = [movie for list_page in list_pages for movie in list_page.results]
+    details = await asyncio.gather(*(get_movie_data_async(movie.id) for movie in listed))
+    # Fall back to the list entry if the detailed fetch failed
+    return pd.DataFrame([detailed or _basic_row(movie) for movie, detailed in zip(listed, details)])
+
+def run_catalog_job(coroutine):
+    """
+    Run a catalog build from synchronous code (scripts) and close the TMDB session it opened
+    """
+    async def run():
+        try:
+            return await coroutine
+        finally:
+            await close_async_tmdb()
+
+    return asyncio.run(run())
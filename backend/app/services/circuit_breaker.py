@@ -0,0 +1,99 @@
+import time
+import threading
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of calling an upstream that the breaker has marked as down
+    """
+
+class CircuitBreaker:
+    """
+    Fail fast while an upstream is down: after `failure_threshold` consecutive failures the circuit
+    opens and calls are refused for `reset_timeout` seconds, then a single trial call is let through
+    (half-open) and its outcome closes or reopens the circuit
+    Shared by threads and coroutines; callers report outcomes with record_success / record_failure
+    """
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self._lock = threading.Lock()
+        self.state = 'closed'
+        self.failures = 0
+        self._opened_at = 0.0
+        self._counters = {'opened': 0, 'rejected': 0}
+
+    def before_call(self):
+        """
+        Raise CircuitOpenError if the call must not go out
+        In the half-open state only one trial call is let through per reset_timeout, so a trial that
+        never reports back (e.g. a cancelled coroutine) cannot keep the circuit half-open forever
+        """
+        with self._lock:
+            if self.state == 'closed':
+                return
+            if self.clock() - self._opened_at >= self.reset_timeout:
+                self.state = 'half_open'
+                self._opened_at = self.clock()
+                return
+            self._counters['rejected'] += 1
+        raise CircuitOpenError(f"{self.name} is unavailable, retrying in at most {self.reset_timeout:.0f}s")
+
+    def record_success(self):
+        with self._lock:
+            if self.state != 'closed':
+                print(f"Circuit {self.name} closed")
+            self.state = 'closed'
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == 'half_open' or (self.state == 'closed' and self.failures >= self.failure_threshold):
+                if self.state == 'closed':
+                    print(f"Circuit {self.name} opened after {self.failures} consecutive failures")
+                self.state = 'open'
+                self._opened_at = self.clock()
+                self._counters['opened'] += 1
+
+    def call(self, function, is_failure=lambda error: True):
+        """
+        Run function() through the breaker
+        Args:
+            function: The upstream call
+            is_failure: Whether an exception means the upstream is unhealthy (e.g. a timeout) rather
+                than a bad request (e.g. a 404); other exceptions count as a healthy response
+        """
+        self.before_call()
+        try:
+            result = function()
+        except Exception as e:
+            if is_failure(e):
+                self.record_failure()
+            else:
+                self.record_success()
+            raise
+        self.record_success()
+        return result
+
+    async def call_async(self, make_coroutine, is_failure=lambda error: True):
+        """
+        call for coroutines: make_coroutine() returns the awaitable to run
+        """
+        self.before_call()
+        try:
+            result = await make_coroutine()
+        except Exception as e:
+            if is_failure(e):
+                self.record_failure()
+            else:
+                self.record_success()
+            raise
+        self.record_success()
+        return result
+
+    def stats(self):
+        with self._lock:
+            return {'name': self.name, 'state': self.state, 'consecutive_failures': self.failures, **self._counters}
@@ -1,131 +1,280 @@
 import os
-import random
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 import requests
 from themoviedb import TMDb
 import pandas as pd
+from app.services.tmdb_cache import get_cache
+from app.services.tmdb_async import (
+    tmdb_call, breaker, rate_limiter, is_upstream_failure, REQUEST_TIMEOUT_SECONDS, CONNECT_TIMEOUT_SECONDS
+)
+from app.services.singleflight import SingleFlight
 
 load_dotenv()
 
 # Path to the data directory
 data_dir = os.path.join(os.path.dirname(__file__), '..', 'data')
 
-tmdb_api_key = os.getenv("TMDB_API_KEY")
+# TMDB client, created on first use so importing this module never touches the network
+_tmdb = None
+# Concurrent lookups of the same movie, search or provider list share one cache read / TMDB fetch
+_flights = SingleFlight()
+# Expired entries are served at once and refreshed here, one refresh per key at a time
+_refresh_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='tmdb-refresh')
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+_refresh_tasks = set()
 
-tmdb = TMDb(key=tmdb_api_key, language="en-US")
+class _TMDBSession(requests.Session):
+    """
+    requests session that gives every call a deadline and reports its outcome to the TMDB circuit breaker
+    Calls wait for the process-wide TMDB rate limit shared with the async client
+    """
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', (CONNECT_TIMEOUT_SECONDS, REQUEST_TIMEOUT_SECONDS))
+
+        def send():
+            rate_limiter.acquire_blocking()
+            response = super(_TMDBSession, self).request(method, url, **kwargs)
+            # The client raises for the status only after the session returns, so check it here
+            if response.status_code >= 500 or response.status_code == 429:
+                response.raise_for_status()
+            return response
+
+        return breaker.call(send, is_failure=is_upstream_failure)
+
+def get_tmdb():
+    """
+    Return the shared TMDB client, creating it on first use
+    """
+    global _tmdb
+    if _tmdb is None:
+        # One pooled session so calls reuse keep-alive connections instead of a new TLS handshake each;
+        # the pool is sized for the threads that fetch concurrently (weekly fan-out, request threadpool)
+        session = _TMDBSession()
+        session.mount("https://", requests.adapters.HTTPAdapter(pool_maxsize=32))
+        _tmdb = TMDb(key=os.getenv("TMDB_API_KEY"), language="en-US", session=session)
+    return _tmdb
+
+def _cached(endpoint, key, fetch):
+    """
+    Cached TMDB lookup with stale-while-revalidate: a fresh entry is returned as is, an expired one is
+    returned too while a background thread refreshes it, and only a miss waits for TMDB
+    While one thread fetches a key, other threads asking for it wait for that fetch
+    """
+    found, value, fresh = get_cache().lookup(endpoint, key)
+    if found:
+        if not fresh:
+            _refresh_in_background(endpoint, key, fetch)
+        return value
+    return _flights.do((endpoint, key), lambda: get_cache().set(endpoint, key, fetch()))
+
+async def _cached_async(endpoint, key, fetch):
+    """
+    Cached TMDB lookup for coroutines, served and coalesced the same way as _cached
+    """
+    async def fetch_and_store():
+        return get_cache().set(endpoint, key, await fetch())
+
+    found, value, fresh = get_cache().lookup(endpoint, key)
+    if found:
+        if not fresh:
+            _refresh_in_background(endpoint, key, fetch_and_store, run_async=True)
+        return value
+    return await _flights.do_async((endpoint, key), fetch_and_store)
+
+def _claim_refresh(endpoint, key):
+    with _refreshing_lock:
+        if (endpoint, key) in _refreshing:
+            return False
+        _refreshing.add((endpoint, key))
+        return True
+
+def _release_refresh(endpoint, key):
+    with _refreshing_lock:
+        _refreshing.discard((endpoint, key))
+
+def _refresh_in_background(endpoint, key, fetch, run_async=False):
+    """
+    Refetch an expired entry without making the caller wait; failures keep the stale entry
+    Args:
+        fetch: As for _cached, or for run_async the coroutine function that fetches and stores the entry
+        run_async: Refresh on the running event loop instead of a worker thread
+    """
+    if not _claim_refresh(endpoint, key):
+        return
+    if run_async:
+        async def refresh():
+            try:
+                await _flights.do_async((endpoint, key), fetch)
+            except Exception as e:
+                print(f"Error refreshing cached TMDB {endpoint} {key}, serving the stale entry: {e}")
+            finally:
+                _release_refresh(endpoint, key)
+
+        task = asyncio.get_running_loop().create_task(refresh())
+        # The loop only keeps weak references to tasks
+        _refresh_tasks.add(task)
+        task.add_done_callback(_refresh_tasks.discard)
+        return
+
+    def refresh():
+        try:
+            _flights.do((endpoint, key), lambda: get_cache().set(endpoint, key, fetch()))
+        except Exception as e:
+            print(f"Error refreshing cached TMDB {endpoint} {key}, serving the stale entry: {e}")
+        finally:
+            _release_refresh(endpoint, key)
+
+    _refresh_executor.submit(refresh)
+
+def coalescing_stats():
+    """
+    How many lookups ran and how many joined one already in flight
+    """
+    return _flights.stats()
+
+def select_backdrop(backdrops, primary_path=None):
+    """
+    Pick a backdrop deterministically so the same movie always renders (and caches) the same image
+    Args:
+        backdrops: TMDB image entries of the movie
+        primary_path: The movie's main backdrop_path, used when there is nothing else to pick
+    Returns:
+        str: The best-voted backdrop other than the main one, else the main one (may be None)
+    """
+    candidates = [image for image in backdrops or [] if image.file_path and image.file_path != primary_path]
+    if not candidates:
+        return primary_path
+    best = max(candidates, key=lambda image: (image.vote_average or 0, image.vote_count or 0, image.file_path))
+    return best.file_path
+
+def _fetch_movie_data(movie_id, combined=True):
+    """
+    Fetch a movie's details, credits and images from TMDB
+    Args:
+        movie_id: TMDB movie ID
+        combined: One request with credits and images appended to the details (append_to_response);
+            False issues the three requests separately
+    """
+    if combined:
+        movie = get_tmdb().movie(movie_id).details(append_to_response="credits,images", image_language="en,null")
+        return _movie_payload(movie, movie.credits, movie.images)
+    movie = get_tmdb().movie(movie_id).details()
+    credits = get_tmdb().movie(movie_id).credits()
+    movie_images = get_tmdb().movie(movie_id).images()
+    return _movie_payload(movie, credits, movie_images)
+
+async def _fetch_movie_data_async(movie_id):
+    movie = await tmdb_call(
+        lambda tmdb: tmdb.movie(movie_id).details(append_to_response="credits,images", image_language="en,null")
+    )
+    return _movie_payload(movie, movie.credits, movie.images)
+
+def _movie_payload(movie, credits, movie_images):
+    cast = credits.cast[:3] if credits and credits.cast else []
+    cast_names = [person.name for person in cast]
+
+    director = None
+    for person in (credits.crew if credits else None) or []:
+        if person.job == "Director":
+            director = person.name
+            break
+
+    return {
+        'id': movie.id,
+        'title': movie.title,
+        # The details endpoint returns genre objects rather than the genre_ids of list endpoints
+        'genre_ids': movie.genre_ids if movie.genre_ids is not None else [genre.id for genre in movie.genres or []],
+        'overview': movie.overview,
+        'release_date': movie.release_date,
+        'vote_average': movie.vote_average,
+        'vote_count': movie.vote_count,
+        'poster_path': movie.poster_path,
+        'original_language': movie.original_language,
+        'cast': cast_names,
+        'director': director,
+        'backdrop_path': select_backdrop(movie_images.backdrops if movie_images else None, movie.backdrop_path),
+        'runtime': movie.runtime,
+        'release_date': movie.release_date,
+        'tagline': movie.tagline
+    }
 
 #grab movie data from tmdb api
 def get_movie_data(movie_id):
+    """
+    Details, top cast, director and a backdrop for one movie, served from the local TMDB cache when fresh
+    """
     try:
-        movie = tmdb.movie(movie_id).details()
-        credits = tmdb.movie(movie_id).credits()
-        movie_images = tmdb.movie(movie_id).images()
-        cast = credits.cast[:3] if credits.cast else []
-        cast_names = [person.name for person in cast]
-        
-        director = None
-        for person in credits.crew:
-            if person.job == "Director":
-                director = person.name
-                break
-        
-        return {
-            'id': movie.id,
-            'title': movie.title,
-            'genre_ids': movie.genre_ids,
-            'overview': movie.overview,
-            'release_date': movie.release_date,
-            # 'vote_average': movie.vote_average,
-            # 'vote_count': movie.vote_count,
-            'poster_path': movie.poster_path,
-            'original_language': movie.original_language,
-            'cast': cast_names,
-            'director': director,
-            'backdrop_path': movie_images.backdrops[random.randint(1, 7)].file_path,
-            'runtime': movie.runtime,
-            'release_date': movie.release_date,
-            'tagline': movie.tagline
-        }
+        return _cached('movie', int(movie_id), lambda: _fetch_movie_data(movie_id))
+    except Exception as e:
+        print(f"Error fetching movie data: {e}")
+        return None
+
+async def get_movie_data_async(movie_id, raise_errors=False):
+    """
+    get_movie_data for async routes: a cache miss awaits the pooled async client instead of blocking a worker
+    Args:
+        raise_errors: Raise TMDB errors instead of returning None, e.g. to retry the movie later
+    """
+    try:
+        return await _cached_async('movie', int(movie_id), lambda: _fetch_movie_data_async(movie_id))
     except Exception as e:
+        if raise_errors:
+            raise
         print(f"Error fetching movie data: {e}")
         return None
-get_movie_data(155)
+
+def _fetch_movie_recommendations(movie_id):
+    return _recommendations_payload(get_tmdb().movie(movie_id).recommendations())
+
+async def _fetch_movie_recommendations_async(movie_id):
+    return _recommendations_payload(await tmdb_call(lambda tmdb: tmdb.movie(movie_id).recommendations()))
+
+def _recommendations_payload(recommendations):
+    movies = []
+    for movie in recommendations.results:
+        movies.append({
+            'id': movie.id,
+            'title': movie.original_title,
+        })
+    return movies
 
 def movie_recommendations(movie_id):
     try:
-        movie = tmdb.movie(movie_id).recommendations()
-        movies = []
-        for movie in movie.results:
-            movies.append({
-                'id': movie.id,
-                'title': movie.original_title,
-            })
-        return movies
+        return _cached('recommendations', int(movie_id), lambda: _fetch_movie_recommendations(movie_id))
+    except Exception as e:
+        print(f"Error fetching movie recommendations: {e}")
+        return None
+
+async def movie_recommendations_async(movie_id):
+    try:
+        return await _cached_async(
+            'recommendations', int(movie_id), lambda: _fetch_movie_recommendations_async(movie_id)
+        )
     except Exception as e:
         print(f"Error fetching movie recommendations: {e}")
         return None
 
 def get_top_100_rated_movies():
-    movies = []
+    from app.services.catalog_builder import fetch_top_movies, run_catalog_job
     try:
-        for i in range(5):
-            movies_page = tmdb.movies().top_rated(page=i+1)
-            for movie in movies_page.results:
-                # Get detailed movie data including cast and director
-                detailed_movie = get_movie_data(movie.id)
-                if detailed_movie:
-                    movies.append(detailed_movie)
-                else:
-                    # Fallback to basic data if detailed fetch fails
-                    movies.append({
-                        'id': movie.id,
-                        'title': movie.original_title,
-                        'genre_ids': movie.genre_ids,
-                        'overview': movie.overview,
-                        'release_date': movie.release_date,
-                        'vote_average': movie.vote_average,
-                        'vote_count': movie.vote_count,
-                        'poster_path': movie.poster_path,
-                        'original_language': movie.original_language,
-                        'cast': [],
-                        'director': None
-                    })
+        return run_catalog_job(fetch_top_movies('top_rated'))
     except Exception as e:
         print(f"Error fetching top movies: {e}")
         return None
 
-    return pd.DataFrame(movies)
-
 def get_top_100_popular_movies():
-    movies = []
+    from app.services.catalog_builder import fetch_top_movies, run_catalog_job
     try:
-        for i in range(5):
-            movies_page = tmdb.movies().popular(page=i+1)
-            for movie in movies_page.results:
-                # Get detailed movie data including cast and director
-                detailed_movie = get_movie_data(movie.id)
-                if detailed_movie:
-                    movies.append(detailed_movie)
-                else:
-                    movies.append({
-                        'id': movie.id,
-                        'title': movie.original_title,
-                        'genre_ids': movie.genre_ids,
-                        'overview': movie.overview,
-                        'release_date': movie.release_date,
-                        'vote_average': movie.vote_average,
-                        'vote_count': movie.vote_count,
-                        'poster_path': movie.poster_path,
-                        'original_language': movie.original_language,
-                        'cast': [],
-                        'director': None
-                    })
+        return run_catalog_job(fetch_top_movies('popular'))
     except Exception as e:
         print(f"Error fetching popular movies: {e}")
         return None
 
-    return pd.DataFrame(movies)
-
 def export_movies_to_csv(df, filename='top_movies.csv'):
     """
     Export movie data to a CSV file in the data directory
@@ -140,23 +289,52 @@ def export_movies_to_csv(df, filename='top_movies.csv'):
     except Exception as e:
         print(f"Error exporting to CSV: {e}")
 
-def get_movie_id_by_name(movie_name):
+def get_movie_id_by_name(movie_name, year=None):
     """
     Search for a movie by name and return its TMDB ID
+    Prefer title_index.resolve_movie_id, which answers from local data and only searches TMDB on a miss
     Args:
         movie_name: The name of the movie to search for
+        year: Release year to narrow the search to, if known
     Returns:
         int: The TMDB ID of the movie if found, None otherwise
     """
     try:
-        search_results = tmdb.search().movies(query=movie_name)
-        if search_results and len(search_results.results) > 0:
-            return search_results.results[0].id
+        # Misses are cached too: titles TMDB does not know keep coming back in every upload
+        return _cached(
+            'search', _search_key(movie_name, year),
+            lambda: _first_result_id(get_tmdb().search().movies(query=movie_name, year=year))
+        )
+    except Exception as e:
+        print(f"Error searching for movie: {e}")
         return None
+
+async def get_movie_id_by_name_async(movie_name, year=None, raise_errors=False):
+    """
+    get_movie_id_by_name for async routes
+    Args:
+        raise_errors: Raise TMDB errors instead of returning None, so they can be told apart from no match
+    """
+    async def fetch():
+        return _first_result_id(await tmdb_call(lambda tmdb: tmdb.search().movies(query=movie_name, year=year)))
+
+    try:
+        return await _cached_async('search', _search_key(movie_name, year), fetch)
     except Exception as e:
+        if raise_errors:
+            raise
         print(f"Error searching for movie: {e}")
         return None
 
+def _search_key(movie_name, year=None):
+    key = ' '.join(str(movie_name).lower().split())
+    return key if year is None else f'{key}|{year}'
+
+def _first_result_id(search_results):
+    if search_results and search_results.results:
+        return search_results.results[0].id
+    return None
+
 
 
 
@@ -185,13 +363,14 @@ def get_movie_id_by_name(movie_name):
 # print("- Director (one-hot encoded)")
 # print("- All previous features (genres, ratings, etc.)")
 
-def convert_films_txt_to_csv():
+def convert_films_txt_to_csv(n_workers=None, resume=True):
     """
     Convert films.txt to CSV format using existing TMDB setup
+    Titles are fetched concurrently under the TMDB rate limit and checkpointed as they complete,
+    so rerunning after an interruption resumes where it stopped (see catalog_builder)
     """
-    import csv
-    import os
-    
+    from app.services.catalog_builder import DEFAULT_WORKERS, build_catalog_from_titles, run_catalog_job
+
     # Read films.txt
     films_file = os.path.join(data_dir, 'films.txt')
     output_file = os.path.join(data_dir, 'films.csv')
@@ -205,75 +384,22 @@ def convert_films_txt_to_csv():
         movie_titles = [line.strip() for line in f if line.strip()]
     
     print(f"Found {len(movie_titles)} movies in {films_file}")
-    
-    # CSV headers matching the existing structure
-    headers = [
-        'id', 'title', 'genre_ids', 'overview', 'release_date', 
-        'vote_average', 'vote_count', 'poster_path', 'original_language',
-        'cast', 'director'
-    ]
-    
-    # Prepare CSV data
-    csv_data = []
-    
-    for i, title in enumerate(movie_titles, 1):
-        print(f"Processing {i}/{len(movie_titles)}: {title}")
-        
-        try:
-            # Search for movie using existing method
-            movie_id = get_movie_id_by_name(title)
-            
-            if movie_id:
-                # Get detailed movie data using existing method
-                movie_data = get_movie_data(movie_id)
-                
-                if movie_data:
-                    # Convert cast list to string format
-                    cast_str = str(movie_data['cast']) if movie_data['cast'] else '[]'
-                    
-                    # Prepare row data
-                    row = {
-                        'id': movie_data['id'],
-                        'title': movie_data['title'],
-                        'genre_ids': str(movie_data['genre_ids']),
-                        'overview': movie_data['overview'],
-                        'release_date': movie_data['release_date'],
-                        'vote_average': movie_data['vote_average'],
-                        'vote_count': movie_data['vote_count'],
-                        'poster_path': movie_data['poster_path'],
-                        'original_language': movie_data['original_language'],
-                        'cast': cast_str,
-                        'director': movie_data['director']
-                    }
-                    
-                    csv_data.append(row)
-                    print(f"  ✓ Found: {movie_data['title']} ({movie_data['release_date']})")
-                else:
-                    print(f"  ✗ Could not get details for: {title}")
-            else:
-                print(f"  ✗ Not found: {title}")
-                
-        except Exception as e:
-            print(f"  ✗ Error processing {title}: {e}")
-        
-        # Rate limiting - be nice to the API
-        import time
-        time.sleep(0.25)
-    
-    # Write CSV file
-    with open(output_file, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=headers)
-        writer.writeheader()
-        writer.writerows(csv_data)
-    
-    print(f"\nConversion complete! Created {output_file} with {len(csv_data)} movies")
+    summary = run_catalog_job(build_catalog_from_titles(
+        movie_titles, output_file, n_workers=n_workers or DEFAULT_WORKERS, resume=resume
+    ))
+    print(f"\nConversion complete! Created {output_file} with {summary['found']} movies")
 
 #TESTING METHODS CODE
 #print(get_movie_id_by_name("The Dark Knight"))
 # print(get_movie_data(155))
 
-def get_movie_streaming_data(movie_id):
-    country = "US"
+def _fetch_movie_streaming_data(movie_id, country):
+    return _providers_payload(get_tmdb().movie(movie_id).watch_providers(), country)
+
+async def _fetch_movie_streaming_data_async(movie_id, country):
+    return _providers_payload(await tmdb_call(lambda tmdb: tmdb.movie(movie_id).watch_providers()), country)
+
+def _providers_payload(watch_providers, country):
     streamingdata = {
         'flatrate': [],
         'free': [],
@@ -281,32 +407,80 @@ def get_movie_streaming_data(movie_id):
         'buy': [],
         'rent': []
     }
-    try:
-        watch_providers = tmdb.watch_providers().movie(country)
-        #print(watch_providers)
-        movies = tmdb.movie(movie_id).watch_providers().results[country]
-        if movies.flatrate:
-            for i in movies.flatrate:
-                if "Ads" not in i.provider_name:
-                    streamingdata['flatrate'].append((i.provider_name, i.provider_id, i.logo_path))
-        if movies.free:
-            for i in movies.free:
-                if "Ads" not in i.provider_name:
-                    streamingdata['free'].append((i.provider_name, i.provider_id, i.logo_path))
-        if movies.ads:
-            for i in movies.ads:
-                if "Ads" not in i.provider_name:
-                    streamingdata['ads'].append((i.provider_name, i.provider_id, i.logo_path))
-        if movies.buy:
-            for i in movies.buy:
-                if "Ads" not in i.provider_name:
-                    streamingdata['buy'].append((i.provider_name, i.provider_id, i.logo_path))
-        if movies.rent:
-            for i in movies.rent:
-                if "Ads" not in i.provider_name:
-                    streamingdata['rent'].append((i.provider_name, i.provider_id, i.logo_path))
-        #print(streamingdata)
+    movies = (watch_providers.results or {}).get(country)
+    if movies is None:
+        # Not available in this region: a valid answer, cached like any other
         return streamingdata
+    if movies.flatrate:
+        for i in movies.flatrate:
+            if "Ads" not in i.provider_name:
+                streamingdata['flatrate'].append((i.provider_name, i.provider_id, i.logo_path))
+    if movies.free:
+        for i in movies.free:
+            if "Ads" not in i.provider_name:
+                streamingdata['free'].append((i.provider_name, i.provider_id, i.logo_path))
+    if movies.ads:
+        for i in movies.ads:
+            if "Ads" not in i.provider_name:
+                streamingdata['ads'].append((i.provider_name, i.provider_id, i.logo_path))
+    if movies.buy:
+        for i in movies.buy:
+            if "Ads" not in i.provider_name:
+                streamingdata['buy'].append((i.provider_name, i.provider_id, i.logo_path))
+    if movies.rent:
+        for i in movies.rent:
+            if "Ads" not in i.provider_name:
+                streamingdata['rent'].append((i.provider_name, i.provider_id, i.logo_path))
+    #print(streamingdata)
+    return streamingdata
+
+def get_movie_streaming_data(movie_id, country="US"):
+    """
+    Streaming, rental and purchase providers for a movie in one region, served from the local TMDB cache when fresh
+    """
+    try:
+        return _cached(
+            'providers', f'{int(movie_id)}:{country}', lambda: _fetch_movie_streaming_data(movie_id, country)
+        )
     except Exception as e:
         print(f"Error fetching movie streaming data: {e}")
-        return None
\ No newline at end of file
+        return None
+
+async def get_movie_streaming_data_async(movie_id, country="US"):
+    """
+    get_movie_streaming_data for async routes
+    """
+    try:
+        return await _cached_async(
+            'providers', f'{int(movie_id)}:{country}', lambda: _fetch_movie_streaming_data_async(movie_id, country)
+        )
+    except Exception as e:
+        print(f"Error fetching movie streaming data: {e}")
+        return None
+
+def _provider_list_payload(providers):
+    listed = sorted(providers.results or [], key=lambda provider: (provider.display_priority is None, provider.display_priority))
+    return [(provider.provider_name, provider.provider_id, provider.logo_path) for provider in listed]
+
+def get_watch_provider_list(country="US"):
+    """
+    Every streaming service TMDB knows in a region, in its display order; cached for a week
+    """
+    try:
+        return _cached('provider_list', country, lambda: _provider_list_payload(get_tmdb().watch_providers().movie(country)))
+    except Exception as e:
+        print(f"Error fetching watch provider list: {e}")
+        return None
+
+async def get_watch_provider_list_async(country="US"):
+    """
+    get_watch_provider_list for async routes
+    """
+    async def fetch():
+        return _provider_list_payload(await tmdb_call(lambda tmdb: tmdb.watch_providers().movie(country)))
+
+    try:
+        return await _cached_async('provider_list', country, fetch)
+    except Exception as e:
+        print(f"Error fetching watch provider list: {e}")
+        return None
@@ -1,13 +1,69 @@
 from app.models.models import Rating, Movie
 from sqlalchemy.orm import Session
 from sqlalchemy import desc
-from app.ml_models.ml_models import get_movie_recommendations
+from app.ml_models.ml_models import get_movie_recommendations_batch, get_profile_recommendations, get_catalog_movies, MODEL_REFRESH_SECONDS
+from app.ml_models.collaborative import DEFAULT_CF_DIR, load_factors, factors_version, fold_in_user, score_items
 from app.services.moviedata import get_movie_data
 import pandas as pd
 import random
 from sklearn.cluster import KMeans
 from sklearn.preprocessing import StandardScaler
 import numpy as np
+import time
+
+# Neighbors each source movie contributes: the model's 20 minus the movie itself, as before the
+# batch entry point. Stays below the precomputed table's width so catalog sources never need a live query
+SOURCE_CANDIDATES = 19
+
+# Collaborative-filtering factors, loaded on first use (see train_collaborative.py)
+_collaborative_model = None
+_collaborative_checked_at = 0.0
+
+def aggregate_candidates(candidate_ids, source_positions, source_ratings, top_n):
+    """
+    Merge the candidates of several source movies by movie ID with NumPy scatter-adds
+    Each movie scores the sum of the ratings of the source movies that recommended it
+    Args:
+        candidate_ids: Recommended movie ID of every (candidate, source) pair
+        source_positions: Position of the source movie of every pair
+        source_ratings: User rating of each source movie, indexed by position
+        top_n: Number of movies to keep
+    Returns:
+        tuple: (movie_ids, weighted_scores, mean_source_ratings, sources) for the top_n movies,
+            best first; sources[i] holds the positions of the source movies of movie_ids[i]
+    """
+    candidate_ids = np.asarray(candidate_ids, dtype=np.int64)
+    source_positions = np.asarray(source_positions)
+    source_ratings = np.asarray(source_ratings, dtype=np.float64)
+    unique_ids, first_seen, inverse = np.unique(candidate_ids, return_index=True, return_inverse=True)
+    counts = np.bincount(inverse, minlength=len(unique_ids))
+    scores = np.bincount(inverse, weights=source_ratings[source_positions], minlength=len(unique_ids))
+    
+    # Highest score first; ties keep the order in which the movies were first recommended
+    order = np.lexsort((first_seen, -scores))[:top_n]
+    
+    # Group the pairs by movie once, then read off the sources of the winners
+    by_movie = np.argsort(inverse, kind='stable')
+    starts = np.concatenate(([0], np.cumsum(counts)))
+    sources = [source_positions[by_movie[starts[k]:starts[k + 1]]] for k in order]
+    return unique_ids[order], scores[order], scores[order] / counts[order], sources
+
+def top_n_metadata(movie_ids, sources, frames):
+    """
+    Build the metadata rows of the final recommendations
+    Args:
+        movie_ids: Recommended movie IDs, best first (from aggregate_candidates)
+        sources: Source positions per movie (from aggregate_candidates)
+        frames: Source position -> DataFrame of that source's recommendations
+    Returns:
+        DataFrame: id, title, vote_average, vote_count, genre_ids and poster_path per movie, in order
+    """
+    columns = ['id', 'title', 'vote_average', 'vote_count', 'genre_ids', 'poster_path']
+    rows = []
+    for movie_id, movie_sources in zip(movie_ids, sources):
+        frame = frames[movie_sources[0]]
+        rows.append(frame.iloc[int(np.flatnonzero(frame['id'].to_numpy() == movie_id)[0])][columns])
+    return pd.DataFrame(rows, columns=columns).reset_index(drop=True)
 
 def recommend(user_id: int, db: Session, top_n: int = 10, sample_from_top_x: int = 100):
     """
@@ -35,54 +91,60 @@ def recommend(user_id: int, db: Session, top_n: int = 10, sample_from_top_x: int
     all_user_rated_movies = db.query(Rating.movie_id).filter(Rating.user_id == user_id).all()
     user_rated_movie_ids = [rating.movie_id for rating in all_user_rated_movies]
     
-    all_recommendations = []
+    source_movies = {
+        movie.id: movie
+        for movie in db.query(Movie).filter(Movie.id.in_([rating.movie_id for rating in user_ratings])).all()
+    }
+    
+    # One batched similarity query for all source movies
+    batch_recommendations = get_movie_recommendations_batch(
+        [rating.movie_id for rating in user_ratings if rating.movie_id in source_movies], top_n=SOURCE_CANDIDATES
+    )
+    
+    # Candidate (movie, source) pairs as flat arrays; metadata stays in the per-source frames
+    candidate_ids, source_positions, frames = [], [], {}
+    user_rated_array = np.array([movie_id for movie_id in user_rated_movie_ids if movie_id is not None], dtype=np.int64)
     
     print("Source movies for recommendations:")
-    for rating in user_ratings:
-        movie = db.query(Movie).filter(Movie.id == rating.movie_id).first()
+    for position, rating in enumerate(user_ratings):
+        movie = source_movies.get(rating.movie_id)
         if movie:
             print(f"{movie.title} (rating: {rating.rating})")
         if not movie:
             continue
             
-        recommendations = get_movie_recommendations(movie.title, top_n=5)
+        recommendations = batch_recommendations.get(movie.id)
         
         if recommendations is not None and not recommendations.empty:
-
-            recommendations = recommendations[~recommendations['id'].isin(user_rated_movie_ids)]
+            ids = recommendations['id'].to_numpy(dtype=np.int64)
+            ids = ids[~np.isin(ids, user_rated_array)]
             
-            if not recommendations.empty:
-                recommendations['source_movie'] = movie.title
-                recommendations['user_rating'] = rating.rating
-                recommendations['weighted_score'] = rating.rating
-                
-                all_recommendations.append(recommendations)
+            if len(ids):
+                candidate_ids.append(ids)
+                source_positions.append(np.full(len(ids), position, dtype=np.int32))
+                frames[position] = recommendations
     
-    if not all_recommendations:
+    if not candidate_ids:
         return pd.DataFrame()
     
-    combined_recommendations = pd.concat(all_recommendations, ignore_index=True)
-    
-    combined_recommendations['genre_ids_str'] = combined_recommendations['genre_ids'].astype(str)
-    
-    final_recommendations = combined_recommendations.groupby(['id', 'title', 'vote_average', 'vote_count', 'genre_ids_str', 'poster_path']).agg({
-        'source_movie': lambda x: list(x),
-        'user_rating': 'mean',
-        'weighted_score': 'sum'
-    }).reset_index()
-
-    print('DEBUG: source_movie lists for recommendations:')
-    print(final_recommendations[['title', 'source_movie']])
-    
-    final_recommendations['genre_ids'] = final_recommendations['genre_ids_str'].apply(eval)
-    final_recommendations = final_recommendations.drop('genre_ids_str', axis=1)
+    source_ratings = np.array([rating.rating for rating in user_ratings], dtype=np.float64)
+    top_ids, scores, mean_ratings, sources = aggregate_candidates(
+        np.concatenate(candidate_ids), np.concatenate(source_positions), source_ratings, top_n
+    )
     
-    final_recommendations = final_recommendations.sort_values('weighted_score', ascending=False)
+    # Join metadata once, for the final top-N only, from the frame of each movie's first source
+    final_recommendations = top_n_metadata(top_ids, sources, frames)
+    final_recommendations['source_movie'] = [
+        [source_movies[user_ratings[position].movie_id].title for position in movie_sources]
+        for movie_sources in sources
+    ]
+    final_recommendations['user_rating'] = mean_ratings
+    final_recommendations['weighted_score'] = scores
     
     print(f"User has rated {len(user_rated_movie_ids)} movies total")
     print(f"Final recommendations: {len(final_recommendations)} (already filtered)")
     
-    return final_recommendations.head(top_n)
+    return final_recommendations
 
 def cluster_user_movies(user_id: int, db: Session, n_clusters: int = 6):
     """
@@ -188,18 +250,28 @@ def recommend_clustered(user_id: int, db: Session, top_n: int = 6, n_clusters: i
     all_user_rated_movies = db.query(Rating.movie_id).filter(Rating.user_id == user_id).all()
     user_rated_movie_ids = [rating.movie_id for rating in all_user_rated_movies]
     
+    source_movies = {
+        movie.id: movie
+        for movie in db.query(Movie).filter(Movie.id.in_([rating.movie_id for rating in source_ratings])).all()
+    }
+    
+    # One batched similarity query for all cluster representatives
+    batch_recommendations = get_movie_recommendations_batch(
+        [rating.movie_id for rating in source_ratings if rating.movie_id in source_movies], top_n=SOURCE_CANDIDATES
+    )
+    
     final_recommendations = []
     
     print(f"Using {len(source_ratings)} clustered source movies:")
     for i, rating in enumerate(source_ratings):
-        movie = db.query(Movie).filter(Movie.id == rating.movie_id).first()
+        movie = source_movies.get(rating.movie_id)
         if not movie:
             continue
             
         print(f"  Cluster {i+1}: {movie.title} (rating: {rating.rating})")
         
 
-        recommendations = get_movie_recommendations(movie.title, top_n=20)
+        recommendations = batch_recommendations.get(movie.id)
         
         if recommendations is not None and not recommendations.empty:
 
@@ -227,6 +299,114 @@ def recommend_clustered(user_id: int, db: Session, top_n: int = 6, n_clusters: i
     
     return result_df.head(top_n)
 
+def recommend_profile(user_id: int, db: Session, top_n: int = 10):
+    """
+    Recommend movies close to the user's taste profile: the rating-weighted average of
+    every movie they rated, searched with a single neighbor query
+    Args:
+        user_id: The user's ID
+        db: Database session
+        top_n: Number of recommendations to return
+    Returns:
+        DataFrame: Recommended movies with scores, closest first
+    """
+    user_ratings = db.query(Rating.movie_id, Rating.rating).filter(
+        Rating.user_id == user_id, Rating.movie_id.isnot(None)
+    ).all()
+    
+    if not user_ratings:
+        return pd.DataFrame()
+    
+    movie_weights = {movie_id: rating for movie_id, rating in user_ratings}
+    recommendations = get_profile_recommendations(movie_weights, top_n=top_n, exclude_ids=movie_weights)
+    
+    if recommendations is None or recommendations.empty:
+        return pd.DataFrame()
+    
+    source_titles = dict(
+        db.query(Movie.id, Movie.title).filter(Movie.id.in_(recommendations['closest_source_id'].tolist())).all()
+    )
+    recommendations['source_movie'] = [
+        [source_titles.get(movie_id, f"Movie ID {movie_id}")] for movie_id in recommendations['closest_source_id']
+    ]
+    recommendations['user_rating'] = [movie_weights[movie_id] for movie_id in recommendations['closest_source_id']]
+    # Closer to the profile scores higher
+    recommendations['weighted_score'] = 1.0 / (1.0 + recommendations['distance'])
+    
+    print(f"Profile built from {len(user_ratings)} ratings, {len(recommendations)} recommendations")
+    
+    return recommendations.drop(columns=['closest_source_id']).reset_index(drop=True)
+
+def get_collaborative_model(cf_dir=DEFAULT_CF_DIR, reload=False):
+    """
+    Return the persisted collaborative-filtering factors, loading them on first use
+    Like ensure_model_loaded, checks every MODEL_REFRESH_SECONDS whether newer factors were saved
+    """
+    global _collaborative_model, _collaborative_checked_at
+    
+    if _collaborative_model is None or reload:
+        _collaborative_model = load_factors(cf_dir)
+        _collaborative_checked_at = time.monotonic()
+    elif time.monotonic() - _collaborative_checked_at > MODEL_REFRESH_SECONDS:
+        _collaborative_checked_at = time.monotonic()
+        version = factors_version(cf_dir)
+        if version is not None and version != _collaborative_model['manifest']['created_at']:
+            print(f"Collaborative factors from {version} were saved, reloading...")
+            # Keep the old factors if the directory is being swapped right now
+            _collaborative_model = load_factors(cf_dir) or _collaborative_model
+    return _collaborative_model
+
+def recommend_collaborative(user_id: int, db: Session, top_n: int = 10):
+    """
+    Recommend movies that users with similar ratings liked, using matrix-factorization factors
+    The user's vector is folded in from their current ratings, so ratings added since the last
+    training run count too; every movie is then scored with one matrix-vector product
+    Args:
+        user_id: The user's ID
+        db: Database session
+        top_n: Number of recommendations to return
+    Returns:
+        DataFrame: Recommended movies with their predicted ratings, best first
+    """
+    model = get_collaborative_model()
+    if model is None:
+        print("Collaborative model is not trained yet. Train it with app/ml_models/train_collaborative.py")
+        return pd.DataFrame()
+    
+    user_ratings = dict(db.query(Rating.movie_id, Rating.rating).filter(
+        Rating.user_id == user_id, Rating.movie_id.isnot(None)
+    ).all())
+    user_vector = fold_in_user(model, user_ratings)
+    if user_vector is None:
+        return pd.DataFrame()
+    
+    scores = score_items(model, user_vector)
+    scores[np.isin(model['movie_ids'], list(user_ratings))] = -np.inf
+    n_candidates = min(top_n, int(np.isfinite(scores).sum()))
+    if n_candidates == 0:
+        return pd.DataFrame()
+    top = np.argpartition(-scores, n_candidates - 1)[:n_candidates]
+    top = top[np.argsort(-scores[top], kind='stable')]
+    
+    recommendations = pd.DataFrame({'id': np.asarray(model['movie_ids'])[top], 'predicted_rating': scores[top]})
+    catalog_movies = get_catalog_movies(recommendations['id'])
+    if catalog_movies is not None and not catalog_movies.empty:
+        metadata_columns = ['id', 'title', 'vote_average', 'vote_count', 'genre_ids', 'poster_path']
+        recommendations = recommendations.merge(catalog_movies[metadata_columns], on='id', how='left')
+    else:
+        recommendations['title'] = None
+    
+    # Movies only known from ratings uploads take their title from the movies table
+    missing = recommendations['title'].isna()
+    if missing.any():
+        titles = dict(db.query(Movie.id, Movie.title).filter(
+            Movie.id.in_(recommendations.loc[missing, 'id'].tolist())
+        ).all())
+        recommendations.loc[missing, 'title'] = recommendations.loc[missing, 'id'].map(titles)
+    
+    recommendations['weighted_score'] = recommendations['predicted_rating']
+    return recommendations
+
 def get_user_top_movies(user_id: int, db: Session, top_n: int = 10):
     """
     Get a user's top-rated movies
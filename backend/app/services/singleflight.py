@@ -0,0 +1,79 @@
+import asyncio
+import threading
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls for the same key: the first caller runs the function,
+    the others wait for it and share its result (or its exception)
+    Threads and coroutines are tracked separately; a key is forgotten as soon as its call finishes
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._tasks = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    def do(self, key, function):
+        """
+        Run function() for key unless another thread already is, in which case wait for that run
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = function()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    async def do_async(self, key, make_coroutine):
+        """
+        Await make_coroutine() for key unless another coroutine already is, in which case await that run
+        The shared run is a task of its own, so one caller being cancelled does not cancel it for the others
+        """
+        loop = asyncio.get_running_loop()
+        task_key = (id(loop), key)
+        with self._lock:
+            task = self._tasks.get(task_key)
+            if task is not None:
+                self.coalesced += 1
+            else:
+                task = self._tasks[task_key] = loop.create_task(make_coroutine())
+                self.leaders += 1
+                task.add_done_callback(lambda done: self._forget(task_key, done))
+        return await asyncio.shield(task)
+
+    def _forget(self, task_key, task):
+        with self._lock:
+            if self._tasks.get(task_key) is task:
+                del self._tasks[task_key]
+
+    def stats(self):
+        """
+        Calls that ran and calls that joined one already in flight
+        """
+        with self._lock:
+            return {'leaders': self.leaders, 'coalesced': self.coalesced, 'in_flight': len(self._calls) + len(self._tasks)}
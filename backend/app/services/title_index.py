@@ -0,0 +1,282 @@
+import os
+import re
+import math
+import time
+import asyncio
+import threading
+import unicodedata
+from bisect import bisect_left
+from collections import Counter, defaultdict
+import pandas as pd
+
+from app.database import SessionLocal
+from app.models.models import Movie
+from app.services.moviedata import get_movie_id_by_name, get_movie_id_by_name_async
+from app.services.tmdb_cache import get_cache
+
+# Catalog used when no model is loaded yet (paths are relative to backend/, like the training scripts)
+DEFAULT_CATALOG_CSV = 'app/data/films.csv'
+# Rebuild the index this often so movies added by other processes become searchable
+INDEX_REFRESH_SECONDS = int(os.getenv('TITLE_INDEX_REFRESH_SECONDS', '600'))
+# Minimum Dice similarity of title trigrams for a fuzzy match
+FUZZY_THRESHOLD = 0.75
+# Release years may differ by one between Letterboxd and TMDB (festival vs. theatrical release)
+YEAR_TOLERANCE = 1
+MAX_PREFIX_CANDIDATES = 20
+
+def normalize_title(title):
+    """
+    Normalize a title for matching: accents, case, punctuation and spacing are ignored and '&' reads as 'and'
+    e.g. 'Amélie' -> 'amelie', 'Se7en.' -> 'se7en', 'Harold & Maude' -> 'harold and maude'
+    """
+    text = unicodedata.normalize('NFKD', str(title))
+    text = ''.join(char for char in text if not unicodedata.combining(char)).lower().replace('&', ' and ')
+    return ' '.join(re.sub(r'[\W_]+', ' ', text).split())
+
+def trigrams(normalized):
+    padded = f'  {normalized} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def parse_year(value):
+    """
+    Year from an int, a float ('2019.0' in CSVs with gaps), or an ISO release date; None if missing
+    """
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return None
+    text = str(value).strip()
+    if len(text) >= 4 and text[:4].isdigit():
+        return int(text[:4])
+    return None
+
+class TitleIndex:
+    """
+    In-memory title -> TMDB ID index with exact, word-prefix and trigram (fuzzy) matching
+    When a year is given, candidates released in (or within a year of) it win; a match whose
+    year disagrees is treated as a miss so the caller can fall back to TMDB
+    """
+
+    def __init__(self):
+        self.movie_ids = []
+        self.titles = []
+        self.years = []
+        self.popularity = []
+        self._gram_counts = []
+        self._rows_by_id = {}
+        self._exact = defaultdict(list)
+        self._trigrams = defaultdict(list)
+        self._sorted = None
+        self._lock = threading.Lock()
+        self.counters = Counter()
+
+    def __len__(self):
+        return len(self.movie_ids)
+
+    def add(self, movie_id, title, year=None, popularity=0):
+        """
+        Add a movie; a movie already indexed under the same title only fills in a missing year
+        """
+        normalized = normalize_title(title) if isinstance(title, str) else ''
+        if not normalized:
+            return
+        movie_id = int(movie_id)
+        with self._lock:
+            for row in self._rows_by_id.get(movie_id, []):
+                if self.titles[row] == normalized:
+                    if self.years[row] is None:
+                        self.years[row] = year
+                    return
+            row = len(self.movie_ids)
+            self.movie_ids.append(movie_id)
+            self.titles.append(normalized)
+            self.years.append(year)
+            self.popularity.append(popularity or 0)
+            self._rows_by_id.setdefault(movie_id, []).append(row)
+            self._exact[normalized].append(row)
+            grams = trigrams(normalized)
+            self._gram_counts.append(len(grams))
+            for gram in grams:
+                self._trigrams[gram].append(row)
+            self._sorted = None
+
+    def _pick(self, rows, year):
+        """
+        Best candidate: the most popular one, among those matching the year if one is given
+        """
+        if year is not None:
+            for tolerance in (0, YEAR_TOLERANCE):
+                matching = [row for row in rows if self.years[row] is not None and abs(self.years[row] - year) <= tolerance]
+                if matching:
+                    return max(matching, key=lambda row: self.popularity[row])
+            # Only candidates of unknown year are acceptable then
+            rows = [row for row in rows if self.years[row] is None]
+            if not rows:
+                return None
+        return max(rows, key=lambda row: self.popularity[row]) if rows else None
+
+    def _prefix_rows(self, normalized):
+        with self._lock:
+            if self._sorted is None:
+                self._sorted = sorted((title, row) for row, title in enumerate(self.titles))
+            sorted_titles = self._sorted
+        # Whole words only: 'alien' matches 'alien resurrection' but not 'aliens'
+        prefix = normalized + ' '
+        rows = []
+        for title, row in sorted_titles[bisect_left(sorted_titles, (prefix, -1)):]:
+            if not title.startswith(prefix) or len(rows) >= MAX_PREFIX_CANDIDATES:
+                break
+            rows.append(row)
+        return rows
+
+    def _fuzzy_rows(self, normalized):
+        """
+        Rows whose title trigrams have a Dice similarity of at least FUZZY_THRESHOLD with the query
+        A match shares at least T * n / (2 - T) of the query's n trigrams, so it contains one of the
+        n - that + 1 rarest ones: only their posting lists are read, and common trigrams (' th', 'of ')
+        that would touch most of the catalog are skipped. The cost is the length of those rare posting
+        lists plus one set intersection per candidate, not the size of the catalog
+        """
+        grams = trigrams(normalized)
+        # The small epsilon keeps float error from rounding an exact bound up
+        min_shared = math.ceil(FUZZY_THRESHOLD * len(grams) / (2 - FUZZY_THRESHOLD) - 1e-9)
+        rarest = sorted(grams, key=lambda gram: len(self._trigrams.get(gram, ())))[:len(grams) - min_shared + 1]
+        candidates = set()
+        for gram in rarest:
+            candidates.update(self._trigrams.get(gram, ()))
+        scored = []
+        for row in candidates:
+            score = 2 * len(grams & trigrams(self.titles[row])) / (len(grams) + self._gram_counts[row])
+            if score >= FUZZY_THRESHOLD:
+                scored.append((score, row))
+        if not scored:
+            return []
+        best = max(score for score, _ in scored)
+        return [row for score, row in scored if score >= best - 0.05]
+
+    def lookup(self, title, year=None):
+        """
+        Resolve a title to a TMDB ID
+        Args:
+            title: Title as typed or exported, e.g. from a Letterboxd CSV
+            year: Release year, if known
+        Returns:
+            tuple: (movie ID, 'exact' / 'prefix' / 'fuzzy'), or (None, None) on a miss
+        """
+        normalized = normalize_title(title) if title is not None else ''
+        year = parse_year(year)
+        if normalized:
+            row = self._pick(self._exact.get(normalized, []), year)
+            method = 'exact'
+            # Only an exact title is trusted without a year. A bare prefix or a close spelling is too
+            # often a sequel or a namesake ('alien' / 'aliens', 'the godfather' / 'the godfather part ii'),
+            # so those are left to the TMDB search; the year settles it
+            if row is None and year is not None:
+                row, method = self._pick(self._prefix_rows(normalized), year), 'prefix'
+            if row is None and year is not None:
+                row, method = self._pick(self._fuzzy_rows(normalized), year), 'fuzzy'
+            if row is not None:
+                self.counters[method] += 1
+                return self.movie_ids[row], method
+        self.counters['miss'] += 1
+        return None, None
+
+def _catalog_frame():
+    """
+    id / title / release_date / vote_count of the served model's catalog, or of the default CSV
+    """
+    from app.ml_models import ml_models
+    from app.ml_models.catalog import load_catalog
+
+    model = ml_models.current_model()
+    if model is not None:
+        movie_data = model['movie_data']
+        columns = [column for column in ('id', 'title', 'release_date', 'vote_count') if column in movie_data.columns]
+        if isinstance(movie_data, pd.DataFrame):
+            return movie_data[columns]
+        return movie_data.to_dataframe(columns=columns)
+    if os.path.exists(DEFAULT_CATALOG_CSV):
+        return load_catalog(DEFAULT_CATALOG_CSV)
+    return pd.DataFrame(columns=['id', 'title'])
+
+def build_title_index(db=None, catalog=None, search_cache=None):
+    """
+    Build the index from a catalog (default: the served model's), the movies table and past TMDB searches
+    Args:
+        db: Database session; movies users have rated are indexed under their TMDB title and stored year
+        catalog: DataFrame with id, title and optionally release_date and vote_count
+        search_cache: TMDBCache whose search results are indexed as aliases, e.g. English titles of
+            catalog movies stored under their original title
+    Returns:
+        TitleIndex
+    """
+    catalog = _catalog_frame() if catalog is None else catalog
+    index = TitleIndex()
+    release_dates = catalog['release_date'] if 'release_date' in catalog else [None] * len(catalog)
+    vote_counts = catalog['vote_count'] if 'vote_count' in catalog else [0] * len(catalog)
+    for movie_id, title, release_date, vote_count in zip(catalog['id'], catalog['title'], release_dates, vote_counts):
+        if pd.notna(movie_id):
+            index.add(movie_id, title, parse_year(release_date), 0 if pd.isna(vote_count) else vote_count)
+    if db is not None:
+        for movie_id, title, year in db.query(Movie.id, Movie.title, Movie.year).all():
+            index.add(movie_id, title, year)
+    if search_cache is not None:
+        # Keys are 'query' or 'query|year' (see moviedata._search_key); misses are cached as None
+        for key, movie_id in search_cache.items('search'):
+            if movie_id is not None:
+                query, _, year = key.partition('|')
+                index.add(movie_id, query, parse_year(year))
+    return index
+
+_index = None
+_index_built_at = 0.0
+_index_lock = threading.Lock()
+
+def get_title_index(db=None):
+    """
+    Return the shared title index, (re)building it on first use and every INDEX_REFRESH_SECONDS
+    The movies table is always indexed: without a session one is opened for the build, so the
+    shared index does not depend on which caller happened to build it first
+    """
+    global _index, _index_built_at
+    with _index_lock:
+        if _index is None or time.monotonic() - _index_built_at > INDEX_REFRESH_SECONDS:
+            start = time.perf_counter()
+            session = db if db is not None else SessionLocal()
+            try:
+                _index = build_title_index(session, search_cache=get_cache())
+            finally:
+                if db is None:
+                    session.close()
+            _index_built_at = time.monotonic()
+            print(f"Built title index: {len(_index)} titles in {time.perf_counter() - start:.2f}s")
+        return _index
+
+def resolve_movie_id(title, year=None, db=None):
+    """
+    Title -> TMDB ID from the local index, searching TMDB only on a miss
+    """
+    movie_id, _ = get_title_index(db).lookup(title, year)
+    if movie_id is None:
+        movie_id = get_movie_id_by_name(title, year=parse_year(year))
+    return movie_id
+
+async def resolve_movie_ids_async(titles, years=None, index=None):
+    """
+    Resolve many titles: the index answers what it can and the misses are searched on TMDB concurrently
+    Args:
+        titles: Titles to resolve
+        years: Release year per title (None entries allowed)
+        index: TitleIndex to use (default: the shared one, which must already be built)
+    Returns:
+        list: TMDB ID per title, None where neither the index nor TMDB has a match
+    """
+    index = index or get_title_index()
+    years = list(years) if years is not None else [None] * len(titles)
+    movie_ids = [index.lookup(title, year)[0] for title, year in zip(titles, years)]
+    misses = [i for i, movie_id in enumerate(movie_ids) if movie_id is None]
+    found = await asyncio.gather(*(
+        get_movie_id_by_name_async(titles[i], year=parse_year(years[i])) for i in misses
+    ))
+    for i, movie_id in zip(misses, found):
+        movie_ids[i] = movie_id
+    print(f"Resolved {len(titles) - len(misses)} of {len(titles)} titles locally, searched TMDB for {len(misses)}")
+    return movie_ids
@@ -0,0 +1,169 @@
+import os
+import time
+import asyncio
+import threading
+import aiohttp
+import requests
+from themoviedb import aioTMDb
+from app.services.circuit_breaker import CircuitBreaker
+
+# Connection pool shared by every async TMDB call; TMDB is a single host, so the per-host limit is the one that binds
+MAX_CONNECTIONS = int(os.getenv('TMDB_MAX_CONNECTIONS', '64'))
+MAX_CONNECTIONS_PER_HOST = int(os.getenv('TMDB_MAX_CONNECTIONS_PER_HOST', '32'))
+# Requests allowed in flight at once; callers beyond this wait for a slot instead of queueing in the pool
+MAX_CONCURRENT_REQUESTS = int(os.getenv('TMDB_MAX_CONCURRENT_REQUESTS', '32'))
+# Deadline of a single TMDB call (sync and async clients); TMDB answers in well under a second when healthy
+REQUEST_TIMEOUT_SECONDS = float(os.getenv('TMDB_REQUEST_TIMEOUT_SECONDS', '5'))
+CONNECT_TIMEOUT_SECONDS = float(os.getenv('TMDB_CONNECT_TIMEOUT_SECONDS', '2'))
+KEEPALIVE_SECONDS = 30
+# TMDB allows roughly 50 requests per second per IP; stay under it with a small burst allowance.
+# TMDB_REQUESTS_PER_SECOND is the budget of the whole host, split evenly between the worker processes
+# (WEB_CONCURRENCY, as set for uvicorn / gunicorn); the limit below applies per process, to the sync
+# and async clients and every event loop together
+WORKER_PROCESSES = max(1, int(os.getenv('WEB_CONCURRENCY', '1')))
+REQUESTS_PER_SECOND = float(os.getenv('TMDB_REQUESTS_PER_SECOND', '40')) / WORKER_PROCESSES
+
+# One breaker for TMDB across both clients: after this many consecutive timeouts / 5xx / 429s,
+# calls fail immediately for TMDB_BREAKER_RESET_SECONDS and callers fall back to the local cache
+breaker = CircuitBreaker(
+    'tmdb',
+    failure_threshold=int(os.getenv('TMDB_BREAKER_FAILURES', '5')),
+    reset_timeout=float(os.getenv('TMDB_BREAKER_RESET_SECONDS', '30')),
+)
+
+def is_upstream_failure(error):
+    """
+    Whether an error from a TMDB call means TMDB is unhealthy rather than that the request was bad
+    (a 404 for a deleted movie must not open the circuit)
+    """
+    if isinstance(error, (asyncio.TimeoutError, aiohttp.ClientConnectionError, requests.ConnectionError, requests.Timeout)):
+        return True
+    status = getattr(error, 'status', None)
+    if status is None and isinstance(error, requests.HTTPError) and error.response is not None:
+        status = error.response.status_code
+    return status is not None and (status >= 500 or status == 429)
+
+class TokenBucket:
+    """
+    Rate limiter: tokens refill at `rate` per second up to `capacity`, one per request
+    Shared by threads and event loops: a caller reserves its token under a lock, possibly driving the
+    balance negative, and then sleeps until that token has refilled, so waiting callers go out in order
+    """
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.clock = clock
+        self.tokens = self.capacity
+        self.updated_at = clock()
+        self._lock = threading.Lock()
+
+    def _reserve(self):
+        """
+        Take a token and return how many seconds to wait before using it
+        """
+        with self._lock:
+            now = self.clock()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            self.tokens -= 1
+            return max(0.0, -self.tokens / self.rate)
+
+    async def acquire(self):
+        """
+        Wait until a token is available and take it (coroutines)
+        """
+        delay = self._reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def acquire_blocking(self):
+        """
+        Wait until a token is available and take it (threads)
+        """
+        delay = self._reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+# One budget for every TMDB call this process makes
+rate_limiter = TokenBucket(REQUESTS_PER_SECOND)
+
+# A session and semaphore belong to the event loop that created them, so each loop
+# gets its own, e.g. the API's loop and a catalog build running asyncio.run in another thread
+_loop_clients = {}
+_loop_clients_lock = threading.Lock()
+
+def _create_session():
+    connector = aiohttp.TCPConnector(
+        limit=MAX_CONNECTIONS,
+        limit_per_host=MAX_CONNECTIONS_PER_HOST,
+        keepalive_timeout=KEEPALIVE_SECONDS,
+        ttl_dns_cache=300,
+    )
+    timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT_SECONDS, connect=CONNECT_TIMEOUT_SECONDS)
+    return aiohttp.ClientSession(connector=connector, timeout=timeout, raise_for_status=True)
+
+def _forget_closed_loops():
+    """
+    Drop the clients of event loops that no longer exist; called with the lock held
+    A closed loop's connections cannot be closed anymore, which is why every loop that used the
+    client must end with close_async_tmdb
+    """
+    for loop in [loop for loop in _loop_clients if loop.is_closed()]:
+        if not _loop_clients.pop(loop)['session'].closed:
+            print("An event loop ended without close_async_tmdb, its TMDB connections were left open")
+
+def _loop_client():
+    """
+    The client, session and concurrency limit of the running event loop, created on first use
+    """
+    loop = asyncio.get_running_loop()
+    with _loop_clients_lock:
+        _forget_closed_loops()
+        state = _loop_clients.get(loop)
+        if state is None or state['session'].closed:
+            session = _create_session()
+            state = {
+                'session': session,
+                'client': aioTMDb(key=os.getenv("TMDB_API_KEY"), language="en-US", session=session),
+                'semaphore': asyncio.Semaphore(MAX_CONCURRENT_REQUESTS),
+            }
+            _loop_clients[loop] = state
+    return state
+
+def get_async_tmdb():
+    """
+    Return the async TMDB client for the running event loop, creating its pooled session on first use
+    Must be called from inside a coroutine
+    """
+    return _loop_client()['client']
+
+async def tmdb_call(make_request):
+    """
+    Run one TMDB request under the rate and concurrency limits and the circuit breaker
+    Raises CircuitOpenError without waiting while TMDB is marked as down
+    Args:
+        make_request: Function taking the async client and returning the request coroutine,
+            e.g. lambda tmdb: tmdb.movie(155).details()
+    Returns:
+        The parsed response
+    """
+    state = _loop_client()
+
+    async def limited():
+        await rate_limiter.acquire()
+        async with state['semaphore']:
+            return await make_request(state['client'])
+
+    return await breaker.call_async(limited, is_failure=is_upstream_failure)
+
+async def close_async_tmdb():
+    """
+    Close the pooled session of the running event loop (application shutdown, end of an asyncio.run)
+    Sessions of loops still running elsewhere are left to their own loop
+    """
+    with _loop_clients_lock:
+        state = _loop_clients.pop(asyncio.get_running_loop(), None)
+        _forget_closed_loops()
+    if state is not None and not state['session'].closed:
+        await state['session'].close()
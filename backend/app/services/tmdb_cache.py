@@ -0,0 +1,252 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from datetime import date, datetime
+
+# Local cache of TMDB responses, shared by every worker process on the box
+DEFAULT_CACHE_PATH = os.getenv(
+    'TMDB_CACHE_PATH', os.path.join(os.path.dirname(__file__), '..', 'data', 'tmdb_cache.sqlite')
+)
+DEFAULT_MAX_BYTES = int(float(os.getenv('TMDB_CACHE_MAX_MB', '64')) * 1024 * 1024)
+
+DAY = 24 * 60 * 60
+# How long each kind of response stays fresh; details rarely change, availability changes daily
+ENDPOINT_TTLS = {
+    'movie': 7 * DAY,
+    'recommendations': 3 * DAY,
+    'search': 30 * DAY,
+    'providers': DAY,
+    'provider_list': 7 * DAY,
+}
+DEFAULT_TTL = DAY
+# Eviction trims the cache to this fraction of its budget so it does not run on every write
+EVICTION_TARGET = 0.9
+# LRU order only needs to be approximate: a hit refreshes last_access only if it is older than
+# this many seconds, so repeated hits on a hot entry stay reads instead of writes
+ACCESS_RESOLUTION = 60
+
+def _json_default(value):
+    # TMDB models carry release dates as date objects
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+class TMDBCache:
+    """
+    Disk-backed TMDB response cache: SQLite rows keyed by (endpoint, key) with a JSON payload,
+    an expiry per endpoint and the time of last access for LRU eviction
+    The total payload size is kept up to date by triggers in a one-row table, so checking the
+    budget on every write does not scan the cache, and every process sharing the file sees it
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES, ttls=None, clock=time.time,
+                 access_resolution=ACCESS_RESOLUTION):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.access_resolution = access_resolution
+        self.ttls = dict(ENDPOINT_TTLS, **(ttls or {}))
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0, 'expired': 0, 'stale': 0, 'writes': 0, 'evictions': 0}
+        self._endpoint_counters = {}
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " endpoint TEXT NOT NULL, key TEXT NOT NULL, payload TEXT NOT NULL, size INTEGER NOT NULL,"
+            " fetched_at REAL NOT NULL, expires_at REAL NOT NULL, last_access REAL NOT NULL,"
+            " PRIMARY KEY (endpoint, key))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS cache_size (id INTEGER PRIMARY KEY CHECK (id = 0), bytes INTEGER NOT NULL)")
+        # Caches written before the table existed start from their current size
+        self._conn.execute("INSERT OR IGNORE INTO cache_size VALUES (0, (SELECT COALESCE(SUM(size), 0) FROM responses))")
+        self._conn.execute(
+            "CREATE TRIGGER IF NOT EXISTS responses_insert_size AFTER INSERT ON responses"
+            " BEGIN UPDATE cache_size SET bytes = bytes + NEW.size WHERE id = 0; END"
+        )
+        self._conn.execute(
+            "CREATE TRIGGER IF NOT EXISTS responses_update_size AFTER UPDATE OF size ON responses"
+            " BEGIN UPDATE cache_size SET bytes = bytes + NEW.size - OLD.size WHERE id = 0; END"
+        )
+        self._conn.execute(
+            "CREATE TRIGGER IF NOT EXISTS responses_delete_size AFTER DELETE ON responses"
+            " BEGIN UPDATE cache_size SET bytes = bytes - OLD.size WHERE id = 0; END"
+        )
+
+    def _count(self, endpoint, counter):
+        self._counters[counter] += 1
+        counters = self._endpoint_counters.setdefault(endpoint, {'hits': 0, 'misses': 0})
+        if counter in counters:
+            counters[counter] += 1
+
+    def get(self, endpoint, key):
+        """
+        Look up a cached response
+        Args:
+            endpoint: Kind of response, e.g. 'movie' or 'search' (selects the TTL)
+            key: Request arguments identifying the response, e.g. the movie ID
+        Returns:
+            tuple: (True, value) on a fresh hit, (False, None) on a miss or an expired entry
+        """
+        found, value, _ = self.lookup(endpoint, key, allow_stale=False)
+        return found, value
+
+    def lookup(self, endpoint, key, allow_stale=True):
+        """
+        Look up a cached response, expired ones included, so a caller can serve it while it refreshes
+        Returns:
+            tuple: (found, value, fresh); expired entries stay on disk until evicted
+        """
+        now = self.clock()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload, expires_at, last_access FROM responses WHERE endpoint = ? AND key = ?",
+                (endpoint, str(key))
+            ).fetchone()
+            fresh = row is not None and row[1] > now
+            if row is not None and not fresh:
+                self._counters['expired'] += 1
+            if row is None or not (fresh or allow_stale):
+                self._count(endpoint, 'misses')
+                return False, None, False
+            if now - row[2] >= self.access_resolution:
+                self._conn.execute(
+                    "UPDATE responses SET last_access = ? WHERE endpoint = ? AND key = ?", (now, endpoint, str(key))
+                )
+            self._count(endpoint, 'hits' if fresh else 'stale')
+        return True, json.loads(row[0]), fresh
+
+    def set(self, endpoint, key, value):
+        """
+        Store a response and evict the least recently used ones if the cache is over its size budget
+        Returns:
+            The value as it will be read back from the cache (dates become ISO strings, tuples lists)
+        """
+        payload = json.dumps(value, default=_json_default)
+        now = self.clock()
+        ttl = self.ttls.get(endpoint, DEFAULT_TTL)
+        with self._lock:
+            # An upsert rather than INSERT OR REPLACE: the replaced row's delete trigger would not fire
+            self._conn.execute(
+                "INSERT INTO responses (endpoint, key, payload, size, fetched_at, expires_at, last_access)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (endpoint, key) DO UPDATE SET payload = excluded.payload, size = excluded.size,"
+                " fetched_at = excluded.fetched_at, expires_at = excluded.expires_at, last_access = excluded.last_access",
+                (endpoint, str(key), payload, len(payload), now, now + ttl, now)
+            )
+            self._counters['writes'] += 1
+            self._evict()
+        return json.loads(payload)
+
+    def _total_bytes(self):
+        return self._conn.execute("SELECT bytes FROM cache_size WHERE id = 0").fetchone()[0]
+
+    def _evict(self):
+        """
+        Drop expired entries, then least recently used ones, until the cache is under its budget
+        Called with the lock held
+        """
+        total = self._total_bytes()
+        if total <= self.max_bytes:
+            return
+        target = self.max_bytes * EVICTION_TARGET
+        evicted = self._conn.execute("DELETE FROM responses WHERE expires_at <= ?", (self.clock(),)).rowcount
+        total = self._total_bytes()
+        if total > target:
+            # Walk entries oldest access first and cut where the remainder fits the target
+            cutoff, freed = None, 0
+            for last_access, size in self._conn.execute("SELECT last_access, size FROM responses ORDER BY last_access"):
+                freed += size
+                cutoff = last_access
+                if total - freed <= target:
+                    break
+            evicted += self._conn.execute("DELETE FROM responses WHERE last_access <= ?", (cutoff,)).rowcount
+        self._counters['evictions'] += evicted
+
+    def get_or_fetch(self, endpoint, key, fetch):
+        """
+        Return the cached response, or call fetch() and cache what it returns
+        Exceptions from fetch propagate and nothing is cached, so failures are retried on the next call
+        """
+        found, value = self.get(endpoint, key)
+        if found:
+            return value
+        return self.set(endpoint, key, fetch())
+
+    async def get_or_fetch_async(self, endpoint, key, fetch):
+        """
+        get_or_fetch for coroutines: fetch() returns an awaitable
+        The SQLite reads and writes are local and short, so they run on the event loop
+        """
+        found, value = self.get(endpoint, key)
+        if found:
+            return value
+        return self.set(endpoint, key, await fetch())
+
+    def items(self, endpoint):
+        """
+        All cached (key, value) pairs of an endpoint, expired or not, e.g. to reuse past searches offline
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT key, payload FROM responses WHERE endpoint = ?", (endpoint,)).fetchall()
+        return [(key, json.loads(payload)) for key, payload in rows]
+
+    def invalidate(self, endpoint, key=None):
+        """
+        Remove one cached response, or every response of an endpoint if key is None
+        """
+        with self._lock:
+            if key is None:
+                self._conn.execute("DELETE FROM responses WHERE endpoint = ?", (endpoint,))
+            else:
+                self._conn.execute("DELETE FROM responses WHERE endpoint = ? AND key = ?", (endpoint, str(key)))
+
+    def stats(self):
+        """
+        Hit/miss counters of this process and the size of the cache on disk
+        """
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            size = self._total_bytes()
+            counters = dict(self._counters)
+            endpoints = {endpoint: dict(counts) for endpoint, counts in self._endpoint_counters.items()}
+        lookups = counters['hits'] + counters['misses']
+        return {
+            **counters,
+            'hit_rate': counters['hits'] / lookups if lookups else None,
+            'endpoints': endpoints,
+            'entries': entries,
+            'bytes': size,
+            'max_bytes': self.max_bytes,
+            'path': self.path,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_cache():
+    """
+    Return the shared TMDB cache, opening it on first use
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = TMDBCache()
+    return _cache
+
+def cache_stats():
+    """
+    Stats of the shared cache (see TMDBCache.stats)
+    """
+    return get_cache().stats()
@@ -1,13 +1,21 @@
 from app.models.models import Rating, Movie, User, Recommendation
 from sqlalchemy.orm import Session
 from sqlalchemy import desc
-from app.ml_models.ml_models import get_movie_recommendations
+from fastapi.concurrency import run_in_threadpool
 from app.services.recommender import cluster_user_movies
-from app.services.moviedata import get_movie_data, movie_recommendations
+from app.services.moviedata import get_movie_data, movie_recommendations, get_movie_streaming_data_async
 import pandas as pd
 import random
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 
+# Source movies sampled per weekly recommendation, and threads fetching their TMDB recommendations.
+# The pool is shared by all requests so concurrent generations cannot multiply the load on TMDB
+MAX_SOURCE_MOVIES = 10
+FANOUT_WORKERS = 10
+_fanout_executor = ThreadPoolExecutor(max_workers=FANOUT_WORKERS, thread_name_prefix='weekly-fanout')
+
 def ensure_timezone_aware(dt):
     """Ensure a datetime is timezone-aware, assuming UTC if it's naive"""
     if dt is None:
@@ -94,7 +102,8 @@ def get_weekly_recommendation(user_id: int, db: Session, force_new: bool = False
         movie = db.query(Movie).filter(Movie.id == existing_recommendation.movie_id).first()
         print("Movie: ", movie)
         if movie:
-            tmdb_data = get_movie_data(movie.id)
+            # TMDB may be down with nothing cached; serve what the database has rather than failing
+            tmdb_data = get_movie_data(movie.id) or {}
             
             source_movies = []
             if existing_recommendation.source_movies:
@@ -106,8 +115,8 @@ def get_weekly_recommendation(user_id: int, db: Session, force_new: bool = False
                 'genre': movie.genre,
                 'director': movie.director,
                 'year': movie.year,
-                'vote_count': tmdb_data.get('vote_count') if tmdb_data else None,
-                'overview': tmdb_data.get('overview') if tmdb_data else None,
+                'vote_count': tmdb_data.get('vote_count'),
+                'overview': tmdb_data.get('overview'),
                 'is_new': False,
                 "genre_ids": tmdb_data.get('genre_ids', None),
                 "poster_path": tmdb_data.get('poster_path', None),
@@ -115,7 +124,7 @@ def get_weekly_recommendation(user_id: int, db: Session, force_new: bool = False
                 "release_date": tmdb_data.get('release_date', None),
                 "overview": tmdb_data.get('overview', None),
                 "tagline": tmdb_data.get('tagline', None),
-                "director": tmdb_data.get('director', None),
+                "director": tmdb_data.get('director', movie.director),
                 'source_movie': source_movies,
                 'generated_date': existing_recommendation.time_generated.isoformat()
             }
@@ -150,7 +159,7 @@ def get_weekly_recommendation(user_id: int, db: Session, force_new: bool = False
                 db.commit()
                 print(f"Recreated movie: {movie.title} (ID: {movie.id})")
                 
-                tmdb_data = get_movie_data(movie.id)
+                tmdb_data = movie_data
                 
                 source_movies = []
                 if existing_recommendation.source_movies:
@@ -162,8 +171,8 @@ def get_weekly_recommendation(user_id: int, db: Session, force_new: bool = False
                     'genre': movie.genre,
                     'director': movie.director,
                     'year': movie.year,
-                    'vote_count': tmdb_data.get('vote_count') if tmdb_data else None,
-                    'overview': tmdb_data.get('overview') if tmdb_data else None,
+                    'vote_count': tmdb_data.get('vote_count'),
+                    'overview': tmdb_data.get('overview'),
                     'is_new': False,
                     "genre_ids": tmdb_data.get('genre_ids', None),
                     "poster_path": tmdb_data.get('poster_path', None),
@@ -171,7 +180,7 @@ def get_weekly_recommendation(user_id: int, db: Session, force_new: bool = False
                     "release_date": tmdb_data.get('release_date', None),
                     "overview": tmdb_data.get('overview', None),
                     "tagline": tmdb_data.get('tagline', None),
-                    "director": tmdb_data.get('director', None),
+                    "director": tmdb_data.get('director', movie.director),
                     'source_movie': source_movies,
                     'generated_date': existing_recommendation.time_generated.isoformat()
                 }
@@ -196,21 +205,24 @@ def generate_weekly_recommendation(user_id: int, db: Session):
     if not source_ratings:
         return None
     
-    num_to_select = min(10, len(source_ratings))
+    num_to_select = min(MAX_SOURCE_MOVIES, len(source_ratings))
     selected_ratings = random.sample(source_ratings, num_to_select)
     #print(selected_ratings)
     
     all_user_rated_movies = db.query(Rating.movie_id).filter(Rating.user_id == user_id).all()
-    user_rated_movie_ids = [rating.movie_id for rating in all_user_rated_movies]
+    user_rated_movie_ids = {rating.movie_id for rating in all_user_rated_movies}
     all_recommendations = {}
     #print("All user rated movie ids: ", user_rated_movie_ids)
 
-    for selected_rating in selected_ratings:
-        source_movie = db.query(Movie).filter(Movie.id == selected_rating.movie_id).first()
-        source_movie_name = source_movie.title if source_movie else f"Movie ID {selected_rating.movie_id}"
+    source_ids = [selected_rating.movie_id for selected_rating in selected_ratings]
+    source_titles = dict(db.query(Movie.id, Movie.title).filter(Movie.id.in_(source_ids)).all())
+    # Fetch every source's TMDB recommendations at once; map keeps the sample order for tie-breaking
+    source_recommendations = _fanout_executor.map(movie_recommendations, source_ids)
+
+    for source_id, recs in zip(source_ids, source_recommendations):
+        source_movie_name = source_titles.get(source_id, f"Movie ID {source_id}")
         
-        recs = movie_recommendations(selected_rating.movie_id)
-        for rec in recs:
+        for rec in recs or []:
             if rec['id'] in user_rated_movie_ids:
                 continue
             if rec['id'] in all_recommendations:
@@ -218,6 +230,8 @@ def generate_weekly_recommendation(user_id: int, db: Session):
             else:
                 all_recommendations[rec['id']] = [source_movie_name]
     
+    if not all_recommendations:
+        return None
     selected_recommendation_id = max(all_recommendations, key=lambda x: len(all_recommendations[x]))
     detailed_movie_data = get_movie_data(selected_recommendation_id)
     source_movies = all_recommendations[selected_recommendation_id]
@@ -279,4 +293,24 @@ def get_weekly_recommendation_status(user_id: int, db: Session):
         'days_until_new': days_until_new,
         'can_generate_new': days_until_new == 0,
         'last_generated': existing_recommendation.time_generated.isoformat()
-    } 
\ No newline at end of file
+    } 
+
+async def prefetch_streaming_data(db: Session, regions=("US",)):
+    """
+    Warm the provider cache for every stored weekly recommendation so page views never wait on TMDB
+    Entries that are still fresh are not fetched again
+    Args:
+        db: Database session
+        regions: Regions to warm, e.g. ("US", "GB")
+    Returns:
+        dict: Number of movies and regions warmed and how many lookups failed
+    """
+    # The query is synchronous; run it off the event loop so other requests are not blocked
+    rows = await run_in_threadpool(lambda: db.query(Recommendation.movie_id).distinct().all())
+    movie_ids = [movie_id for (movie_id,) in rows if movie_id is not None]
+    results = await asyncio.gather(*(
+        get_movie_streaming_data_async(movie_id, region) for movie_id in movie_ids for region in regions
+    ))
+    failed = sum(result is None for result in results)
+    print(f"Prefetched providers for {len(movie_ids)} movies in {len(regions)} regions ({failed} failed)")
+    return {'movies': len(movie_ids), 'regions': list(regions), 'failed': failed}
@@ -0,0 +1,96 @@
+import sys
+import os
+import time
+import argparse
+# Add the parent directory (backend) to the path so we can import from app
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.preprocessing import StandardScaler
+from app.ml_models.features import MovieFeatureEncoder
+from app.ml_models.ann import build_index
+
+K = 10
+PRUNED_CONFIGS = [
+    {'max_postings': 100},
+    {'max_postings': 1000},
+    {'max_postings': 10000},
+    # Candidate budgets: recall@10 against QPS
+    {'max_postings': 1000, 'max_candidates': 1000},
+    {'max_postings': 1000, 'max_candidates': 200},
+    {'max_postings': 1000, 'max_candidates': 50},
+    {'max_postings': 1000, 'max_candidates': 20},
+    {'max_postings': 1000, 'max_candidates': 11},
+]
+
+def make_catalog(n_movies, rng):
+    """
+    Synthetic catalog with real neighbor structure: each director has a recurring
+    cast pool and favourite genres, the way filmographies cluster in the TMDB data
+    """
+    n_directors = max(n_movies // 8, 1)
+    director = rng.integers(0, n_directors, size=n_movies)
+    cast_pool = rng.integers(0, n_movies, size=(n_directors, 6))
+    genre_pool = rng.integers(0, 19, size=(n_directors, 3))
+    languages = np.array(['en', 'fr', 'ko', 'ja', 'es', 'de', 'it', 'hi'])
+    rows = []
+    for d in director:
+        own_cast = rng.choice(cast_pool[d], size=2, replace=False).tolist()
+        rows.append({
+            'genre_ids': sorted(set(rng.choice(genre_pool[d], size=2).tolist())),
+            'original_language': languages[d % len(languages)] if rng.random() < 0.9 else rng.choice(languages),
+            'cast': [f'Actor {c}' for c in own_cast + [int(rng.integers(0, n_movies))]],
+            'director': f'Director {d}',
+        })
+    return pd.DataFrame(rows)
+
+def measure(index, queries):
+    start = time.perf_counter()
+    distances, _ = index.kneighbors(queries, n_neighbors=K + 1)
+    elapsed = time.perf_counter() - start
+    return distances, queries.shape[0] / elapsed
+
+def main():
+    """Report recall@10 and queries per second of the pruned backend, exact and with candidate budgets, against brute-force kNN"""
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--movies', type=int, default=100_000)
+    parser.add_argument('--queries', type=int, default=200)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    catalog = make_catalog(args.movies, rng)
+    X = StandardScaler(with_mean=False).fit_transform(MovieFeatureEncoder().fit_transform(catalog)).tocsr()
+    queries = X[rng.choice(X.shape[0], size=args.queries, replace=False)]
+    # Taste profiles: rating-weighted means of 20 catalog movies, far denser than a single movie
+    profile_rows = rng.choice(X.shape[0], size=(args.queries, 20))
+    weights = sparse.csr_matrix(
+        (np.full(profile_rows.size, 1 / 20), (np.repeat(np.arange(args.queries), 20), profile_rows.ravel())),
+        shape=(args.queries, X.shape[0])
+    )
+    profiles = (weights @ X).tocsr()
+    print(f"Catalog: {X.shape[0]} movies x {X.shape[1]} features, {args.queries} movie and {args.queries} profile queries")
+
+    exact = build_index(X, 'exact')
+    print(f"{'backend':<48} {'build (s)':>9} {'queries':>8} {'recall@10':>10} {'QPS':>9}")
+    truths = {}
+    for kind, batch in (('movie', queries), ('profile', profiles)):
+        truths[kind], exact_qps = measure(exact, batch)
+        print(f"{'exact':<48} {0.0:>9.2f} {kind:>8} {1.0:>10.3f} {exact_qps:>9.1f}")
+
+    for params in PRUNED_CONFIGS:
+        start = time.perf_counter()
+        index = build_index(X, 'pruned', **params)
+        build_s = time.perf_counter() - start
+        label = 'pruned ' + ', '.join(f'{k}={v}' for k, v in params.items())
+        for kind, batch in (('movie', queries), ('profile', profiles)):
+            found, qps = measure(index, batch)
+            # One-hot rows tie a lot, so a neighbor counts as found when it is no farther than the
+            # exact (K+1)-th neighbor (column 0 of a movie query is the movie itself)
+            truth = truths[kind]
+            recall = np.mean(found <= truth[:, K:K + 1] * (1 + 1e-9) + 1e-6)
+            print(f"{label:<48} {build_s:>9.2f} {kind:>8} {recall:>10.3f} {qps:>9.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+import sys
+import os
+import time
+# Add the parent directory (backend) to the path so we can import from app
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from app.ml_models.ml_models import build_id_index, feature_row
+
+CATALOG_SIZES = [10_000, 100_000, 1_000_000]
+N_FEATURES = 5_000
+NNZ_PER_ROW = 7
+N_QUERIES = 200
+
+def make_catalog(n_movies, rng):
+    """Create a synthetic catalog: shuffled TMDB-like ids and a sparse one-hot feature matrix"""
+    ids = rng.choice(np.arange(1, n_movies * 5), size=n_movies, replace=False)
+    movie_data = pd.DataFrame({'id': ids, 'title': [f'Movie {i}' for i in range(n_movies)]})
+    indices = rng.integers(0, N_FEATURES, size=n_movies * NNZ_PER_ROW).astype(np.int32)
+    indptr = np.arange(0, n_movies * NNZ_PER_ROW + 1, NNZ_PER_ROW)
+    X = sparse.csr_matrix((np.ones(len(indices)), indices, indptr), shape=(n_movies, N_FEATURES))
+    return movie_data, X
+
+def time_per_query(fn, queries):
+    start = time.perf_counter()
+    for movie_id in queries:
+        fn(movie_id)
+    return (time.perf_counter() - start) / len(queries) * 1e6
+
+def main():
+    """Compare boolean-scan lookups with the id->row index across catalog sizes"""
+    rng = np.random.default_rng(42)
+    print(f"{'movies':>10} {'scan (us)':>12} {'index build (ms)':>17} {'index (us)':>11} {'index+row (us)':>15}")
+    for n_movies in CATALOG_SIZES:
+        movie_data, X = make_catalog(n_movies, rng)
+        queries = [int(x) for x in rng.choice(movie_data['id'].values, size=N_QUERIES)]
+
+        scan_us = time_per_query(lambda movie_id: movie_data[movie_data['id'] == movie_id].index[0], queries)
+
+        start = time.perf_counter()
+        id_to_row = build_id_index(movie_data)
+        build_ms = (time.perf_counter() - start) * 1e3
+
+        index_us = time_per_query(lambda movie_id: id_to_row.get(movie_id), queries)
+        row_us = time_per_query(lambda movie_id: feature_row(X, id_to_row[movie_id]), queries)
+
+        print(f"{n_movies:>10} {scan_us:>12.1f} {build_ms:>17.1f} {index_us:>11.2f} {row_us:>15.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+import sys
+import os
+import time
+# Add the parent directory (backend) to the path so we can import from app
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import StandardScaler
+from app.ml_models.features import MovieFeatureEncoder
+from app.ml_models.ml_models import encode_movie
+
+CATALOG_SIZES = [1_000, 10_000, 100_000]
+N_QUERIES = 500
+
+def make_catalog(n_movies, rng):
+    """Synthetic catalog with roughly one new cast member per movie, like the real data"""
+    n_people = n_movies * 2
+    return pd.DataFrame({
+        'genre_ids': [list(rng.choice(20, size=2, replace=False)) for _ in range(n_movies)],
+        'original_language': rng.choice(['en', 'fr', 'ko', 'ja', 'es'], size=n_movies),
+        'cast': [[f'Actor {i}' for i in rng.choice(n_people, size=3, replace=False)] for _ in range(n_movies)],
+        'director': [f'Director {i}' for i in rng.integers(0, n_movies // 2, size=n_movies)],
+    })
+
+def main():
+    """Time encoding one out-of-catalog movie: DataFrame transform + scaler vs. dictionary lookups"""
+    rng = np.random.default_rng(7)
+    print(f"{'movies':>8} {'features':>9} {'DataFrame + scaler (us)':>24} {'encode_movie (us)':>18}")
+    for n_movies in CATALOG_SIZES:
+        catalog = make_catalog(n_movies, rng)
+        encoder = MovieFeatureEncoder()
+        scaler = StandardScaler(with_mean=False).fit(encoder.fit_transform(catalog))
+        movies = catalog.sample(N_QUERIES, random_state=0).to_dict('records')
+
+        start = time.perf_counter()
+        for movie in movies:
+            scaler.transform(encoder.transform(pd.DataFrame([movie])))
+        frame_us = (time.perf_counter() - start) / N_QUERIES * 1e6
+
+        start = time.perf_counter()
+        for movie in movies:
+            encode_movie(movie, encoder, scaler)
+        lookup_us = (time.perf_counter() - start) / N_QUERIES * 1e6
+
+        print(f"{n_movies:>8} {len(encoder.feature_names_):>9} {frame_us:>24.1f} {lookup_us:>18.1f}")
+
+if __name__ == "__main__":
+    main()
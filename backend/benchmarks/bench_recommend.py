@@ -0,0 +1,104 @@
+import sys
+import os
+import time
+import random
+# Add the parent directory (backend) to the path so we can import from app
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import tempfile
+from contextlib import redirect_stdout
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from app.models.models import User, Movie, Rating
+from app.ml_models.ml_models import train_and_save_model
+from app.ml_models.catalog import read_catalog_csv
+from app.services.recommender import aggregate_candidates, top_n_metadata, recommend
+
+N_RUNS = 20
+SOURCES = [10, 100, 1_000]
+CANDIDATES_PER_SOURCE = 20
+
+def previous_aggregation(frames, titles, ratings, top_n):
+    """
+    The merge recommend() used before: concat per-source frames, group by the metadata with
+    genre lists turned into strings, collect sources with a lambda and eval the genres back
+    """
+    tagged = []
+    for frame, title, rating in zip(frames, titles, ratings):
+        frame = frame.copy()
+        frame['source_movie'] = title
+        frame['user_rating'] = rating
+        frame['weighted_score'] = rating
+        tagged.append(frame)
+    combined = pd.concat(tagged, ignore_index=True)
+    combined['genre_ids_str'] = combined['genre_ids'].astype(str)
+    final = combined.groupby(['id', 'title', 'vote_average', 'vote_count', 'genre_ids_str', 'poster_path']).agg({
+        'source_movie': lambda x: list(x),
+        'user_rating': 'mean',
+        'weighted_score': 'sum'
+    }).reset_index()
+    final['genre_ids'] = final['genre_ids_str'].apply(eval)
+    final = final.drop('genre_ids_str', axis=1)
+    return final.sort_values('weighted_score', ascending=False).head(top_n)
+
+def vectorized_aggregation(frames, titles, ratings, top_n):
+    ids = np.concatenate([frame['id'].to_numpy() for frame in frames])
+    positions = np.repeat(np.arange(len(frames)), [len(frame) for frame in frames])
+    top_ids, scores, mean_ratings, sources = aggregate_candidates(ids, positions, np.asarray(ratings), top_n)
+    final = top_n_metadata(top_ids, sources, dict(enumerate(frames)))
+    final['source_movie'] = [[titles[position] for position in movie_sources] for movie_sources in sources]
+    final['user_rating'] = mean_ratings
+    final['weighted_score'] = scores
+    return final
+
+def time_per_call(function, *args):
+    start = time.perf_counter()
+    for _ in range(N_RUNS):
+        function(*args)
+    return (time.perf_counter() - start) / N_RUNS * 1e3
+
+def bench_aggregation(catalog, rng):
+    """Merge step alone, for users whose sample holds more and more source movies"""
+    print(f"{'sources':>8} {'pandas groupby (ms)':>20} {'NumPy scatter-add (ms)':>23}")
+    catalog = catalog.fillna({'poster_path': ''})
+    for n_sources in SOURCES:
+        frames = [catalog.iloc[rng.choice(len(catalog), CANDIDATES_PER_SOURCE, replace=False)] for _ in range(n_sources)]
+        titles = [f'Source {i}' for i in range(n_sources)]
+        ratings = rng.choice([3.5, 4.0, 4.5, 5.0], size=n_sources).tolist()
+        print(f"{n_sources:>8} {time_per_call(previous_aggregation, frames, titles, ratings, 10):>20.2f} "
+              f"{time_per_call(vectorized_aggregation, frames, titles, ratings, 10):>23.2f}")
+
+def bench_recommend(catalog, model_dir):
+    """The db_tools/test_recommender.py scenario: two users with five ratings each, end to end"""
+    # Training and recommend() log every step; keep the timings readable
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        train_and_save_model(csv_file='app/data/films.csv', model_dir=model_dir)
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    db.add_all([User(id=1, username="test1", email="test1@example.com", hashed_password="x"),
+                User(id=2, username="test2", email="test2@example.com", hashed_password="x")])
+    db.add_all([Movie(id=int(row.id), title=row.title) for row in catalog.itertuples()])
+    ids = catalog['id'].tolist()
+    db.add_all([Rating(user_id=1, movie_id=movie_id, rating=4.5) for movie_id in ids[:5]])
+    db.add_all([Rating(user_id=2, movie_id=movie_id, rating=4.0) for movie_id in ids[5:10]])
+    db.commit()
+
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        elapsed = time_per_call(lambda: [recommend(user_id, db, top_n=10) for user_id in (1, 2)])
+    print(f"\nrecommend() for both test users: {elapsed:.2f} ms")
+
+def main():
+    """Benchmark the candidate merge in recommender.recommend"""
+    random.seed(0)
+    rng = np.random.default_rng(0)
+    catalog = read_catalog_csv('app/data/films.csv').drop_duplicates('id').reset_index(drop=True)
+    bench_aggregation(catalog, rng)
+    with tempfile.TemporaryDirectory() as model_dir:
+        bench_recommend(catalog, model_dir)
+
+if __name__ == "__main__":
+    main()
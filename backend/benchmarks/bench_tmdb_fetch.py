@@ -0,0 +1,112 @@
+import sys
+import os
+import json
+import time
+import argparse
+import threading
+# Add the parent directory (backend) to the path so we can import from app
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+import requests
+from themoviedb import TMDb
+from themoviedb.routes_sync._base import Base
+from app.services import moviedata
+
+N_MOVIES = 50
+
+def fake_movie(movie_id):
+    return {
+        'id': movie_id, 'title': f'Movie {movie_id}', 'overview': 'A fake movie.', 'release_date': '1999-10-15',
+        'genres': [{'id': 18, 'name': 'Drama'}], 'poster_path': f'/poster{movie_id}.jpg',
+        'backdrop_path': f'/backdrop{movie_id}-0.jpg', 'original_language': 'en', 'runtime': 139,
+        'tagline': 'Fake tagline', 'vote_average': 8.4, 'vote_count': 30000,
+    }
+
+def fake_credits(movie_id):
+    return {
+        'id': movie_id,
+        'cast': [{'id': i, 'name': f'Actor {i}', 'order': i} for i in range(20)],
+        'crew': [{'id': 100, 'name': 'Some Director', 'job': 'Director'}],
+    }
+
+def fake_images(movie_id):
+    return {
+        'id': movie_id,
+        'backdrops': [{'file_path': f'/backdrop{movie_id}-{i}.jpg', 'vote_average': 5.0 + i % 3, 'vote_count': i}
+                      for i in range(3)],
+        'posters': [],
+    }
+
+def make_handler(latency):
+    class FakeTMDBHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        # Headers and body go out in separate writes; without this keep-alive stalls on delayed ACKs
+        disable_nagle_algorithm = True
+        requests_served = 0
+
+        def do_GET(self):
+            time.sleep(latency)
+            url = urlparse(self.path)
+            parts = url.path.strip('/').split('/')
+            movie_id = int(parts[2])
+            if len(parts) == 3:
+                body = fake_movie(movie_id)
+                for extra in parse_qs(url.query).get('append_to_response', [''])[0].split(','):
+                    if extra == 'credits':
+                        body['credits'] = fake_credits(movie_id)
+                    elif extra == 'images':
+                        body['images'] = fake_images(movie_id)
+            else:
+                body = fake_credits(movie_id) if parts[3] == 'credits' else fake_images(movie_id)
+            FakeTMDBHandler.requests_served += 1
+            payload = json.dumps(body).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    return FakeTMDBHandler
+
+def time_fetches(handler, combined, session):
+    """Fetch N_MOVIES movies uncached; returns (ms per movie, HTTP requests per movie)"""
+    moviedata._tmdb = TMDb(key='fake', language='en-US', session=session)
+    served = handler.requests_served
+    start = time.perf_counter()
+    for movie_id in range(1, N_MOVIES + 1):
+        movie = moviedata._fetch_movie_data(movie_id, combined=combined)
+        assert movie['director'] == 'Some Director' and len(movie['cast']) == 3
+    elapsed = (time.perf_counter() - start) / N_MOVIES * 1e3
+    return elapsed, (handler.requests_served - served) / N_MOVIES
+
+def main():
+    """Benchmark get_movie_data's TMDB fetch against a local fake server with injected latency"""
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--latency-ms', type=float, default=30.0, help='Server-side delay per request')
+    args = parser.parse_args()
+
+    handler = make_handler(args.latency_ms / 1e3)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    Base.TMDB_URL = f'http://127.0.0.1:{server.server_address[1]}'
+    try:
+        print(f"{N_MOVIES} movies, {args.latency_ms:.0f} ms per TMDB request")
+        print(f"{'mode':<40} {'ms/movie':>9} {'requests/movie':>15}")
+        for label, combined, session in [
+            ('3 requests, new connection each', False, None),
+            ('3 requests, pooled session', False, requests.Session()),
+            ('append_to_response, pooled session', True, requests.Session()),
+        ]:
+            elapsed, n_requests = time_fetches(handler, combined, session)
+            print(f"{label:<40} {elapsed:>9.1f} {n_requests:>15.1f}")
+    finally:
+        server.shutdown()
+        moviedata._tmdb = None
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import pandas as pd
+import pytest
+from app.ml_models import ml_models
+from app.services import recommender
+
+class FakeClock:
+    """
+    A clock for TTLs and timeouts that only moves when a test sets or advances `now`
+    """
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+@pytest.fixture
+def catalog():
+    """
+    A small TMDB-style catalog to train models on: three Coppola / Pacino crime dramas and two others
+    """
+    return pd.DataFrame({
+        'id': [278, 238, 240, 424, 389],
+        'title': ['The Shawshank Redemption', 'The Godfather', 'The Godfather Part II', "Schindler's List", '12 Angry Men'],
+        'genre_ids': [[18, 80], [18, 80], [18, 80], [18, 36], [18]],
+        'vote_average': [8.7, 8.7, 8.6, 8.6, 8.5],
+        'vote_count': [28000, 21000, 12700, 16000, 9000],
+        'original_language': ['en', 'en', 'en', 'en', 'en'],
+        'cast': [['Tim Robbins', 'Morgan Freeman'], ['Marlon Brando', 'Al Pacino'], ['Al Pacino', 'Robert Duvall'], ['Liam Neeson'], ['Henry Fonda']],
+        'director': ['Frank Darabont', 'Francis Ford Coppola', 'Francis Ford Coppola', 'Steven Spielberg', 'Sidney Lumet'],
+    })
+
+@pytest.fixture
+def new_movies():
+    """
+    Movies outside the catalog, as TMDB returns them
+    """
+    return [
+        {'id': 242, 'title': 'The Godfather Part III', 'genre_ids': [18, 80], 'original_language': 'en',
+         'cast': ['Al Pacino', 'Andy Garcia'], 'director': 'Francis Ford Coppola'},
+        {'id': 496243, 'title': 'Parasite', 'genre_ids': [35, 53, 18], 'original_language': 'ko',
+         'cast': ['Song Kang-ho'], 'director': 'Bong Joon-ho'},
+    ]
+
+@pytest.fixture(autouse=True)
+def no_loaded_model(monkeypatch):
+    """
+    Start every test without a served model, so none depends on what an earlier test loaded
+    """
+    monkeypatch.setattr(ml_models, '_model', None)
+    monkeypatch.setattr(ml_models, '_model_checked_at', 0.0)
+    monkeypatch.setattr(recommender, '_collaborative_model', None)
+    monkeypatch.setattr(recommender, '_collaborative_checked_at', 0.0)
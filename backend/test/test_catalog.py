@@ -0,0 +1,28 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import pandas as pd
+from app.ml_models.catalog import catalog_dir, convert_catalog, is_stale, load_catalog
+
+def test_columnar_catalog_round_trips_the_csv(tmp_path):
+    csv_file = str(tmp_path / 'films.csv')
+    pd.DataFrame({
+        'id': [1018, 48311],
+        'title': ['Mulholland Drive', 'Parasite'],
+        'genre_ids': ['[18, 53]', None],
+        'vote_average': [7.8, 4.8],
+        'cast': ["['Naomi Watts', 'Laura Harring']", "['Robert Glaudini']"],
+        'director': ['David Lynch', None],
+    }).to_csv(csv_file, index=False)
+    assert is_stale(csv_file)
+
+    convert_catalog(csv_file)
+    assert not is_stale(csv_file)
+    assert os.path.isdir(catalog_dir(csv_file))
+
+    catalog = load_catalog(csv_file)
+    assert catalog['genre_ids'].tolist() == [[18, 53], []]
+    assert catalog['cast'].tolist() == [['Naomi Watts', 'Laura Harring'], ['Robert Glaudini']]
+    assert catalog['id'].tolist() == [1018, 48311]
+    assert catalog.loc[0, 'director'] == 'David Lynch' and pd.isna(catalog.loc[1, 'director'])
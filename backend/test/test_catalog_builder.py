@@ -0,0 +1,84 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import time
+import asyncio
+import threading
+import pandas as pd
+from app.services import catalog_builder
+from app.services.tmdb_async import TokenBucket
+
+MOVIES = {
+    'Mulholland Drive': {'id': 1018, 'title': 'Mulholland Drive', 'genre_ids': [18, 53], 'cast': ['Naomi Watts'],
+                         'director': 'David Lynch', 'release_date': '2001-05-16', 'vote_average': 7.8, 'vote_count': 5000},
+    'Parasite': {'id': 496243, 'title': 'Parasite', 'genre_ids': [35, 53, 18], 'cast': ['Song Kang-ho'],
+                 'director': 'Bong Joon Ho', 'release_date': '2019-05-30', 'vote_average': 8.5, 'vote_count': 18000},
+}
+
+def test_interrupted_build_resumes(tmp_path, monkeypatch):
+    output_file = str(tmp_path / 'films.csv')
+    titles = ['Mulholland Drive', 'Not A Real Movie', 'Parasite']
+    searched = []
+    outage = {'on': True}
+
+    async def search(title, raise_errors=False):
+        searched.append(title)
+        if title == 'Parasite' and outage['on']:
+            raise RuntimeError("TMDB timed out")
+        return MOVIES[title]['id'] if title in MOVIES else None
+
+    async def details(movie_id, raise_errors=False):
+        return next(movie for movie in MOVIES.values() if movie['id'] == movie_id)
+
+    monkeypatch.setattr(catalog_builder, 'get_movie_id_by_name_async', search)
+    monkeypatch.setattr(catalog_builder, 'get_movie_data_async', details)
+
+    summary = asyncio.run(catalog_builder.build_catalog_from_titles(titles, output_file, n_workers=2))
+    assert summary == {'found': 1, 'not_found': 1, 'failed': 1}
+    assert os.path.exists(catalog_builder.checkpoint_path(output_file))
+
+    outage['on'] = False
+    searched.clear()
+    summary = asyncio.run(catalog_builder.build_catalog_from_titles(titles, output_file, n_workers=2))
+    assert searched == ['Parasite']
+    assert summary == {'found': 2, 'not_found': 1, 'failed': 0}
+    assert not os.path.exists(catalog_builder.checkpoint_path(output_file))
+
+    catalog = pd.read_csv(output_file)
+    assert catalog['title'].tolist() == ['Mulholland Drive', 'Parasite']
+    assert catalog['genre_ids'].tolist() == ['[18, 53]', '[35, 53, 18]']
+    assert catalog.columns.tolist() == catalog_builder.CATALOG_COLUMNS
+
+def test_token_bucket_limits_the_rate():
+    async def take(n):
+        bucket = TokenBucket(rate=100, capacity=5)
+        start = time.monotonic()
+        for _ in range(n):
+            await bucket.acquire()
+        return time.monotonic() - start
+
+    # 5 tokens come from the burst, the other 15 at 100 per second
+    assert asyncio.run(take(20)) >= 0.14
+
+def test_token_bucket_is_shared_by_threads_and_event_loops():
+    bucket = TokenBucket(rate=100, capacity=5)
+
+    async def take_async(n):
+        for _ in range(n):
+            await bucket.acquire()
+
+    def take_blocking(n):
+        for _ in range(n):
+            bucket.acquire_blocking()
+
+    start = time.monotonic()
+    threads = [threading.Thread(target=take_blocking, args=(5,)) for _ in range(2)]
+    threads.append(threading.Thread(target=asyncio.run, args=(take_async(10),)))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # 20 tokens in all: 5 from the burst and 15 at 100 per second, however the callers are spread
+    assert time.monotonic() - start >= 0.14
+    assert bucket.tokens < 1
@@ -0,0 +1,49 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import pytest
+import requests
+from app.services.circuit_breaker import CircuitBreaker, CircuitOpenError
+from app.services.tmdb_async import is_upstream_failure
+
+def failing():
+    raise requests.Timeout("read timed out")
+
+def test_opens_after_consecutive_failures_and_recovers(clock):
+    breaker = CircuitBreaker('tmdb', failure_threshold=3, reset_timeout=30, clock=clock)
+    for _ in range(3):
+        with pytest.raises(requests.Timeout):
+            breaker.call(failing)
+    assert breaker.state == 'open'
+
+    calls = []
+    with pytest.raises(CircuitOpenError):
+        breaker.call(lambda: calls.append(1))
+    assert calls == [] and breaker.stats()['rejected'] == 1
+
+    # After the reset timeout one trial goes out; a failure reopens the circuit, a success closes it
+    clock.now += 31
+    with pytest.raises(requests.Timeout):
+        breaker.call(failing)
+    assert breaker.state == 'open'
+    clock.now += 31
+    assert breaker.call(lambda: 'ok') == 'ok'
+    assert breaker.state == 'closed' and breaker.failures == 0
+
+def test_client_errors_do_not_open_the_circuit():
+    breaker = CircuitBreaker('tmdb', failure_threshold=2)
+    response = requests.Response()
+    response.status_code = 404
+    not_found = requests.HTTPError(response=response)
+
+    def missing_movie():
+        raise not_found
+
+    for _ in range(5):
+        with pytest.raises(requests.HTTPError):
+            breaker.call(missing_movie, is_failure=is_upstream_failure)
+    assert breaker.state == 'closed'
+
+    response.status_code = 503
+    assert is_upstream_failure(not_found) and is_upstream_failure(requests.ConnectionError())
@@ -0,0 +1,74 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from app.models.models import User, Movie, Rating
+from app.ml_models import collaborative
+from app.ml_models.collaborative import ratings_matrix, train_als, rmse, train_from_database, save_factors
+from app.services import recommender
+
+def taste_groups():
+    """Users 1-10 love movies 1-5 and dislike 6-10; users 11-20 the other way round"""
+    triples = []
+    for user_id in range(1, 21):
+        loved = range(1, 6) if user_id <= 10 else range(6, 11)
+        for movie_id in range(1, 11):
+            if (user_id + movie_id) % 3:  # everyone leaves a few movies unrated
+                triples.append((user_id, movie_id, 5.0 if movie_id in loved else 1.5))
+    return triples
+
+def test_als_fits_the_observed_ratings():
+    R, user_ids, movie_ids = ratings_matrix(taste_groups())
+    assert R.shape == (20, 10) and len(user_ids) == 20 and len(movie_ids) == 10
+    model = train_als(R, n_factors=4, regularization=0.01, n_iterations=10)
+    assert rmse(model, R) < 0.2
+
+def test_gram_matrices_are_the_same_whatever_the_block_size(monkeypatch):
+    R, _, _ = ratings_matrix(taste_groups())
+    fixed = np.random.default_rng(0).normal(size=(R.shape[1], 4))
+    expected = np.stack([fixed[R[row].indices].T @ fixed[R[row].indices] for row in range(R.shape[0])])
+    # 16 values per entry: one entry per block, then a few rows per block, then everything at once
+    for block_values in (1, 50, 1 << 22):
+        monkeypatch.setattr(collaborative, 'GRAM_BLOCK_VALUES', block_values)
+        assert np.allclose(collaborative._gram_matrices(R, fixed), expected)
+
+def test_collaborative_strategy_recommends_what_similar_users_liked(tmp_path):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    db.add_all([User(id=user_id, username=f"user{user_id}", email=f"user{user_id}@example.com", hashed_password="x")
+                for user_id in range(1, 22)])
+    db.add_all([Movie(id=movie_id, title=f"Movie {movie_id}") for movie_id in range(1, 11)])
+    db.add_all([Rating(user_id=user_id, movie_id=movie_id, rating=rating) for user_id, movie_id, rating in taste_groups()])
+    db.commit()
+
+    cf_dir = str(tmp_path / 'cf')
+    train_from_database(db, cf_dir=cf_dir, n_factors=4, regularization=0.01)
+    recommender.get_collaborative_model(cf_dir, reload=True)
+
+    # A user who joined after training and only rated two movies of the first group
+    db.add_all([Rating(user_id=21, movie_id=1, rating=5.0), Rating(user_id=21, movie_id=2, rating=4.5)])
+    db.commit()
+    recommendations = recommender.recommend_collaborative(21, db, top_n=3)
+    assert set(recommendations['id']) == {3, 4, 5}
+    assert recommendations['title'].tolist()[0].startswith("Movie ")
+    assert recommendations['predicted_rating'].is_monotonic_decreasing
+
+def test_newly_saved_factors_are_picked_up(tmp_path, monkeypatch):
+    cf_dir = str(tmp_path / 'cf')
+    R, user_ids, movie_ids = ratings_matrix(taste_groups())
+    save_factors(train_als(R, n_factors=2, n_iterations=2), user_ids, movie_ids, cf_dir)
+    old = recommender.get_collaborative_model(cf_dir, reload=True)
+    save_factors(train_als(R, n_factors=4, n_iterations=2), user_ids, movie_ids, cf_dir)
+
+    # Not checked again before the refresh interval has passed
+    monkeypatch.setattr(recommender, 'MODEL_REFRESH_SECONDS', 3600)
+    assert recommender.get_collaborative_model(cf_dir) is old
+    monkeypatch.setattr(recommender, 'MODEL_REFRESH_SECONDS', 0)
+    new = recommender.get_collaborative_model(cf_dir)
+    assert new['item_factors'].shape == (10, 4)
+    assert recommender.get_collaborative_model(cf_dir) is new
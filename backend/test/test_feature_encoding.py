@@ -0,0 +1,34 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import pandas as pd
+from app.ml_models.features import MovieFeatureEncoder, parse_list
+
+def test_parse_list():
+    """Stringified CSV lists are parsed without eval and bad values become empty lists"""
+    assert parse_list("['Tim Robbins', 'Morgan Freeman']") == ['Tim Robbins', 'Morgan Freeman']
+    assert parse_list([18, 80]) == [18, 80]
+    assert parse_list(None) == []
+    assert parse_list(float('nan')) == []
+    assert parse_list("__import__('os')") == []
+
+def test_encoder_one_pass():
+    """The encoder emits one sparse indicator row per movie and ignores unseen tokens"""
+    movies = pd.DataFrame([
+        {'genre_ids': '[18, 80]', 'original_language': 'en', 'cast': "['A', 'B', 'C', 'D']", 'director': 'X'},
+        {'genre_ids': [18], 'original_language': 'ko', 'cast': [], 'director': None},
+    ])
+    encoder = MovieFeatureEncoder(max_cast=3)
+    X = encoder.fit_transform(movies)
+
+    assert X.shape == (2, len(encoder.feature_names_))
+    assert 'cast_D' not in encoder.vocabulary_
+    assert X[0].nnz == 7
+    assert X[1].nnz == 2
+    assert sorted(encoder.tokens('lang')) == ['lang_en', 'lang_ko']
+
+    new_movie = pd.DataFrame([{'genre_ids': [18, 99], 'original_language': 'fr', 'cast': ['A'], 'director': 'X'}])
+    row = encoder.transform(new_movie)
+    assert row.shape == (1, X.shape[1])
+    assert sorted(encoder.feature_names_[i] for i in row.indices) == ['cast_A', 'director_X', 'genre_18']
@@ -0,0 +1,27 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from functools import partial
+from fastapi.testclient import TestClient
+from app.main import app
+from app.ml_models import ml_models
+
+def test_ready_returns_503_until_warm_up_has_loaded_the_model(tmp_path, monkeypatch, catalog):
+    model_dir = str(tmp_path)
+    ml_models.train_and_save_model(model_dir=model_dir, n_neighbors=4, catalog=catalog)
+    # A fresh process: the model is on disk but nothing is loaded yet
+    monkeypatch.setattr(ml_models, '_model', None)
+    monkeypatch.setattr(ml_models, 'ensure_model_loaded', partial(ml_models.ensure_model_loaded, model_dir))
+
+    # Without entering the client the lifespan (and so the warm-up) does not run
+    response = TestClient(app).get("/api/ready")
+    assert response.status_code == 503
+    assert response.json()['status'] == 'loading' and response.json()['model']['loaded'] is False
+    assert TestClient(app).get("/api/health").status_code == 200
+
+    with TestClient(app) as client:
+        response = client.get("/api/ready")
+    assert response.status_code == 200
+    assert response.json()['status'] == 'ready'
+    assert response.json()['model']['n_movies'] == len(catalog)
@@ -0,0 +1,34 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import numpy as np
+from app.ml_models import ml_models
+from app.ml_models.artifact import load_artifact
+from app.ml_models.neighbors import SparseBruteForceIndex
+
+def test_added_movies_are_searchable_and_neighbors_stay_exact(tmp_path, catalog, new_movies):
+    """Appended movies get their own neighbors and show up in the neighbors of existing movies"""
+    model_dir = str(tmp_path)
+    ml_models.train_and_save_model(model_dir=model_dir, n_neighbors=4, catalog=catalog)
+    before = load_artifact(model_dir)
+
+    version = ml_models.add_movies_to_model(new_movies, model_dir=model_dir)
+    after = load_artifact(model_dir)
+    assert after['version'] == version
+    assert after['manifest']['n_appended'] == 2
+    assert after['manifest']['base_version'] == before['version']
+    assert list(after['movie_data']['id']) == [278, 238, 240, 424, 389, 242, 496243]
+
+    # Existing columns keep their scale, so existing rows are unchanged
+    n_old_features = before['feature_matrix'].shape[1]
+    assert np.allclose(after['scaler'].scale_[:n_old_features], before['scaler'].scale_)
+    assert (after['feature_matrix'][:5, :n_old_features] != before['feature_matrix']).nnz == 0
+
+    # The incrementally maintained table matches an exact search over the grown matrix
+    expected, _ = SparseBruteForceIndex(after['feature_matrix']).kneighbors(after['feature_matrix'], n_neighbors=4)
+    assert np.allclose(after['neighbor_distances'], expected, atol=1e-4)
+    assert 5 in after['neighbor_indices'][2]
+
+    # Adding the same movies again is a no-op
+    assert ml_models.add_movies_to_model(new_movies, model_dir=model_dir) is None
@@ -0,0 +1,122 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.neighbors import NearestNeighbors
+from sklearn.preprocessing import StandardScaler
+import time
+from app.ml_models.artifact import save_artifact, load_artifact, current_version, list_versions, prune_versions, RETIRED_FILE
+from app.ml_models.features import MovieFeatureEncoder
+from app.ml_models.neighbors import SparseBruteForceIndex
+from app.ml_models.ann import build_index
+
+def is_memory_mapped(array):
+    while array is not None:
+        if isinstance(array, np.memmap):
+            return True
+        array = array.base
+    return False
+
+def make_model_data():
+    movie_data = pd.DataFrame({
+        'id': [278, 238, 240, 424],
+        'title': ['The Shawshank Redemption', 'The Godfather', 'The Godfather Part II', "Schindler's List"],
+        'vote_average': [8.7, 8.7, 8.6, 8.6],
+        'genre_ids': [[18, 80], [18, 80], [18, 80], [18, 36]],
+        'original_language': ['en', 'en', 'en', 'en'],
+        'cast': [['Tim Robbins', 'Morgan Freeman'], ['Marlon Brando', 'Al Pacino'], ['Al Pacino', 'Robert Duvall'], ['Liam Neeson']],
+        'director': ['Frank Darabont', 'Francis Ford Coppola', 'Francis Ford Coppola', None],
+        'tagline': [None, 'An offer you can’t refuse.', None, None],
+    })
+    encoder = MovieFeatureEncoder()
+    scaler = StandardScaler(with_mean=False)
+    X = scaler.fit_transform(encoder.fit_transform(movie_data)).tocsr()
+    return {
+        'knn_model': SparseBruteForceIndex(X, n_neighbors=3),
+        'scaler': scaler,
+        'feature_matrix': X,
+        'encoder': encoder,
+        'n_neighbors': 3,
+        'neighbor_indices': None,
+        'neighbor_distances': None,
+        'movie_data': movie_data,
+    }
+
+def test_artifact_round_trip(tmp_path):
+    """A saved artifact is published atomically and reloads memory-mapped with identical contents"""
+    model_data = make_model_data()
+    version = save_artifact(model_data, str(tmp_path))
+    assert current_version(str(tmp_path)) == version
+
+    loaded = load_artifact(str(tmp_path))
+    assert is_memory_mapped(loaded['feature_matrix'].data)
+    assert is_memory_mapped(loaded['knn_model'].X.indices)
+    assert (loaded['feature_matrix'] != model_data['feature_matrix']).nnz == 0
+    assert loaded['encoder'].vocabulary_ == model_data['encoder'].vocabulary_
+
+    rows = loaded['movie_data'].take([1, 3])
+    assert rows['id'].tolist() == [238, 424]
+    assert rows['cast'].tolist() == [['Marlon Brando', 'Al Pacino'], ['Liam Neeson']]
+    assert rows['genre_ids'].tolist() == [[18, 80], [18, 36]]
+    assert rows['director'].iloc[0] == 'Francis Ford Coppola'
+    assert pd.isna(rows['director'].iloc[1])
+    assert loaded['movie_data'].value('tagline', 1) == 'An offer you can’t refuse.'
+
+def test_prune_keeps_recently_retired_and_unpublished_versions(tmp_path):
+    """Other processes may still serve a just-retired version, and a retraining may not be published yet"""
+    model_dir = str(tmp_path)
+    model_data = make_model_data()
+    first = save_artifact(model_data, model_dir)
+    in_flight = save_artifact(model_data, model_dir, publish=False)
+    second = save_artifact(model_data, model_dir)
+    third = save_artifact(model_data, model_dir)
+
+    prune_versions(model_dir, keep=1, grace_seconds=60)
+    assert list_versions(model_dir) == [first, in_flight, second, third]
+
+    # Retired two minutes ago: no process can still be serving it
+    long_ago = time.time() - 120
+    os.utime(os.path.join(model_dir, first, RETIRED_FILE), (long_ago, long_ago))
+    prune_versions(model_dir, keep=1, grace_seconds=60)
+    assert list_versions(model_dir) == [in_flight, second, third]
+    assert current_version(model_dir) == third
+
+def test_sparse_index_matches_sklearn():
+    """The copy-free brute force index returns the same neighbors as sklearn"""
+    X = make_model_data()['feature_matrix']
+    distances, indices = SparseBruteForceIndex(X).kneighbors(X, n_neighbors=4)
+    expected_distances, _ = NearestNeighbors(algorithm='brute').fit(X).kneighbors(X, n_neighbors=4)
+    assert np.allclose(distances, expected_distances)
+    assert (indices[:, 0] == np.arange(X.shape[0])).all()
+
+def test_pruned_index_matches_brute_force():
+    """Pruning never drops a true neighbor, whichever features get posting lists"""
+    X = make_model_data()['feature_matrix']
+    # Catalog rows, a movie with a single feature, and a blend of every row (like a taste profile)
+    single_feature = sparse.csr_matrix((X[0].data[:1], X[0].indices[:1], [0, 1]), shape=(1, X.shape[1]))
+    queries = sparse.vstack([X, single_feature, sparse.csr_matrix(X.mean(axis=0))]).tocsr()
+    expected_distances, _ = SparseBruteForceIndex(X).kneighbors(queries, n_neighbors=3)
+    for max_postings in (0, 1, 2, X.shape[0]):
+        distances, indices = build_index(X, 'pruned', max_postings=max_postings).kneighbors(queries, n_neighbors=3)
+        assert np.allclose(distances, expected_distances)
+        assert (indices[:X.shape[0], 0] == np.arange(X.shape[0])).all()
+
+def test_candidate_budget_trades_recall_for_fewer_scored_rows():
+    """A budget keeps results well-formed and never reports a row closer than it is"""
+    X = make_model_data()['feature_matrix']
+    queries = sparse.vstack([X, sparse.csr_matrix(X.mean(axis=0))]).tocsr()
+    expected_distances, _ = SparseBruteForceIndex(X).kneighbors(queries, n_neighbors=3)
+    for max_candidates in (1, 2):
+        index = build_index(X, 'pruned', max_postings=X.shape[0], max_candidates=max_candidates)
+        distances, indices = index.kneighbors(queries, n_neighbors=3)
+        assert distances.shape == indices.shape == (queries.shape[0], 3)
+        assert (np.diff(distances, axis=1) >= 0).all()
+        assert (distances >= expected_distances - 1e-9).all()
+        # Every row is the best candidate on its own rare features
+        assert (indices[:X.shape[0], 0] == np.arange(X.shape[0])).all()
+    # A budget as large as the catalog is exact again
+    distances, _ = build_index(X, 'pruned', max_candidates=X.shape[0]).kneighbors(queries, n_neighbors=3)
+    assert np.allclose(distances, expected_distances)
@@ -0,0 +1,71 @@
+import sys
+import os
+import time
+from concurrent.futures import Future
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import numpy as np
+from app.ml_models import ml_models, registry
+from app.ml_models.artifact import load_artifact, current_version, list_versions
+
+def test_validated_version_is_swapped_in_while_old_references_stay_usable(tmp_path, catalog):
+    model_dir = str(tmp_path)
+    ml_models.train_and_save_model(model_dir=model_dir, n_neighbors=4, catalog=catalog)
+    old_model = ml_models.current_model()
+
+    new_model = ml_models.train_and_save_model(model_dir=model_dir, n_neighbors=4, catalog=catalog.iloc[:4], publish=False)
+    # Unpublished versions are written but neither served nor pointed at by CURRENT
+    assert current_version(model_dir) == old_model['version']
+    assert ml_models.current_model() is old_model
+    assert registry.validate_model(load_artifact(model_dir, new_model['version']), old_model) == []
+
+    registry.publish_version(model_dir, new_model['version'])
+    registry.reload_model(model_dir)
+    assert ml_models.current_model()['version'] == new_model['version']
+    # A request that grabbed the old model still sees a complete, consistent old model
+    assert len(old_model['movie_data']) == len(old_model['id_to_row']) == 5
+
+def test_validation_rejects_a_shrunken_catalog(tmp_path, catalog):
+    model_dir = str(tmp_path)
+    serving = ml_models.train_and_save_model(model_dir=model_dir, n_neighbors=4, catalog=catalog)
+    small = ml_models.train_and_save_model(model_dir=model_dir, n_neighbors=1, catalog=catalog.iloc[:2], publish=False)
+    problems = registry.validate_model(load_artifact(model_dir, small['version']), serving)
+    assert any('shrank' in problem for problem in problems)
+
+def test_background_retraining_publishes_the_new_version(tmp_path, catalog):
+    csv_file = str(tmp_path / 'catalog.csv')
+    catalog.to_csv(csv_file, index=False)
+    model_dir = str(tmp_path / 'models')
+    os.makedirs(model_dir)
+
+    registry.start_retraining(csv_file=csv_file, model_dir=model_dir)
+    deadline = time.monotonic() + 120
+    while registry.retraining_status()['state'] in ('training', 'validating') and time.monotonic() < deadline:
+        time.sleep(0.2)
+    status = registry.retraining_status()
+    assert status['state'] == 'published', status
+    assert ml_models.current_model()['version'] == status['version'] == current_version(model_dir)
+
+def test_retraining_keeps_movies_added_before_and_while_it_runs(tmp_path, catalog, new_movies):
+    model_dir = str(tmp_path)
+    ml_models.train_and_save_model(model_dir=model_dir, n_neighbors=4, catalog=catalog)
+    ml_models.add_movies_to_model(new_movies[:1], model_dir)
+
+    # What the training process does, run in this process; the CSV is only for an empty model_dir
+    version, trained_on = registry._train_in_subprocess('does-not-exist.csv', model_dir)
+    assert trained_on == current_version(model_dir)
+    assert 242 in set(np.asarray(load_artifact(model_dir, version)['movie_data']['id']))
+    # Parasite is added while the retrained version waits to be published
+    ml_models.add_movies_to_model(new_movies[1:], model_dir)
+
+    done = Future()
+    done.set_result((version, trained_on))
+    registry._finish_retraining(done, model_dir)
+    status = registry.retraining_status()
+    assert status['state'] == 'published', status
+    served = ml_models.current_model()
+    assert served['version'] == status['version'] == current_version(model_dir)
+    assert {242, 496243} <= set(served['id_to_row'])
+    assert len(served['movie_data']) == len(catalog) + 2
+    # The retrained version was extended into a new one and is gone
+    assert version not in list_versions(model_dir)
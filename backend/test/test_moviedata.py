@@ -0,0 +1,87 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import time
+import threading
+import requests
+from themoviedb import schemas
+from themoviedb.utils import as_dataclass
+from app.services import moviedata, tmdb_cache
+from app.services.tmdb_cache import TMDBCache
+
+def test_backdrop_selection_is_deterministic():
+    backdrops = [
+        schemas.Image(file_path='/main.jpg', vote_average=9.0, vote_count=10),
+        schemas.Image(file_path='/b.jpg', vote_average=5.5, vote_count=3),
+        schemas.Image(file_path='/a.jpg', vote_average=5.5, vote_count=3),
+        schemas.Image(file_path='/c.jpg', vote_average=5.2, vote_count=40),
+    ]
+    assert moviedata.select_backdrop(backdrops, '/main.jpg') == '/b.jpg'
+    assert moviedata.select_backdrop(list(reversed(backdrops)), '/main.jpg') == '/b.jpg'
+    # Movies with only their main backdrop, or none at all, no longer fail
+    assert moviedata.select_backdrop(backdrops[:1], '/main.jpg') == '/main.jpg'
+    assert moviedata.select_backdrop(None, None) is None
+
+def test_combined_fetch_uses_one_request(monkeypatch):
+    requested = []
+
+    class FakeMovie:
+        def details(self, append_to_response=None, image_language=None):
+            requested.append(append_to_response)
+            return as_dataclass(schemas.Movie, {
+                'id': 155, 'title': 'The Dark Knight', 'genres': [{'id': 18, 'name': 'Drama'}],
+                'backdrop_path': '/main.jpg',
+                'credits': {'cast': [{'name': 'Christian Bale'}, {'name': 'Heath Ledger'}],
+                            'crew': [{'name': 'Christopher Nolan', 'job': 'Director'}]},
+                'images': {'backdrops': [{'file_path': '/main.jpg'}, {'file_path': '/joker.jpg'}]},
+            })
+
+    class FakeTMDb:
+        def movie(self, movie_id):
+            return FakeMovie()
+
+    monkeypatch.setattr(moviedata, 'get_tmdb', lambda: FakeTMDb())
+    movie = moviedata._fetch_movie_data(155)
+    assert requested == ['credits,images']
+    assert movie['cast'] == ['Christian Bale', 'Heath Ledger'] and movie['director'] == 'Christopher Nolan'
+    assert movie['genre_ids'] == [18] and movie['backdrop_path'] == '/joker.jpg'
+
+def test_expired_entries_are_served_while_they_refresh(monkeypatch, clock):
+    cache = TMDBCache(':memory:', clock=clock)
+    monkeypatch.setattr(tmdb_cache, '_cache', cache)
+    cache.set('movie', 155, {'id': 155, 'title': 'The Dark Knight'})
+    clock.now += 8 * tmdb_cache.DAY
+
+    refreshed = threading.Event()
+
+    def slow_fetch(movie_id):
+        refreshed.wait(5)
+        return {'id': movie_id, 'title': 'The Dark Knight (refreshed)'}
+
+    monkeypatch.setattr(moviedata, '_fetch_movie_data', slow_fetch)
+    start = time.perf_counter()
+    assert moviedata.get_movie_data(155)['title'] == 'The Dark Knight'
+    assert time.perf_counter() - start < 1
+    assert cache.stats()['stale'] == 1
+
+    refreshed.set()
+    deadline = time.time() + 5
+    while cache.get('movie', 155)[1] is None and time.time() < deadline:
+        time.sleep(0.01)
+    assert cache.get('movie', 155)[1]['title'] == 'The Dark Knight (refreshed)'
+
+def test_failed_refresh_keeps_serving_the_stale_entry(monkeypatch, clock):
+    cache = TMDBCache(':memory:', clock=clock)
+    monkeypatch.setattr(tmdb_cache, '_cache', cache)
+    cache.set('providers', '155:US', {'flatrate': [['Max', 1899, '/max.png']]})
+    clock.now += 2 * tmdb_cache.DAY
+
+    def tmdb_down(movie_id, country):
+        raise requests.Timeout("read timed out")
+
+    monkeypatch.setattr(moviedata, '_fetch_movie_streaming_data', tmdb_down)
+    for _ in range(3):
+        assert moviedata.get_movie_streaming_data(155)['flatrate'] == [['Max', 1899, '/max.png']]
+    # A miss has nothing to fall back on
+    assert moviedata.get_movie_streaming_data(680) is None
@@ -0,0 +1,19 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from app.ml_models import ml_models
+
+def test_profile_query_excludes_rated_movies_and_attributes_sources(tmp_path, catalog):
+    ml_models.train_and_save_model(model_dir=str(tmp_path), n_neighbors=4, catalog=catalog)
+    ratings = {238: 5.0, 240: 4.5, 99999: 5.0}  # 99999 is not in the catalog and is skipped
+
+    recommendations = ml_models.get_profile_recommendations(ratings, top_n=2, exclude_ids=ratings)
+    assert len(recommendations) == 2
+    assert not set(recommendations['id']) & set(ratings)
+    assert recommendations['distance'].is_monotonic_increasing
+    assert set(recommendations['closest_source_id']) <= {238, 240}
+
+def test_profile_query_needs_a_catalog_movie(tmp_path, catalog):
+    ml_models.train_and_save_model(model_dir=str(tmp_path), n_neighbors=4, catalog=catalog)
+    assert ml_models.get_profile_recommendations({99999: 5.0}) is None
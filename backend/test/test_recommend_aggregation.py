@@ -0,0 +1,40 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from app.models.models import User, Movie, Rating
+from app.ml_models import ml_models
+from app.services.recommender import aggregate_candidates, recommend
+
+def test_aggregate_candidates_sums_scores_and_keeps_sources():
+    # Source 0 (rated 5) and source 1 (rated 3) both recommend movie 7
+    ids, scores, mean_ratings, sources = aggregate_candidates(
+        np.array([7, 8, 7, 9]), np.array([0, 0, 1, 1]), np.array([5.0, 3.0]), top_n=2
+    )
+    assert ids.tolist() == [7, 8]
+    assert scores.tolist() == [8.0, 5.0]
+    assert mean_ratings.tolist() == [4.0, 5.0]
+    assert [source.tolist() for source in sources] == [[0, 1], [0]]
+
+def test_recommend_merges_sources_and_skips_rated_movies(tmp_path, catalog):
+    ml_models.train_and_save_model(model_dir=str(tmp_path), n_neighbors=4, catalog=catalog)
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    db.add(User(id=1, username="test", email="test@example.com", hashed_password="x"))
+    db.add_all([Movie(id=int(row.id), title=row.title) for row in catalog.itertuples()])
+    db.add_all([Rating(user_id=1, movie_id=238, rating=5.0), Rating(user_id=1, movie_id=240, rating=4.0)])
+    db.commit()
+
+    recommendations = recommend(1, db, top_n=3)
+    assert not set(recommendations['id']) & {238, 240}
+    assert recommendations['weighted_score'].is_monotonic_decreasing
+    assert list(recommendations.columns) == [
+        'id', 'title', 'vote_average', 'vote_count', 'genre_ids', 'poster_path', 'source_movie', 'user_rating', 'weighted_score'
+    ]
+    top = recommendations.iloc[0]
+    assert top['weighted_score'] == 9.0 and sorted(top['source_movie']) == ['The Godfather', 'The Godfather Part II']
@@ -0,0 +1,99 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import numpy as np
+from app.ml_models import ml_models
+
+def train(tmp_path, monkeypatch, catalog, new_movies):
+    """
+    Serve a 5-movie model whose precomputed table is 4 wide, and count live kneighbors queries
+    """
+    model = ml_models.train_and_save_model(model_dir=str(tmp_path), n_neighbors=4, catalog=catalog)
+    queries = []
+    knn = ml_models.current_model()['knn_model']
+    search = knn.kneighbors
+
+    def counting_kneighbors(X, n_neighbors=None):
+        queries.append(X.shape[0])
+        return search(X, n_neighbors=n_neighbors)
+
+    monkeypatch.setattr(knn, 'kneighbors', counting_kneighbors)
+    fetched = []
+
+    def tmdb_movie(movie_id):
+        fetched.append(movie_id)
+        return next((movie for movie in new_movies if movie['id'] == movie_id), None)
+
+    monkeypatch.setattr(ml_models, 'get_movie_data', tmdb_movie)
+    return model, queries, fetched
+
+def distances_from(model, movie_id, recommended_ids):
+    X = model['feature_matrix']
+    source = X[model['id_to_row'][movie_id]].toarray()
+    rows = [model['id_to_row'][int(other)] for other in recommended_ids]
+    return np.linalg.norm(X[rows].toarray() - source, axis=1)
+
+def test_movies_never_recommend_themselves(tmp_path, monkeypatch, catalog, new_movies):
+    train(tmp_path, monkeypatch, catalog, new_movies)
+    for top_n in (2, 3, 4, 10):
+        results = ml_models.get_movie_recommendations_batch(catalog['id'].tolist(), top_n=top_n)
+        for movie_id, recommendations in results.items():
+            assert movie_id not in set(recommendations['id'])
+            assert len(recommendations) == min(top_n, len(catalog) - 1)
+
+def test_table_and_live_paths_agree(tmp_path, monkeypatch, catalog, new_movies):
+    _, queries, _ = train(tmp_path, monkeypatch, catalog, new_movies)
+    model = ml_models.current_model()
+
+    # Narrower than the table: answered from it without any neighbor query
+    from_table = ml_models.get_movie_recommendations_batch(catalog['id'].tolist(), top_n=3)
+    assert queries == []
+
+    # As wide as the table (which includes the movie itself): one live query for all five sources
+    live = ml_models.get_movie_recommendations_batch(catalog['id'].tolist(), top_n=4)
+    assert queries == [len(catalog)]
+
+    for movie_id in catalog['id'].tolist():
+        table_distances = distances_from(model, movie_id, from_table[movie_id]['id'])
+        live_distances = distances_from(model, movie_id, live[movie_id]['id'])
+        assert np.all(np.diff(live_distances) >= -1e-9)
+        # Ties may be ordered differently, the distances may not
+        assert np.allclose(table_distances, live_distances[:3])
+
+def test_out_of_catalog_movies_are_fetched_and_encoded(tmp_path, monkeypatch, catalog, new_movies):
+    model, queries, fetched = train(tmp_path, monkeypatch, catalog, new_movies)
+    results = ml_models.get_movie_recommendations_batch([242, 999999], top_n=2)
+
+    assert fetched == [242, 999999]
+    # The Godfather Part III is closest to the other Coppola / Pacino films
+    assert set(results[242]['id']) == {238, 240}
+    # Unknown to TMDB as well: no recommendations, but the key is there
+    assert results[999999] is None
+    assert queries == [1]
+
+def test_mixed_batches_match_single_lookups(tmp_path, monkeypatch, catalog, new_movies):
+    _, queries, _ = train(tmp_path, monkeypatch, catalog, new_movies)
+    batch = ml_models.get_movie_recommendations_batch([238, 242, 999999, 238, 389], top_n=3)
+
+    assert list(batch) == [238, 242, 999999, 389]
+    # Catalog sources come from the table, the TMDB movie needs the only live query
+    assert queries == [1]
+    for movie_id in (238, 242, 389):
+        single = ml_models.get_movie_recommendations_by_id(movie_id, top_n=3)
+        assert batch[movie_id]['id'].tolist() == single['id'].tolist()
+        assert list(batch[movie_id].columns) == list(single.columns)
+    assert batch[999999] is None
+
+def test_recommendations_by_id_for_a_catalog_hit_and_a_miss(tmp_path, monkeypatch, catalog, new_movies):
+    _, queries, fetched = train(tmp_path, monkeypatch, catalog, new_movies)
+
+    hit = ml_models.get_movie_recommendations_by_id(238, top_n=2)
+    # The Godfather: straight from the table, without asking TMDB
+    assert hit['id'].tolist()[0] == 240
+    assert len(hit) == 2 and 238 not in set(hit['id'])
+    assert fetched == [] and queries == []
+
+    # Neither in the catalog nor on TMDB
+    assert ml_models.get_movie_recommendations_by_id(999999, top_n=2) is None
+    assert fetched == [999999] and queries == []
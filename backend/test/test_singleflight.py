@@ -0,0 +1,66 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import time
+import asyncio
+import threading
+import pytest
+from app.services import moviedata
+from app.services.singleflight import SingleFlight
+from app.services.tmdb_cache import TMDBCache
+
+def test_concurrent_threads_share_one_fetch(tmp_path, monkeypatch):
+    cache = TMDBCache(str(tmp_path / 'cache.sqlite'))
+    fetched = []
+
+    def fetch(movie_id):
+        fetched.append(movie_id)
+        time.sleep(0.2)
+        return {'id': movie_id, 'title': 'The Dark Knight'}
+
+    monkeypatch.setattr(moviedata, 'get_cache', lambda: cache)
+    monkeypatch.setattr(moviedata, '_fetch_movie_data', fetch)
+    results = [None] * 8
+    threads = [threading.Thread(target=lambda i=i: results.__setitem__(i, moviedata.get_movie_data(155)))
+               for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert fetched == [155]
+    assert all(result == {'id': 155, 'title': 'The Dark Knight'} for result in results)
+
+def test_concurrent_coroutines_share_one_fetch_and_its_error():
+    flights = SingleFlight()
+    runs = []
+
+    async def fetch(value):
+        runs.append(value)
+        await asyncio.sleep(0.05)
+        if value == 'down':
+            raise RuntimeError("TMDB is down")
+        return value
+
+    async def main():
+        shared = await asyncio.gather(*(flights.do_async('search:heat', lambda: fetch('heat')) for _ in range(5)))
+        failed = await asyncio.gather(*(flights.do_async('search:down', lambda: fetch('down')) for _ in range(3)),
+                                      return_exceptions=True)
+        return shared, failed
+
+    shared, failed = asyncio.run(main())
+    assert shared == ['heat'] * 5
+    assert all(isinstance(error, RuntimeError) for error in failed)
+    assert runs == ['heat', 'down']
+    assert flights.stats() == {'leaders': 2, 'coalesced': 6, 'in_flight': 0}
+
+def test_failed_thread_call_is_not_remembered():
+    flights = SingleFlight()
+
+    def fail():
+        raise RuntimeError("TMDB is down")
+
+    with pytest.raises(RuntimeError):
+        flights.do('movie:155', fail)
+    assert flights.do('movie:155', lambda: 'ok') == 'ok'
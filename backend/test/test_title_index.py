@@ -0,0 +1,106 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import asyncio
+import pandas as pd
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from app.models.models import Movie
+from app.services import title_index
+from app.services.title_index import build_title_index, normalize_title
+from app.services.tmdb_cache import TMDBCache
+
+CATALOG = pd.DataFrame({
+    'id': [48311, 496243, 194, 129, 8078, 1018, 679, 240],
+    'title': ['Parasite', 'Parasite', "Le Fabuleux Destin d'Amélie Poulain", '千と千尋の神隠し',
+              'Alien Resurrection', 'Mulholland Drive', 'Aliens', 'The Godfather Part II'],
+    'release_date': ['1982-03-12', '2019-05-30', '2001-04-25', '2001-07-20', '1997-11-12', '2001-05-16',
+                     '1986-07-18', '1974-12-20'],
+    'vote_count': [150, 18000, 11000, 16000, 4000, 5000, 10000, 12700],
+})
+
+def test_normalization():
+    assert normalize_title('  Amélie ') == 'amelie'
+    assert normalize_title('Harold & Maude') == 'harold and maude'
+    assert normalize_title('WALL·E') == normalize_title('Wall E') == 'wall e'
+    assert normalize_title('千と千尋の神隠し') == '千と千尋の神隠し'
+
+def test_year_picks_between_films_of_the_same_name():
+    index = build_title_index(catalog=CATALOG)
+    assert index.lookup('Parasite') == (496243, 'exact')  # most voted
+    assert index.lookup('parasite', 1982) == (48311, 'exact')
+    assert index.lookup('Parasite', '2020') == (496243, 'exact')  # within a year
+    # A year no indexed film matches is a miss, left to TMDB (e.g. the 1997 remake is not in the catalog)
+    assert index.lookup('Parasite', 1950) == (None, None)
+
+def test_prefix_fuzzy_and_search_aliases(tmp_path):
+    cache = TMDBCache(str(tmp_path / 'cache.sqlite'))
+    cache.set('search', 'spirited away', 129)
+    cache.set('search', 'amelie|2001', 194)
+    cache.set('search', 'not a real movie', None)
+    index = build_title_index(catalog=CATALOG, search_cache=cache)
+
+    assert index.lookup('Alien', 1997) == (8078, 'prefix')
+    assert index.lookup('Alien') == (None, None)  # a prefix needs the year to be trusted
+    assert index.lookup('Mulholland Dr.', 2001) == (1018, 'fuzzy')
+    assert index.lookup('Spirited Away', 2001) == (129, 'exact')
+    assert index.lookup('Amélie', 2001.0) == (194, 'exact')
+    assert index.lookup('Not A Real Movie') == (None, None)
+
+def test_close_spellings_need_the_year():
+    index = build_title_index(catalog=CATALOG)
+    # Sequels one or two words away from the title asked for
+    assert index.lookup('Alien') == (None, None)
+    assert index.lookup('The Godfather') == (None, None)
+    assert index.lookup('The Godfather Part III') == (None, None)
+    assert index.lookup('Mulholland Dr.') == (None, None)
+    # With a year only a film released then can match
+    assert index.lookup('The Godfather Part 2', 1974) == (240, 'fuzzy')
+    assert index.lookup('The Godfather', 1972) == (None, None)
+
+def test_only_misses_are_searched_on_tmdb(monkeypatch):
+    searched = []
+
+    async def search(title, year=None, raise_errors=False):
+        searched.append((title, year))
+        return 550
+
+    monkeypatch.setattr(title_index, 'get_movie_id_by_name_async', search)
+    index = build_title_index(catalog=CATALOG)
+    movie_ids = asyncio.run(title_index.resolve_movie_ids_async(
+        ['Parasite', 'Fight Club', 'Mulholland Drive'], [2019, 1999.0, float('nan')], index=index
+    ))
+    assert movie_ids == [496243, 550, 1018]
+    assert searched == [('Fight Club', 1999)]
+
+def test_fuzzy_shortlist_finds_what_scoring_every_title_finds():
+    titles = ['The Godfather Part II', 'The Lord of the Rings', 'The Return of the King', 'Mulholland Drive',
+              'The Mule', 'Godzilla', 'The Good, the Bad and the Ugly', 'Lord of War', 'The Rings of Power']
+    index = build_title_index(catalog=pd.DataFrame({'id': range(len(titles)), 'title': titles}))
+    for query in ('The Godfather Part 2', 'The Lord of the Ring', 'Mulholand Drive', 'The Good the Bad the Ugly', 'The'):
+        grams = title_index.trigrams(normalize_title(query))
+        scores = [2 * len(grams & title_index.trigrams(title)) / (len(grams) + len(title_index.trigrams(title)))
+                  for title in index.titles]
+        matching = [row for row, score in enumerate(scores) if score >= title_index.FUZZY_THRESHOLD]
+        best = max((scores[row] for row in matching), default=None)
+        expected = [row for row in matching if scores[row] >= best - 0.05]
+        assert sorted(index._fuzzy_rows(normalize_title(query))) == expected
+
+def test_shared_index_always_includes_the_movies_table(tmp_path, monkeypatch):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(bind=engine)
+    db = session_factory()
+    db.add(Movie(id=550, title='Fight Club', year=1999))
+    db.commit()
+    monkeypatch.setattr(title_index, 'SessionLocal', session_factory)
+    monkeypatch.setattr(title_index, '_catalog_frame', lambda: CATALOG)
+    monkeypatch.setattr(title_index, 'get_cache', lambda: TMDBCache(str(tmp_path / 'cache.sqlite')))
+    monkeypatch.setattr(title_index, '_index', None)
+
+    # Built first by a caller without a session, e.g. get_movie_recommendations
+    assert title_index.get_title_index().lookup('Parasite', 2019) == (496243, 'exact')
+    # The upload route then gets the cached index and still finds movies only in the movies table
+    assert title_index.get_title_index(db).lookup('Fight Club', 1999) == (550, 'exact')
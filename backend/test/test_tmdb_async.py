@@ -0,0 +1,76 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import asyncio
+from aiohttp import web
+from themoviedb.routes_async._base import Base
+from app.services import moviedata, tmdb_async
+from app.services.tmdb_cache import TMDBCache
+
+async def fetch_through_fake_server(n_movies):
+    in_flight = {'now': 0, 'max': 0, 'requests': 0}
+
+    async def details(request):
+        in_flight['now'] += 1
+        in_flight['max'] = max(in_flight['max'], in_flight['now'])
+        in_flight['requests'] += 1
+        await asyncio.sleep(0.05)
+        in_flight['now'] -= 1
+        movie_id = int(request.match_info['movie_id'])
+        return web.json_response({
+            'id': movie_id, 'title': f'Movie {movie_id}', 'genres': [{'id': 18, 'name': 'Drama'}],
+            'credits': {'cast': [{'name': 'Someone'}], 'crew': [{'name': 'A Director', 'job': 'Director'}]},
+            'images': {'backdrops': []},
+        })
+
+    app = web.Application()
+    app.router.add_get('/3/movie/{movie_id}', details)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    Base.TMDB_URL = f'http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}'
+    try:
+        movies = await asyncio.gather(*(moviedata.get_movie_data_async(movie_id) for movie_id in range(n_movies)))
+        # Second round is served from the cache
+        again = await asyncio.gather(*(moviedata.get_movie_data_async(movie_id) for movie_id in range(n_movies)))
+    finally:
+        await tmdb_async.close_async_tmdb()
+        await runner.cleanup()
+        Base.TMDB_URL = 'https://api.themoviedb.org'
+    return movies, again, in_flight
+
+def test_async_fetches_overlap_up_to_the_limit(tmp_path, monkeypatch):
+    cache = TMDBCache(str(tmp_path / 'cache.sqlite'))
+    monkeypatch.setattr(moviedata, 'get_cache', lambda: cache)
+    monkeypatch.setattr(tmdb_async, 'MAX_CONCURRENT_REQUESTS', 4)
+    monkeypatch.setenv('TMDB_API_KEY', 'test-key')
+
+    movies, again, in_flight = asyncio.run(fetch_through_fake_server(12))
+
+    assert [movie['id'] for movie in movies] == list(range(12))
+    assert movies[3]['director'] == 'A Director' and movies[3]['genre_ids'] == [18]
+    assert again == movies
+    assert in_flight['requests'] == 12
+    assert in_flight['max'] == 4
+
+def test_each_event_loop_keeps_and_closes_its_own_session(monkeypatch):
+    monkeypatch.setenv('TMDB_API_KEY', 'test-key')
+    sessions = {}
+
+    async def catalog_build():
+        sessions['build'] = tmdb_async._loop_client()['session']
+        await tmdb_async.close_async_tmdb()
+
+    async def api():
+        sessions['api'] = tmdb_async._loop_client()['session']
+        # A second loop in another thread, e.g. a catalog build, must not take over this loop's session
+        await asyncio.to_thread(asyncio.run, catalog_build())
+        assert tmdb_async._loop_client()['session'] is sessions['api']
+        assert not sessions['api'].closed and sessions['build'].closed
+        await tmdb_async.close_async_tmdb()
+
+    asyncio.run(api())
+    assert sessions['api'].closed
+    assert tmdb_async._loop_clients == {}
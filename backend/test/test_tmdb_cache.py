@@ -0,0 +1,84 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from datetime import date
+from app.services import moviedata
+from app.services.tmdb_cache import TMDBCache, ACCESS_RESOLUTION
+
+def test_entries_expire_per_endpoint(tmp_path, clock):
+    cache = TMDBCache(str(tmp_path / 'cache.sqlite'), ttls={'movie': 100, 'providers': 10}, clock=clock)
+    assert cache.set('movie', 155, {'title': 'The Dark Knight', 'release_date': date(2008, 7, 16)}) == \
+        {'title': 'The Dark Knight', 'release_date': '2008-07-16'}
+    cache.set('providers', '155:US', {'flatrate': [('Max', 1899, '/max.jpg')]})
+
+    clock.now += 50
+    assert cache.get('movie', 155) == (True, {'title': 'The Dark Knight', 'release_date': '2008-07-16'})
+    assert cache.get('providers', '155:US') == (False, None)
+    assert cache.get('search', 'heat') == (False, None)
+
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['expired']) == (1, 2, 1)
+    assert stats['endpoints']['movie'] == {'hits': 1, 'misses': 0}
+    assert stats['entries'] == 2
+
+def test_least_recently_used_entries_are_evicted(tmp_path, clock):
+    payload = 'x' * 100
+    cache = TMDBCache(str(tmp_path / 'cache.sqlite'), max_bytes=500, clock=clock)
+    for movie_id in range(4):
+        clock.now += 1
+        cache.set('movie', movie_id, payload)
+    # Touch the oldest entry so the next one in line is evicted instead
+    clock.now += ACCESS_RESOLUTION
+    assert cache.get('movie', 0)[0]
+    clock.now += 1
+    cache.set('movie', 4, payload)
+
+    assert cache.get('movie', 0)[0] and cache.get('movie', 4)[0]
+    assert not cache.get('movie', 1)[0]
+    assert cache.stats()['bytes'] <= 500
+    assert cache.stats()['evictions'] >= 1
+
+def test_hits_write_only_when_last_access_is_stale(tmp_path, clock):
+    cache = TMDBCache(str(tmp_path / 'cache.sqlite'), clock=clock)
+    cache.set('movie', 155, {'title': 'The Dark Knight'})
+    writes = cache._conn.total_changes
+    for _ in range(3):
+        clock.now += 1
+        assert cache.get('movie', 155)[0]
+    assert cache._conn.total_changes == writes
+
+    clock.now += ACCESS_RESOLUTION
+    assert cache.get('movie', 155)[0]
+    assert cache._conn.total_changes == writes + 1
+
+def test_size_total_follows_writes_replacements_and_deletes(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    cache = TMDBCache(path)
+    cache.set('movie', 1, 'x' * 100)
+    cache.set('movie', 2, 'x' * 50)
+    cache.set('movie', 1, 'x' * 10)
+    cache.invalidate('movie', 2)
+    assert cache.stats()['bytes'] == len('"' + 'x' * 10 + '"')
+    # Another process opening the same file shares the total
+    assert TMDBCache(path).stats()['bytes'] == cache.stats()['bytes']
+    cache.invalidate('movie')
+    assert cache.stats()['bytes'] == 0
+
+def test_get_movie_data_fetches_once(tmp_path, monkeypatch):
+    cache = TMDBCache(str(tmp_path / 'cache.sqlite'))
+    calls = []
+
+    def fetch(movie_id):
+        calls.append(movie_id)
+        if movie_id == 0:
+            raise RuntimeError("TMDB is down")
+        return {'id': movie_id, 'title': 'Heat', 'release_date': date(1995, 12, 15)}
+
+    monkeypatch.setattr(moviedata, 'get_cache', lambda: cache)
+    monkeypatch.setattr(moviedata, '_fetch_movie_data', fetch)
+    first = moviedata.get_movie_data(949)
+    assert moviedata.get_movie_data('949') == first == {'id': 949, 'title': 'Heat', 'release_date': '1995-12-15'}
+    # Failures are not cached
+    assert moviedata.get_movie_data(0) is None and moviedata.get_movie_data(0) is None
+    assert calls == [949, 0, 0]
@@ -0,0 +1,87 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import time
+import asyncio
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.database import Base
+from app.models.models import User, Movie, Rating, Recommendation
+from app.services import weekly_recommender, moviedata, tmdb_cache
+from app.services.tmdb_cache import TMDBCache
+
+def test_sources_are_fetched_concurrently(monkeypatch):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    db.add(User(id=1, username="test1", email="test1@example.com", hashed_password="x"))
+    db.add_all([Movie(id=movie_id, title=f"Movie {movie_id}") for movie_id in range(1, 11)])
+    db.add_all([Rating(user_id=1, movie_id=movie_id, rating=4.5) for movie_id in range(1, 11)])
+    db.commit()
+
+    def tmdb_recommendations(movie_id):
+        time.sleep(0.2)
+        # Every source recommends 500 (the user has not seen it); odd sources also recommend movie 1, already rated
+        return [{'id': 500, 'title': 'Heat'}] + ([{'id': 1, 'title': 'Movie 1'}] if movie_id % 2 else [])
+
+    monkeypatch.setattr(weekly_recommender, 'movie_recommendations', tmdb_recommendations)
+    monkeypatch.setattr(weekly_recommender, 'get_movie_data', lambda movie_id: {'id': movie_id, 'title': 'Heat'})
+
+    start = time.perf_counter()
+    recommendation = weekly_recommender.generate_weekly_recommendation(1, db)
+    elapsed = time.perf_counter() - start
+
+    assert recommendation['movie_id'] == 500
+    assert sorted(recommendation['source_movie']) == sorted(f"Movie {movie_id}" for movie_id in range(1, 11))
+    # Ten 200 ms calls back to back would take 2 s
+    assert elapsed < 1.0
+
+def test_prefetch_warms_providers_per_region(monkeypatch):
+    # The recommendation query runs in a worker thread, as with app.database's engine
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    db.add_all([Recommendation(user_id=user_id, movie_id=movie_id, source_movies="[]")
+                for user_id, movie_id in [(1, 10), (2, 10), (3, 20)]])
+    db.commit()
+
+    cache = TMDBCache(':memory:')
+    monkeypatch.setattr(tmdb_cache, '_cache', cache)
+    fetched = []
+
+    async def fetch_providers(movie_id, country):
+        fetched.append((movie_id, country))
+        return {'flatrate': [(f'Service {country}', 1, '/logo.png')], 'free': [], 'ads': [], 'buy': [], 'rent': []}
+
+    monkeypatch.setattr(moviedata, '_fetch_movie_streaming_data_async', fetch_providers)
+    summary = asyncio.run(weekly_recommender.prefetch_streaming_data(db, ("US", "GB")))
+    assert summary == {'movies': 2, 'regions': ["US", "GB"], 'failed': 0}
+    assert sorted(fetched) == [(10, "GB"), (10, "US"), (20, "GB"), (20, "US")]
+
+    # Fresh entries are served from the cache, per region
+    asyncio.run(weekly_recommender.prefetch_streaming_data(db, ("US", "GB")))
+    assert len(fetched) == 4
+    assert moviedata.get_movie_streaming_data(20, "GB")['flatrate'] == [['Service GB', 1, '/logo.png']]
+
+def test_prefetch_route_validates_regions_like_the_weekly_route(monkeypatch):
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.auth import get_current_admin
+    from app.api.routes.recommend import get_db
+
+    async def prefetch(db, regions):
+        return {'movies': 0, 'regions': list(regions), 'failed': 0}
+
+    monkeypatch.setattr(weekly_recommender, 'prefetch_streaming_data', prefetch)
+    app.dependency_overrides[get_current_admin] = lambda: User(id=1, username="admin")
+    app.dependency_overrides[get_db] = lambda: None
+    try:
+        client = TestClient(app)
+        response = client.post("/api/admin/tmdb-cache/prefetch-providers", params=[("regions", "US"), ("regions", "GB")])
+        assert response.status_code == 200
+        assert response.json()['regions'] == ["US", "GB"]
+        assert client.post("/api/admin/tmdb-cache/prefetch-providers", params={"regions": "gbr"}).status_code == 422
+    finally:
+        app.dependency_overrides.clear()